@@ -0,0 +1,72 @@
+"""
+Benchmark of the dates parsing on the dates of speeches listings and politicians profiles. Pages are rendered by
+the local stand-in of the government website, together with the pages saved in the unit tests fixtures.
+
+    python -m benchmarks.bench_dates --politicians 460 --crawls 3
+"""
+
+import argparse
+import pathlib
+import re
+import time
+
+from dateutil.parser import parse
+
+from src.utils import parse_date
+from benchmarks.fixture_site import FixtureSite
+
+FIXTURES = pathlib.Path(__file__).resolve().parent.parent.joinpath("test_unit", "fixtures")
+LISTING_DATE = re.compile(r'<td class="nobr">([^<]+)</td>')
+PROFILE_DATE = re.compile(r'<p class="right">(\d{1,2}-\d{1,2}-\d{4})')
+
+
+def crawled_dates(politicians, speeches):
+    """
+    Returns: List of date strings in the order they are parsed by the scrapers during one crawl
+    """
+    site = FixtureSite(politicians=politicians, speeches_per_politician=speeches, page_size=10 ** 6)
+    pages = [FIXTURES.joinpath(name).read_text(encoding="utf-8") for name in ("listing.html", "profile.html")]
+    for number in range(1, politicians + 1):
+        pages.append(site.speeches_listing({'id': str(number)}))
+        pages.append(site.profile({'id': str(number)}))
+
+    return [value for page in pages for pattern in (LISTING_DATE, PROFILE_DATE) for value in pattern.findall(page)]
+
+
+def time_parser(parser, dates, crawls):
+    start = time.perf_counter()
+    for _ in range(crawls):
+        for value in dates:
+            parser(value)
+    return time.perf_counter() - start
+
+
+def main(command_line=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--politicians', type=int, default=460)
+    parser.add_argument('--speeches', type=int, default=30, help="Average number of speeches per politician")
+    parser.add_argument('--crawls', type=int, default=3, help="Number of times the same dates are parsed")
+    args = parser.parse_args(command_line)
+
+    dates = crawled_dates(args.politicians, args.speeches)
+    mismatches = [value for value in set(dates) if parse_date(value) != parse(value)]
+
+    # Patterns without the cache show the gain on dates seen for the first time
+    runs = [("dateutil", parse, args.crawls),
+            ("patterns, no cache", parse_date.__wrapped__, args.crawls),
+            ("parse_date, first crawl", parse_date, 1),
+            ("parse_date", parse_date, args.crawls)]
+    rates = dict()
+    for name, function, crawls in runs:
+        parse_date.cache_clear()
+        rates[name] = len(dates) * crawls / time_parser(function, dates, crawls)
+
+    print(f"{len(dates)} dates per crawl, {len(set(dates))} distinct, {args.crawls} crawls, "
+          f"{len(mismatches)} results different from dateutil")
+    for name, rate in rates.items():
+        print(f"{name:>24} | {rate:>12.0f} dates/s | {rate / rates['dateutil']:>7.1f}x")
+    print(f"Cache: {parse_date.cache_info()}")
+
+
+if __name__ == '__main__':
+    main()
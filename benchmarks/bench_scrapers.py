@@ -0,0 +1,118 @@
+"""
+Throughput benchmark of the scrapers run against the local stand-in of the government website.
+
+    python -m benchmarks.bench_scrapers --politicians 50 --latency 0.02 --error-rate 0.01
+    python -m benchmarks.bench_scrapers --latency 0.05 --capacity 6 --max-connections 30 --max-rps 200
+"""
+
+import argparse
+import logging
+import resource
+import statistics
+import threading
+import time
+
+import src.mongo.mongo_setup as mongo_setup
+from src.scraping.fetching import Fetcher
+from src.scraping.scraping import PoliticiansScraper, SpeechesScraper
+from benchmarks.fixture_site import FixtureSite
+
+
+class TimedFetcher(Fetcher):
+    """
+    Fetcher that records latency of every page download
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.latencies = []
+        self._latencies_lock = threading.Lock()
+
+    def get(self, url):
+        start = time.perf_counter()
+        try:
+            return super().get(url)
+        finally:
+            with self._latencies_lock:
+                self.latencies.append(time.perf_counter() - start)
+
+
+def percentile(values, percent):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def run_scraper(name, site, scrape, fetcher, items):
+    requests_before = sum(site.requests.values())
+    fetcher.latencies.clear()
+
+    start = time.perf_counter()
+    count = items(scrape())
+    elapsed = time.perf_counter() - start
+
+    pages = sum(site.requests.values()) - requests_before
+    latencies = sorted(fetcher.latencies)
+    return {"scraper": name,
+            "seconds": elapsed,
+            "pages": pages,
+            "pages/s": pages / elapsed,
+            "items": count,
+            "items/s": count / elapsed,
+            "p50 ms": percentile(latencies, 50) * 1000,
+            "p99 ms": percentile(latencies, 99) * 1000,
+            "peak RSS MB": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def main(command_line=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--politicians', type=int, default=20)
+    parser.add_argument('--speeches', type=int, default=30, help="Average number of speeches per politician")
+    parser.add_argument('--latency', type=float, default=0.0, help="Delay of every response in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Maximum random delay added to the latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-connections', type=int, default=10)
+    parser.add_argument('--max-rps', type=float, default=None, help="Ceiling of requests per second")
+    parser.add_argument('--latency-target', type=float, default=None,
+                        help="Response time in seconds above which the scrapers lower the number of requests")
+    parser.add_argument('--capacity', type=int, default=None,
+                        help="Number of requests the site handles at once, requests above it are answered with 503")
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help="Fraction of truncated stenograms")
+    parser.add_argument('--local-mongo', action='store_true',
+                        help="Write to the local mongo server instead of in-memory mongomock")
+    args = parser.parse_args(command_line)
+
+    logging.basicConfig(level=logging.WARNING)
+    mongo_setup.global_init(mock=not args.local_mongo)
+
+    site = FixtureSite(politicians=args.politicians, speeches_per_politician=args.speeches, latency=args.latency,
+                       jitter=args.jitter, error_rate=args.error_rate, capacity=args.capacity,
+                       truncate_rate=args.truncate_rate)
+    results = []
+    with site:
+        fetcher = TimedFetcher(max_connections=args.max_connections, backoff=0.05, max_rps=args.max_rps,
+                               latency_target=args.latency_target)
+        scraper_args = dict(government_n=9, to_database=True, fetcher=fetcher, workers=args.workers,
+                            root_url=site.root_url(9))
+
+        politicians = PoliticiansScraper(**scraper_args)
+        results.append(run_scraper("politicians", site, politicians.scrape_politicians, fetcher,
+                                   lambda _: len(politicians.politicians)))
+
+        speeches = SpeechesScraper(only_new=False, **scraper_args)
+        results.append(run_scraper("speeches", site, speeches.scrape_politician_speeches, fetcher,
+                                   lambda _: len(speeches.speeches)))
+
+    columns = list(results[0])
+    print(" | ".join(f"{column:>12}" for column in columns))
+    for result in results:
+        print(" | ".join(f"{value:>12.2f}" if isinstance(value, float) else f"{value:>12}"
+                         for value in result.values()))
+    print(f"Site served {site.bytes_sent / 1024 ** 2:.1f} MB, {site.total_speeches} speeches available.")
+    print(f"Site throttled {site.throttled} and truncated {site.truncated} requests. "
+          f"Final concurrency limit: {fetcher.limit.limit} of {args.max_connections}.")
+
+
+if __name__ == '__main__':
+    main()
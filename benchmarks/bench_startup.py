@@ -0,0 +1,104 @@
+"""
+Startup time benchmark of the command line interface. Every command is run in a new interpreter, like it is run
+by the user, and the slowest imports are listed from -X importtime.
+
+    python -m benchmarks.bench_startup --runs 10 --max-ms 400
+"""
+
+import argparse
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+COMMANDS = [["-h"], ["scrape", "-h"], ["search", "-h"], ["stats", "-h"], ["worker", "-h"]]
+
+# Modules that should be imported only by the subcommands that use them
+HEAVY_MODULES = ("bs4", "lxml", "requests", "dateutil", "mongoengine", "pymongo", "simplemma", "pyarrow",
+                 "numpy", "pandas", "zstandard")
+
+CHECK_IMPORTS = f"""
+import sys
+import main
+try:
+    main.main(sys.argv[1:])
+except SystemExit:
+    pass
+print("imported:" + ",".join(sorted({{name.split(".")[0] for name in sys.modules}} & set({HEAVY_MODULES!r}))))
+"""
+
+
+def run_command(arguments, *options):
+    return subprocess.run([sys.executable, *options, "main.py", *arguments], cwd=ROOT, capture_output=True,
+                          text=True)
+
+
+def time_command(arguments, runs):
+    """
+    Returns: List of wall times of the command in seconds
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run_command(arguments)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def heavy_imports(arguments):
+    """
+    Returns: Names of the heavy modules imported by the command
+    Raises:
+        RuntimeError: when the command fails before the imported modules are listed
+    """
+    result = subprocess.run([sys.executable, "-c", CHECK_IMPORTS, *arguments], cwd=ROOT, capture_output=True,
+                            text=True)
+    if result.returncode != 0 or "imported:" not in result.stdout:
+        raise RuntimeError(f"Command {' '.join(arguments)} failed with code {result.returncode}: {result.stderr}")
+
+    # Help of the command is printed before the list of modules
+    modules = result.stdout.rpartition("imported:")[2].strip()
+    return modules.split(",") if modules else []
+
+
+def slowest_imports(arguments, count):
+    """
+    Returns: List of (cumulative microseconds, module) of the slowest top-level imports of the command
+    """
+    imports = []
+    for line in run_command(arguments, "-X", "importtime").stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit() and not parts[2].startswith("  "):
+            imports.append((int(parts[1]), parts[2].strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main(command_line=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help="Number of runs of every command")
+    parser.add_argument('--top', type=int, default=5, help="Number of the slowest imports listed")
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help="Exit with an error if median startup time of any command is longer")
+    args = parser.parse_args(command_line)
+
+    failed = False
+    print(" | ".join(f"{column:>16}" for column in ("command", "median ms", "min ms", "heavy imports")))
+    for arguments in COMMANDS:
+        times = time_command(arguments, args.runs)
+        median = statistics.median(times) * 1000
+        heavy = heavy_imports(arguments)
+        print(f"{' '.join(arguments):>16} | {median:>16.1f} | {min(times) * 1000:>16.1f} | "
+              f"{', '.join(heavy) or '-':>16}")
+        failed |= bool(heavy) or (args.max_ms is not None and median > args.max_ms)
+
+    print(f"\nSlowest imports of {' '.join(COMMANDS[0])}:")
+    for cumulative, name in slowest_imports(COMMANDS[0], args.top):
+        print(f"{cumulative / 1000:>10.1f} ms  {name}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
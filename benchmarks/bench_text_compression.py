@@ -0,0 +1,90 @@
+"""
+Size and read throughput of the speech text stored plain and compressed, with and without a trained dictionary.
+Sample corpus is generated by the local stand-in of the government website, its vocabulary is much smaller than
+the one of real speeches, so use --local-mongo for numbers representative for the database.
+
+    python -m benchmarks.bench_text_compression --politicians 100
+    python -m benchmarks.bench_text_compression --local-mongo --sample 20000
+"""
+
+import argparse
+import random
+import time
+from urllib.parse import parse_qsl
+
+from src.scraping import parsing
+from src.utils.compression import TextCompressor, DEFAULT_CODEC
+from benchmarks.fixture_site import FixtureSite
+
+
+def fixture_corpus(politicians):
+    site = FixtureSite(politicians=politicians)
+    return [parsing.parse_speech_text(site.stenogram(dict(parse_qsl(url.split("?")[1]))).encode("utf-8"))
+            for number in range(1, politicians + 1) for _, url in site._speeches(number)]
+
+
+def database_corpus(sample):
+    import src.mongo.mongo_setup as mongo_setup
+    from src.mongo import Speech
+    from src.mongo.schemas import speech_text, TEXT_FIELDS
+
+    mongo_setup.global_init()
+    return [speech_text(document) for document in Speech._get_collection().aggregate(
+        [{'$sample': {'size': sample}}, {'$project': TEXT_FIELDS}])]
+
+
+def measure(name, compressor, texts):
+    """
+    Returns: Stored size and compression and read throughput of the texts
+    """
+    start = time.perf_counter()
+    stored = [compressor.compress(text) if compressor else text.encode("utf-8") for text in texts]
+    write_seconds = time.perf_counter() - start
+
+    # Plain text is only decoded from UTF-8, like it is decoded from BSON
+    decode = compressor.decompress if compressor else lambda data: data.decode("utf-8")
+    start = time.perf_counter()
+    for data in stored:
+        decode(data)
+    read_seconds = time.perf_counter() - start
+
+    text_bytes = sum(len(text.encode("utf-8")) for text in texts)
+    stored_bytes = sum(len(data) for data in stored)
+    return {"storage": name,
+            "dictionary KB": len(compressor.dictionary) / 1024 if compressor else 0.0,
+            "stored MB": stored_bytes / 1024 ** 2,
+            "ratio": text_bytes / stored_bytes,
+            "write MB/s": text_bytes / 1024 ** 2 / write_seconds,
+            "read MB/s": text_bytes / 1024 ** 2 / read_seconds,
+            "speeches/s": len(texts) / read_seconds}
+
+
+def main(command_line=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--politicians', type=int, default=100, help="Size of the generated corpus")
+    parser.add_argument('--local-mongo', action='store_true', help="Sample speeches from the local mongo server")
+    parser.add_argument('--sample', type=int, default=10000, help="Number of speeches sampled from the database")
+    parser.add_argument('--train', type=int, default=2000, help="Number of speeches the dictionary is trained on")
+    args = parser.parse_args(command_line)
+
+    texts = database_corpus(args.sample) if args.local_mongo else fixture_corpus(args.politicians)
+    random.Random(0).shuffle(texts)
+    training, texts = texts[:args.train], texts[args.train:] or texts
+
+    codecs = ["zlib"] + (["zstd"] if DEFAULT_CODEC == "zstd" else [])
+    results = [measure("plain", None, texts)]
+    for codec in codecs:
+        results.append(measure(codec, TextCompressor(codec=codec), texts))
+        results.append(measure(f"{codec} + dictionary", TextCompressor.train(training, codec=codec), texts))
+
+    print(f"{len(texts)} speeches, {sum(map(len, texts)) / len(texts):.0f} characters on average, "
+          f"dictionaries trained on {len(training)} other speeches")
+    columns = list(results[0])
+    print(" | ".join(f"{column:>17}" for column in columns))
+    for result in results:
+        print(" | ".join(f"{value:>17.2f}" if isinstance(value, float) else f"{value:>17}"
+                         for value in result.values()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""
+Local stand-in of the sejm.gov.pl website serving synthetic speeches listings, stenograms and politician profiles.
+It lets us run the scrapers end to end without touching the real website.
+"""
+
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIRST_NAMES = ["Jan", "Anna", "Piotr", "Maria", "Krzysztof", "Katarzyna", "Andrzej", "Małgorzata", "Tomasz",
+               "Agnieszka", "Paweł", "Barbara", "Michał", "Ewa", "Marcin", "Elżbieta"]
+SURNAMES = ["Nowak", "Kowalski", "Wiśniewski", "Wójcik", "Kowalczyk", "Kamiński", "Lewandowski", "Zieliński",
+            "Szymański", "Woźniak", "Dąbrowski", "Kozłowski", "Jankowski", "Mazur", "Kwiatkowski", "Krawczyk"]
+GROUPS = ["Klub Parlamentarny A", "Klub Parlamentarny B", "Koło Poselskie C"]
+WORDS = ("panie marszałku wysoka izbo projekt ustawy dotyczy zmiany przepisów podatku dochodowego od osób "
+         "fizycznych komisja proponuje przyjęcie poprawek rząd budżet państwa samorząd dziękuję").split()
+
+
+class FixtureServer(ThreadingHTTPServer):
+    # Benchmarks open more connections at once than the default backlog of 5, which would be refused
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class FixtureSite:
+    """
+    Threaded HTTP server generating deterministic pages in the format of the government website.
+    Use it as a context manager, scrapers should get root_url(government_n) as their root url.
+    """
+
+    def __init__(self, politicians=20, speeches_per_politician=30, hidden_politicians=2, page_size=20,
+                 latency=0.0, jitter=0.0, error_rate=0.0, capacity=None, truncate_rate=0.0, seed=0):
+        """
+        Args:
+            politicians (int): number of politicians listed on the website
+            speeches_per_politician (int): average number of speeches of a single politician
+            hidden_politicians (int): politicians with profiles that are missing on the politicians listing
+            page_size (int): number of speeches on a single listing page
+            latency (float): delay of every response in seconds
+            jitter (float): maximum random delay added to the latency in seconds
+            error_rate (float): fraction of requests answered with 503 Service Unavailable
+            capacity (int): number of requests handled at once. Requests above it are answered with 503
+            truncate_rate (float): fraction of stenograms cut before the text of the speech, like by an overloaded
+                server
+            seed (int): seed of the generated content
+        """
+        self.politicians = politicians
+        self.speeches_per_politician = speeches_per_politician
+        self.hidden_politicians = hidden_politicians
+        self.page_size = page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self.truncate_rate = truncate_rate
+        self.seed = seed
+
+        self.requests = Counter()
+        self.bytes_sent = 0
+        self.throttled = 0
+        self.truncated = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = FixtureServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def root_url(self, government_n=9):
+        return f"http://127.0.0.1:{self._server.server_port}/sejm{government_n}.nsf/"
+
+    @property
+    def total_speeches(self):
+        return sum(self._speeches_count(number) for number in range(1, self.politicians + 1))
+
+    def handle(self, request):
+        with self._lock:
+            self.in_flight += 1
+            overloaded = self.capacity is not None and self.in_flight > self.capacity
+            self.throttled += overloaded
+        try:
+            if overloaded:
+                request.send_response(503)
+                request.send_header("Content-Length", "0")
+                request.end_headers()
+            else:
+                self._respond(request)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _respond(self, request):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+        url = urlsplit(request.path)
+        page = url.path.rsplit("/", 1)[-1]
+        with self._lock:
+            self.requests[page] += 1
+
+        if self.error_rate and random.random() < self.error_rate:
+            request.send_response(503)
+            request.send_header("Content-Length", "0")
+            request.end_headers()
+            return
+
+        render = {"wypowiedzi.xsp": self.speeches_listing,
+                  "wypowiedz.xsp": self.stenogram,
+                  "poslowie.xsp": self.politicians_listing,
+                  "posel.xsp": self.profile}.get(page)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        body = render(query).encode("utf-8") if render else None
+
+        if body is None:
+            request.send_response(404)
+            request.send_header("Content-Length", "0")
+            request.end_headers()
+            return
+
+        if page == "wypowiedz.xsp" and self.truncate_rate and random.random() < self.truncate_rate:
+            body = body[:body.index(b'<div class="stenogram"')]
+            with self._lock:
+                self.truncated += 1
+
+        request.send_response(200)
+        request.send_header("Content-Type", "text/html; charset=utf-8")
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+        with self._lock:
+            self.bytes_sent += len(body)
+
+    # Content
+
+    def _name(self, number):
+        rng = random.Random(f"{self.seed}-name-{number}")
+        return f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}{number}"
+
+    def _speeches_count(self, number):
+        rng = random.Random(f"{self.seed}-count-{number}")
+        # A few very active politicians create the long tail of a real crawl
+        return int(rng.paretovariate(2) * self.speeches_per_politician / 2)
+
+    def _speeches(self, number):
+        first_sitting = date(2019, 11, 12)
+        return [(first_sitting + timedelta(days=2 * n),
+                 f"wypowiedz.xsp?posiedzenie={n // 5 + 1}&wyp={n}&id={number:03d}")
+                for n in reversed(range(self._speeches_count(number)))]
+
+    @staticmethod
+    def _page(title, body):
+        return (f'<!DOCTYPE html>\n<html lang="pl">\n<head><meta charset="utf-8"><title>{title}</title></head>\n'
+                f'<body>\n<ul class="menu"><li><a href="poslowie.xsp?type=A">Posłowie</a></li></ul>\n{body}\n'
+                f'</body>\n</html>\n')
+
+    def speeches_listing(self, query):
+        if query.get("view") == "3":
+            politicians = "".join(
+                f'<li><a href="?symbol=WYPOWIEDZI_POSLA&amp;id={number:03d}&amp;view=2">'
+                f'{" ".join(reversed(self._name(number).split(" ")))}</a></li>'
+                for number in range(1, self.politicians + 1))
+            return self._page("Wypowiedzi posłów", f'<ul class="category-list">{politicians}</ul>')
+
+        number = int(query["id"])
+        if not 0 < number <= self.politicians:
+            return None
+
+        speeches = self._speeches(number)
+        pages = max(1, -(-len(speeches) // self.page_size))
+        page = int(query.get("page", 1))
+
+        pagination = ""
+        if pages > 1:
+            link = f'?symbol=WYPOWIEDZI_POSLA&amp;id={number:03d}&amp;page='
+            pagination = ('<ul class="pagination">'
+                          f'<li class="prev"><a href="{link}{max(1, page - 1)}">«</a></li>'
+                          + "".join(f'<li><a href="{link}{n}">{n}</a></li>' for n in range(1, pages + 1))
+                          + f'<li class="next"><a href="{link}{min(pages, page + 1)}">»</a></li></ul>')
+
+        rows = "".join(f'<tr>\n<td class="nobr">{speech_date.isoformat()}</td>\n<td>posiedzenie Sejmu</td>\n'
+                       f'<td><a href="{speech_url}">Punkt porządku dziennego</a></td>\n<td>punkt</td>\n</tr>\n'
+                       for speech_date, speech_url in speeches[(page - 1) * self.page_size:page * self.page_size])
+        table = ('<table class="table border-bottom lista-wyp">\n'
+                 f'<tr><th>Data</th><th>Posiedzenie</th><th>Temat</th><th>Punkt</th></tr>\n{rows}</table>')
+        return self._page(self._name(number), f'<h1>{self._name(number)}</h1>\n{pagination}\n{table}')
+
+    def stenogram(self, query):
+        rng = random.Random(f"{self.seed}-speech-{query.get('id')}-{query.get('wyp')}")
+        name = self._name(int(query.get("id", 0)))
+        paragraphs = "".join(f"<p>{' '.join(rng.choices(WORDS, k=rng.randint(20, 120))).capitalize()}.\r\n</p>\r\n"
+                             for _ in range(rng.randint(1, 6)))
+        return self._page("Wypowiedź", f'<div class="stenogram">\r\n<h2 class="mowca">Poseł {name}:</h2>\r\n'
+                                       f'<p>Poseł {name}:</p>\r\n{paragraphs}<p>(Oklaski)</p>\r\n</div>')
+
+    def politicians_listing(self, query):
+        links = "\n".join(f'<li><a href="posel.xsp?id={number:03d}&amp;type=A">{self._name(number)}</a></li>'
+                          for number in range(1, self.politicians + 1))
+        return self._page("Posłowie", f'<ul class="deputies">\n{links}\n</ul>\n<a href="kontakt.xsp">Kontakt</a>')
+
+    def profile(self, query):
+        number = int(query["id"])
+        if not 0 < number <= self.politicians + self.hidden_politicians:
+            return self._page("Poseł", '<div id="title_content"><h1></h1></div>')
+
+        rng = random.Random(f"{self.seed}-profile-{number}")
+        name = self._name(number)
+        birth = date(1950, 1, 1) + timedelta(days=rng.randint(0, 15000))
+        fields = [("Wybrana dnia" if name.split(" ")[0].endswith("a") else "Wybrany dnia", "13-10-2019"),
+                  ("Lista", "Komitet Wyborczy"),
+                  ("Okręg wyborczy", f"{rng.randint(1, 41)}\xa0\xa0Warszawa"),
+                  ("Liczba głosów", str(rng.randint(1000, 400000))),
+                  ("Ślubowanie", "12-11-2019"),
+                  ("Staż parlamentarny", "poseł VIII kadencji"),
+                  ("Klub/koło", rng.choice(GROUPS))]
+        cv = [("Data i miejsce urodzenia", f"{birth.strftime('%d-%m-%Y')}, Warszawa"),
+              ("Wykształcenie", "wyższe"),
+              ("Zawód", "ekonomista")]
+        data = lambda values: '<ul class="data">' + "".join(
+            f'<li><p class="left">{key}:</p><p class="right">{value}</p></li>' for key, value in values) + '</ul>'
+        return self._page(name, f'<div id="title_content"><h1>{name}</h1></div>\n'
+                                f'<div class="partia">{data(fields)}</div>\n<div class="cv">{data(cv)}</div>\n'
+                                f'<div class="kontakt"><p id="PoselEmail">E-mail:</p>'
+                                f'<span><a href="#posel{number} A T sejm D O T pl">napisz</a></span></div>')
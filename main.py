@@ -1,23 +1,29 @@
 import argparse
+import cProfile
 import logging
-from logging import config
-from src.scraping.scraping import PoliticiansScraper, SpeechesScraper
-import src.mongo.mongo_setup as mongo_setup
+import os
+import pathlib
+import pstats
+import sys
+import threading
 from ast import literal_eval
-from src.utils import get_project_structure
+from contextlib import contextmanager
+from datetime import datetime
+from logging import config
+from src.utils import get_project_structure, int_to_roman, parse_date, Archive, METRICS
 
-STRUCTURE = get_project_structure()
+# Modules of the subcommands import the scraping, database and text processing libraries, so they are imported
+# only by the subcommand that uses them. Help and argument errors are shown without loading them.
 
 
 def main(command_line=None):
-    # Load logging configuration
-    logging.config.fileConfig(STRUCTURE['root'].joinpath("logging.ini"),
-                              defaults={'logfilename': str(STRUCTURE["log_folder"])})
-
-    # Connecting to database
-    mongo_setup.global_init()
-
     parser = argparse.ArgumentParser(command_line)
+    parser.add_argument('--mongo_host', default=os.environ.get("THC_MONGO_HOST"),
+                        help="Mongo server address or connection string. Defaults to the THC_MONGO_HOST environment "
+                             "variable or the local server")
+    parser.add_argument('--mongo_pool_size', type=int, default=os.environ.get("THC_MONGO_POOL_SIZE"),
+                        help="Maximum number of connections to the database. Defaults to the THC_MONGO_POOL_SIZE "
+                             "environment variable or the pymongo default")
     subparsers = parser.add_subparsers()
 
     scrape_parser = subparsers.add_parser("scrape", help="Scraping data from the government website."
@@ -26,16 +32,132 @@ def main(command_line=None):
     scrape_parser.add_argument('action', help="politicians / speeches / all")
     scrape_parser.add_argument('-s', '--scraper_arg', required=False, nargs=2, action='append',
                                help='argument for the scraper class. You can change the government cadence number '
-                                    '[government_n], and local_backup boolean flag')
+                                    '[government_n] (a number or a list). [local_backup] True streams results into '
+                                    'the archive in the backup folder. HTTP client can be tuned with '
+                                    '[max_connections], [max_per_host], [timeout] and [retries]. Requests in flight '
+                                    'adapt to the website between [min_connections] and [max_connections], responses '
+                                    'slower than [latency_target] seconds count as errors and [max_rps] caps requests '
+                                    'per second. Downloaded pages are cached in the backup folder unless [use_cache] '
+                                    'is False, [offline] True replays them without touching the network. Speeches '
+                                    'scraper keeps results in memory unless [retain_results] is False. Politicians '
+                                    'scraper updates changed profiles of known politicians if [refresh] is True')
 
+    scrape_parser.add_argument('-c', '--cadences', type=parse_cadences, required=False,
+                               help="Government cadences scraped in one run, e.g. 7-10 or 8,9. Connections, cache and "
+                                    "politicians lookup are shared between them. Overrides [government_n]")
+    scrape_parser.add_argument('-w', '--workers', type=int, required=False,
+                               help="Number of threads downloading pages. Defaults to the connection limit")
+    scrape_parser.add_argument('--metrics', choices=['json', 'prometheus'], default='json',
+                               help="Format of the run metrics saved in the logs folder")
+    scrape_parser.add_argument('--profile', action='store_true',
+                               help="Save cProfile statistics of the run in the logs folder")
     scrape_parser.set_defaults(which="scrape")
 
-    for subparser in [scrape_parser]:
+    migrate_parser = subparsers.add_parser("migrate", help="One-shot migrations of the data in the database.")
+    migrate_parser.add_argument('migration', choices=['speeches', 'speech_stats', 'insert_times', 'compress_text'],
+                                help="speeches - move speeches embedded in politicians to their own collection, "
+                                     "speech_stats - recalculate last speech date and speeches count of politicians, "
+                                     "insert_times - store insert time of speeches inserted without it, "
+                                     "compress_text - compress text of processed speeches with a trained dictionary")
+    migrate_parser.add_argument('--sample_size', type=int, default=2000,
+                                help="Number of speeches the compression dictionary is trained on")
+    migrate_parser.add_argument('--retrain', action='store_true',
+                                help="Train a new compression dictionary for the speeches compressed in this run")
+    migrate_parser.set_defaults(which="migrate")
+
+    restore_parser = subparsers.add_parser("restore", help="Inserting data from the local backup archive into the "
+                                                           "database.")
+    restore_parser.add_argument('data', choices=['politicians', 'speeches', 'all'],
+                                help="Archive written by scrapers run with [local_backup] True")
+    restore_parser.add_argument('-c', '--cadences', type=parse_cadences, default=[9],
+                                help="Government cadences which archives are restored, e.g. 7-10 or 8,9")
+    restore_parser.set_defaults(which="restore")
+
+    process_parser = subparsers.add_parser("process", help="Normalizing, tokenizing and lemmatizing text of the "
+                                                           "speeches that were not processed yet.")
+    process_parser.add_argument('-p', '--processes', type=int, required=False,
+                                help="Number of processes. Defaults to the number of cores")
+    process_parser.add_argument('--batch_size', type=int, default=1000,
+                                help="Number of speeches processed and written at once")
+    process_parser.add_argument('--reprocess', action='store_true', help="Process again all speeches")
+    process_parser.set_defaults(which="process")
+
+    search_parser = subparsers.add_parser("search", help="Full-text search of the speeches.")
+    search_parser.add_argument('query', help='Keywords, "phrases in double quotes" and -excluded words')
+    search_parser.add_argument('-p', '--politician', required=False, help="Name of the speech author")
+    search_parser.add_argument('--party', required=False, help="Political group of the speech author")
+    search_parser.add_argument('--date_from', type=parse_date, required=False, help="Earliest date of the speech")
+    search_parser.add_argument('--date_to', type=parse_date, required=False, help="Latest date of the speech")
+    search_parser.add_argument('-c', '--cadence', type=int, required=False, help="Government cadence of the speech")
+    search_parser.add_argument('-n', '--limit', type=int, default=20, help="Maximum number of results")
+    search_parser.set_defaults(which="search")
+
+    export_parser = subparsers.add_parser("export", help="Exporting speeches with politician data into Parquet or "
+                                                         "Arrow files partitioned by cadence and month.")
+    export_parser.add_argument('-c', '--cadences', type=parse_cadences, required=False,
+                               help="Government cadences of the exported speeches, e.g. 7-10 or 8,9. Defaults to all")
+    export_parser.add_argument('-f', '--folder', required=False,
+                               help="Destination folder. Defaults to the export folder in the backup folder")
+    export_parser.add_argument('--format', choices=['parquet', 'arrow'], default='parquet')
+    export_parser.add_argument('--full', action='store_true',
+                               help="Export all speeches, not only the ones added since the last export")
+    export_parser.set_defaults(which="export")
+
+    stats_parser = subparsers.add_parser("stats", help="Reports on the speeches computed by the database.")
+    stats_parser.add_argument('report', choices=['parties', 'politicians'],
+                              help="parties - speeches and their length per political group and period, "
+                                   "politicians - number, length and dates of the speeches per politician")
+    stats_parser.add_argument('-c', '--cadences', type=parse_cadences, required=False,
+                              help="Government cadences of the speeches, e.g. 7-10 or 8,9. Defaults to all")
+    stats_parser.add_argument('--period', choices=['day', 'month', 'year'], default='month',
+                              help="Period the speeches of political groups are counted in")
+    stats_parser.add_argument('-n', '--limit', type=int, required=False, help="Maximum number of printed rows")
+    stats_parser.add_argument('--csv', required=False, help="Save the whole report into the csv file")
+    stats_parser.add_argument('--refresh', action='store_true',
+                              help="Compute the report again, even if no data was added since it was cached")
+    stats_parser.set_defaults(which="stats")
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="Adding speeches listings of politicians to the queue of "
+                                                           "jobs processed by workers.")
+    enqueue_parser.add_argument('-c', '--cadences', type=parse_cadences, required=False,
+                                help="Government cadences which politicians are queued, e.g. 7-10 or 8,9")
+    enqueue_parser.set_defaults(which="enqueue")
+
+    worker_parser = subparsers.add_parser("worker", help="Processing queued jobs. Many workers can run at once, "
+                                                         "also on different machines.")
+    worker_parser.add_argument('-w', '--workers', type=int, default=4, help="Number of threads processing jobs")
+    worker_parser.add_argument('--lease', type=int, default=300,
+                               help="Seconds after which job of a worker that stopped responding is processed again")
+    worker_parser.add_argument('--max_attempts', type=int, default=5, help="Number of attempts of a failing job")
+    worker_parser.add_argument('--poll', type=float, default=5,
+                               help="Seconds between checks of the queue when remaining jobs are taken by others")
+    worker_parser.set_defaults(which="worker")
+
+    for subparser in [enqueue_parser, worker_parser]:
+        subparser.add_argument('-s', '--scraper_arg', required=False, nargs=2, action='append',
+                               help="argument for the scraper class, e.g. [name_filter], [only_new] or the HTTP "
+                                    "client settings")
+
+    for subparser in [scrape_parser, migrate_parser, restore_parser, process_parser, search_parser, export_parser,
+                      stats_parser, enqueue_parser, worker_parser]:
         getattr(subparser, 'add_argument')('-l', '--logging',
                                            choices=['debug', 'info', 'warning', 'error', 'critical'],
                                            default='info',
                                            help="Specify main logger logging level on StreamHandler")
     args = parser.parse_args(command_line)
+    if not hasattr(args, "which"):
+        parser.print_help()
+        return
+
+    # Load logging configuration
+    structure = get_project_structure()
+    structure["log_folder"].mkdir(parents=True, exist_ok=True)
+    logging.config.fileConfig(structure['root'].joinpath("logging.ini"),
+                              defaults={'logfilename': str(structure["log_folder"])})
+
+    # Registering connection to the database, it is opened on the first query
+    import src.mongo.mongo_setup as mongo_setup
+    mongo_setup.global_init(host=args.mongo_host, max_pool_size=args.mongo_pool_size)
 
     # Updating main logger logging level
     log_level = getattr(logging, args.logging.upper())
@@ -46,23 +168,212 @@ def main(command_line=None):
     main_log.setLevel(log_level)
 
     if args.which == "scrape":
+        METRICS.reset()
+        with profiled(args.profile):
+            scrape(args)
+        metrics_file = METRICS.export(structure["log_folder"], args.metrics)
+        main_log.info(f"Metrics of the run saved to {metrics_file}")
+
+    if args.which == "migrate":
+        import src.mongo.utils as dbutils
+
+        if args.migration == "speeches":
+            migrated = dbutils.migrate_embedded_speeches()
+            main_log.info(f"{migrated} speeches moved to the speeches collection.")
+
+        if args.migration == "speech_stats":
+            updated = dbutils.backfill_speech_stats()
+            main_log.info(f"Speeches statistics of {updated} politicians recalculated.")
+
+        if args.migration == "insert_times":
+            stamped = dbutils.stamp_speech_insert_times()
+            main_log.info(f"Insert time of {stamped} speeches stored.")
+
+        if args.migration == "compress_text":
+            compressed = dbutils.compress_speeches(sample_size=args.sample_size, retrain=args.retrain)
+            main_log.info(f"Text of {compressed} speeches compressed.")
+
+    if args.which == "restore":
+        import src.mongo.utils as dbutils
+        archive_folder = structure['backup'].joinpath("archive")
+        resolver = dbutils.PoliticianResolver(args.cadences)
+        for government_n in args.cadences:
+            if args.data == "politicians" or args.data == "all":
+                inserted, updated = dbutils.restore_politicians(Archive(archive_folder, f"politicians_{government_n}"),
+                                                                resolver=resolver)
+                main_log.info(f"{inserted} politicians inserted and {updated} updated from the archive.")
+
+            if args.data == "speeches" or args.data == "all":
+                restored = dbutils.restore_speeches(Archive(archive_folder, f"speeches_{government_n}"),
+                                                    resolver=resolver)
+                main_log.info(f"{restored} speeches restored from the archive.")
+
+    if args.which == "process":
+        from src.processing import process_speeches
+        processed = process_speeches(processes=args.processes, batch_size=args.batch_size, reprocess=args.reprocess)
+        main_log.info(f"{processed} speeches processed.")
 
-        scraper_args = {'government_n': 9,
-                        'to_database': True,
-                        'name_filter': None,
-                        'only_new': True}
+    if args.which == "search":
+        import src.mongo.utils as dbutils
+        results = dbutils.search_speeches(args.query, politician=args.politician, party=args.party,
+                                          date_from=args.date_from, date_to=args.date_to, cadence=args.cadence,
+                                          limit=args.limit)
+        for result in results:
+            print(f"{result['score']:6.2f}  {result['date']:%Y-%m-%d}  {result['politician_name']}\n"
+                  f"        {result['snippet']}\n")
+        main_log.info(f"{len(results)} speeches found.")
 
-        if args.scraper_arg:
-            passed_scraper_args = {arg: literal_eval(value) for arg, value in args.scraper_arg}
-            scraper_args.update(passed_scraper_args)
+    if args.which == "export":
+        import src.mongo.utils as dbutils
+        folder = pathlib.Path(args.folder) if args.folder else structure['backup'].joinpath("export")
+        exported = dbutils.export_speeches(folder, cadences=args.cadences, fmt=args.format, incremental=not args.full)
+        main_log.info(f"{exported} speeches exported to {folder}.")
 
-        if args.action == "politicians" or args.action == "all":
-            ps = PoliticiansScraper(**scraper_args)
+    if args.which == "stats":
+        from src.mongo.utils.analytics import SpeechAnalytics
+        analytics = SpeechAnalytics(cache_folder=structure['backup'].joinpath("analytics"))
+        if args.report == "parties":
+            report = analytics.speeches_per_party(period=args.period, cadences=args.cadences, refresh=args.refresh)
+            table = report.fillna({'party': "-"}).pivot_table(index="period", columns="party", values="speeches",
+                                                              aggfunc="sum", fill_value=0)
+        else:
+            report = analytics.speeches_per_politician(cadences=args.cadences, refresh=args.refresh)
+            table = report.drop(columns="politician_id")
+
+        print(table.head(args.limit).to_string() if args.limit else table.to_string())
+        if args.csv:
+            report.to_csv(args.csv, index=False)
+            main_log.info(f"Report saved to {args.csv}")
+
+    if args.which == "enqueue":
+        import src.mongo.utils as dbutils
+        from src.scraping.worker import enqueue_politicians
+        cadences, scraper_args = scraper_arguments(args)
+        queue = dbutils.JobQueue()
+        for government_n in cadences:
+            queued = enqueue_politicians(queue, government_n, fetcher=scraper_args['fetcher'],
+                                         name_filter=scraper_args['name_filter'])
+            main_log.info(f"{queued} speeches listings of the {int_to_roman(government_n)} cadence queued.")
+
+    if args.which == "worker":
+        import src.mongo.utils as dbutils
+        from src.scraping.worker import QueueWorker
+        _, scraper_args = scraper_arguments(args)
+        scraper_args.pop('to_database')
+        queue = dbutils.JobQueue(lease_seconds=args.lease, max_attempts=args.max_attempts)
+        QueueWorker(queue, poll_interval=args.poll, **scraper_args).run()
+
+
+def scrape(args):
+    from src.scraping.scraping import PoliticiansScraper, SpeechesScraper
+
+    cadences, scraper_args = scraper_arguments(args)
+
+    main_log = logging.getLogger("main")
+    if args.action == "politicians" or args.action == "all":
+        for government_n in cadences:
+            main_log.info(f"Scraping politicians of the {int_to_roman(government_n)} cadence.")
+            ps = PoliticiansScraper(government_n=government_n, **scraper_args)
             ps.scrape_politicians()
 
-        if args.action == "speeches" or args.action == "all":
-            ss = SpeechesScraper(**scraper_args)
-            ss.scrape_politician_speeches()
+    if args.action == "speeches" or args.action == "all":
+        # Speeches of all cadences share the download workers and the database writer
+        main_log.info(f"Scraping speeches of the {', '.join(map(int_to_roman, cadences))} "
+                      f"cadence{'s' if len(cadences) > 1 else ''}.")
+        SpeechesScraper.scrape_cadences([SpeechesScraper(government_n=government_n, **scraper_args)
+                                         for government_n in cadences])
+
+
+def scraper_arguments(args):
+    """
+    Returns: List of cadences and arguments of the scrapers, with fetcher and politicians resolver shared by them
+    """
+    import src.mongo.utils as dbutils
+    from src.scraping.cache import ResponseCache
+    from src.scraping.fetching import Fetcher
+
+    scraper_args = {'government_n': 9,
+                    'to_database': True,
+                    'name_filter': None,
+                    'only_new': True,
+                    'use_cache': True,
+                    'offline': False}
+
+    if args.scraper_arg:
+        passed_scraper_args = {arg: literal_eval(value) for arg, value in args.scraper_arg}
+        scraper_args.update(passed_scraper_args)
+
+    if getattr(args, 'workers', None):
+        scraper_args['workers'] = args.workers
+
+    government_n = scraper_args.pop('government_n')
+    if not (cadences := getattr(args, 'cadences', None)):
+        cadences = [government_n] if isinstance(government_n, int) else list(government_n)
+
+    # Both scrapers share a single connection pool
+    fetcher_args = {arg: scraper_args.pop(arg)
+                    for arg in ('max_connections', 'max_per_host', 'timeout', 'retries', 'max_rps', 'min_connections',
+                                'latency_target')
+                    if arg in scraper_args}
+    use_cache, offline = scraper_args.pop('use_cache'), scraper_args.pop('offline')
+    if use_cache or offline:
+        cache_folder = get_project_structure()['backup'].joinpath("http_cache")
+        fetcher_args['cache'] = ResponseCache(cache_folder, offline=offline)
+    scraper_args['fetcher'] = Fetcher(**fetcher_args)
+
+    # Politicians of all cadences are looked up in one index, that is updated by politicians scrapers
+    if scraper_args['to_database'] or scraper_args['only_new']:
+        scraper_args['resolver'] = dbutils.PoliticianResolver(cadences)
+
+    return cadences, scraper_args
+
+
+def parse_cadences(value):
+    """
+    Args:
+        value: comma separated cadence numbers or ranges, e.g. "7-9,10"
+    Returns: Sorted list of cadence numbers
+    """
+    cadences = set()
+    for part in value.split(","):
+        first, _, last = part.partition("-")
+        cadences.update(range(int(first), int(last or first) + 1))
+    return sorted(cadences)
+
+
+@contextmanager
+def profiled(enabled):
+    """
+    Captures cProfile statistics of the code run inside the context, including the worker threads it starts,
+    and saves them in the logs folder
+    """
+    if not enabled:
+        yield
+        return
+
+    profilers = [cProfile.Profile()]
+
+    def profile_thread(*args):
+        sys.setprofile(None)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # Profiler of the main thread already covers all threads
+            return
+        profilers.append(profiler)
+
+    threading.setprofile(profile_thread)
+    profilers[0].enable()
+    try:
+        yield
+    finally:
+        profilers[0].disable()
+        threading.setprofile(None)
+
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        profile_file = get_project_structure()["log_folder"].joinpath(f"profile-{stamp}.prof")
+        pstats.Stats(*profilers).dump_stats(profile_file)
+        logging.getLogger("main").info(f"Profile of the run saved to {profile_file}")
 
 
 if __name__ == '__main__':
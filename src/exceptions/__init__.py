@@ -1,2 +1,2 @@
-from .exceptions import NoPoliticianFound
+from .exceptions import NoPoliticianFound, CacheMiss
 from .warnings import DuplicatedNameWarning
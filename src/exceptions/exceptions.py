@@ -5,3 +5,7 @@ In this module, we will create all custom exceptions used across whole project
 
 class NoPoliticianFound(LookupError):
     pass
+
+
+class CacheMiss(LookupError):
+    pass
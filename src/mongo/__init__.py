@@ -1 +1 @@
-from .schemas import Politician, Speech
+from .schemas import Politician, Speech, ScrapeJob, TextDictionary
@@ -1,5 +1,31 @@
+import os
+
 import mongoengine
 
+DEFAULT_HOST = 'mongodb://localhost:27017'
+
+
+def global_init(mock=False, host=None, max_pool_size=None):
+    """
+    Registers connection to the database. Client is created by mongoengine on the first query, so registering
+    the connection doesn't wait for the server.
+    Args:
+        mock (bool): use in-memory mongomock database instead of the mongo server
+        host (str): mongo server address or connection string. Defaults to the THC_MONGO_HOST environment variable
+            or the local server
+        max_pool_size (int): maximum number of connections kept by the client. Defaults to the THC_MONGO_POOL_SIZE
+            environment variable or the pymongo default
+    """
+    if mock:
+        import mongomock
+        mongoengine.register_connection(alias="core", name="THC", host='mongodb://localhost',
+                                        mongo_client_class=mongomock.MongoClient)
+        return
+
+    host = host or os.environ.get("THC_MONGO_HOST", DEFAULT_HOST)
+    max_pool_size = max_pool_size or os.environ.get("THC_MONGO_POOL_SIZE")
 
-def global_init():
-    mongoengine.register_connection(alias="core", name="THC", host='mongodb://localhost:27017')
\ No newline at end of file
+    client_args = {'connect': False}
+    if max_pool_size:
+        client_args['maxPoolSize'] = int(max_pool_size)
+    mongoengine.register_connection(alias="core", name="THC", host=host, **client_args)
@@ -1,5 +1,7 @@
 # Last date of speech per politician
-db.politicians.aggregate([
-    {$unwind: "$speeches"},
-    {$group: {_id: '$name', last_speech: {$max: "$speeches.date"}}}
-])
\ No newline at end of file
+db.politicians.find({last_speech_date: {$ne: null}}, {_id: 0, hash: 1, last_speech_date: 1})
+
+# Recalculating last date of speech and number of speeches per politician
+db.speeches.aggregate([
+    {$group: {_id: '$politician_id', last_speech: {$max: "$date"}, speech_count: {$sum: 1}}}
+])
@@ -1,2 +1,4 @@
 from .politician import Politician
-from .speech import Speech
+from .speech import Speech, speech_text, TEXT_FIELDS
+from .text_dictionary import TextDictionary
+from .scrape_job import ScrapeJob
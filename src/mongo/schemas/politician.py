@@ -1,5 +1,4 @@
 import mongoengine as me
-from .speech import Speech
 from hashlib import blake2b
 
 
@@ -21,6 +20,7 @@ class Politician(me.Document):
 
     election_date = me.DateTimeField()
     oath_date = me.DateTimeField()
+    resign_date = me.DateTimeField()
     date_of_birth = me.DateTimeField(required=True)
     age = me.IntField()
 
@@ -29,13 +29,25 @@ class Politician(me.Document):
 
     parliment_member = me.ListField()
 
+    # Kept up to date by the speeches insert path, so incremental crawls don't scan the speeches collection
+    last_speech_date = me.DateTimeField()
+    last_speech_dates = me.DictField()  # cadence in roman numerals -> date of the last speech in the cadence
+    speech_count = me.IntField(default=0)
+
     email = me.EmailField()
 
-    speeches = me.EmbeddedDocumentListField(Speech)
+    # Digest of the scraped profile, unchanged profiles are skipped when politicians are refreshed
+    fingerprint = me.StringField()
 
     meta = {
         'db_alias': 'core',
-        'collection': 'politicians'
+        'collection': 'politicians',
+        'strict': False,  # Documents not migrated yet still contain embedded speeches
+        'indexes': [
+            # Speeches statistics and profiles are updated by hash. Last speech dates are read for all politicians
+            # at once, a scan of the small collection is cheaper than an index on them
+            'hash'
+        ]
     }
 
     def generate_id(self):
@@ -0,0 +1,31 @@
+import mongoengine as me
+
+
+class ScrapeJob(me.Document):
+
+    key = me.StringField(required=True)  # kind, cadence and url of the job
+    kind = me.StringField(required=True, choices=("listing", "speech"))
+    priority = me.IntField(default=0)
+
+    government_n = me.IntField(required=True)
+    politician_name = me.StringField(required=True)
+    url = me.StringField(required=True)
+    speech_date = me.DateTimeField()
+
+    status = me.StringField(default="pending", choices=("pending", "leased", "done", "failed"))
+    attempts = me.IntField(default=0)
+    available_at = me.DateTimeField()
+    lease_owner = me.StringField()
+    lease_expires = me.DateTimeField()
+
+    error = me.StringField()
+    speech_hash = me.StringField()
+
+    meta = {
+        'db_alias': 'core',
+        'collection': 'scrape_jobs',
+        'indexes': [
+            {'fields': ['key'], 'unique': True},
+            ('status', '-priority')
+        ]
+    }
@@ -1,8 +1,16 @@
 import mongoengine as me
+from functools import lru_cache
 from hashlib import blake2b
 
+from src.utils.compression import TextCompressor
+from .text_dictionary import TextDictionary
 
-class Speech(me.EmbeddedDocument):
+# Projection of the fields needed to read the text of the speech with speech_text()
+TEXT_FIELDS = {'raw_text': 1, 'compressed_text': 1, 'text_dictionary': 1}
+TEXT_INDEX = "speech_text"
+
+
+class Speech(me.Document):
 
     hash = me.StringField(required=True)
 
@@ -10,9 +18,87 @@ class Speech(me.EmbeddedDocument):
     politician_name = me.StringField()
 
     date = me.DateTimeField()
-    raw_text = me.StringField(required=True)
+    cadence = me.IntField()
+
+    # Text is kept either as a plain string or compressed with a shared dictionary, see the raw_text property
+    plain_text = me.StringField(db_field='raw_text')
+    compressed_text = me.BinaryField()
+    text_dictionary = me.IntField()
+    text_length = me.IntField()
+
+    # Time of the database server when the speech was inserted, it orders the incremental export
+    inserted_at = me.DateTimeField()
+
+    # Filled by the text processing stage
+    normalized_text = me.StringField()
+    lemmatized_text = me.StringField()
+    token_count = me.IntField()
+    sentence_count = me.IntField()
+    processing_version = me.IntField()
+
+    meta = {
+        'db_alias': 'core',
+        'collection': 'speeches',
+        'indexes': [
+            {'fields': ['hash'], 'unique': True},
+            ('politician_id', 'date'),
+            'inserted_at',
+            # Polish is not supported by the text search, so words are matched without stemming and stop words.
+            # Normalized text stays plain when the raw text is compressed, phrases are found in it
+            {'fields': ['$plain_text', '$normalized_text', '$lemmatized_text'], 'default_language': 'none',
+             'weights': {'raw_text': 1, 'normalized_text': 1, 'lemmatized_text': 2}, 'name': TEXT_INDEX}
+        ]
+    }
+
+    def __init__(self, *args, **values):
+        # Text was a field before it could be compressed, it is still accepted as a keyword
+        raw_text = values.pop('raw_text', None)
+        super().__init__(*args, **values)
+        if raw_text is not None:
+            self.raw_text = raw_text
+
+    @property
+    def raw_text(self):
+        """
+        Full text of the speech. Compressed text is decompressed on the first access.
+        """
+        if self.plain_text is None and self.compressed_text is not None:
+            if getattr(self, "_decompressed_text", None) is None:
+                self._decompressed_text = text_compressor(self.text_dictionary).decompress(self.compressed_text)
+            return self._decompressed_text
+        return self.plain_text
+
+    @raw_text.setter
+    def raw_text(self, text):
+        self.plain_text = text
+        self.compressed_text = self.text_dictionary = self._decompressed_text = None
+        self.text_length = len(text) if text is not None else None
+
+    def clean(self):
+        if self.plain_text is None and self.compressed_text is None:
+            raise me.ValidationError("Speech has no text.")
 
     def generate_id(self):
         bk = blake2b(digest_size=8)
         bk.update(self.raw_text.encode('utf-8'))
         return str(bk.hexdigest())
+
+
+def speech_text(document):
+    """
+    Args:
+        document: speech document read from the collection, with raw_text or compressed_text and text_dictionary
+    Returns: Full text of the speech
+    """
+    if (text := document.get('raw_text')) is not None:
+        return text
+    return text_compressor(document.get('text_dictionary')).decompress(document['compressed_text'])
+
+
+@lru_cache(maxsize=None)
+def text_compressor(number):
+    """
+    Returns: TextCompressor with the dictionary of given number, shared by all speeches compressed with it
+    """
+    dictionary = TextDictionary.objects.get(number=number)
+    return TextCompressor(dictionary.data, codec=dictionary.codec)
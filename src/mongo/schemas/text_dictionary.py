@@ -0,0 +1,16 @@
+import mongoengine as me
+
+
+class TextDictionary(me.Document):
+
+    number = me.IntField(primary_key=True)
+    codec = me.StringField(required=True, choices=("zstd", "zlib"))
+    data = me.BinaryField(required=True)
+
+    samples = me.IntField()  # number of speeches the dictionary was trained on
+    created_at = me.DateTimeField()
+
+    meta = {
+        'db_alias': 'core',
+        'collection': 'text_dictionaries'
+    }
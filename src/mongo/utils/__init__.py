@@ -1,5 +1,15 @@
 from .utils import (find_politician_by_name,
                     create_speech_object,
                     insert_speech_into_db,
+                    insert_speeches_into_db,
                     insert_politician_to_db,
+                    upsert_politicians,
+                    get_politician_fingerprints,
                     get_last_speech_per_politician)
+from .migrations import (migrate_embedded_speeches, backfill_speech_stats, stamp_speech_insert_times,
+                         compress_speeches, restore_speeches, restore_politicians)
+from .resolver import PoliticianResolver
+from .job_queue import JobQueue
+from .export import export_speeches
+from .search import search_speeches
+# analytics module is imported only by the reports, it loads numpy and pandas
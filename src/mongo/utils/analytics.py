@@ -0,0 +1,158 @@
+"""
+Reports on the speeches computed by aggregation pipelines of the database. Grouping, counting and length
+statistics run in the database, so text of the speeches never leaves it. Results are returned as pandas
+DataFrames or NumPy arrays and cached until new speeches or politicians are added.
+"""
+
+import hashlib
+import json
+import logging
+
+from src.mongo.schemas import Politician, Speech
+from src.utils import pickle_obj, read_pickle, METRICS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+PERIODS = {"day": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}
+
+# Length of the speeches stored before text_length was kept is counted by the database
+TEXT_LENGTH = {'$ifNull': ['$text_length', {'$strLenCP': {'$ifNull': ['$raw_text', ""]}}]}
+POLITICIAN_LOOKUP = {'$lookup': {'from': Politician._meta['collection'], 'localField': '_id.politician_id',
+                                 'foreignField': 'hash', 'as': 'politician'}}
+
+
+class SpeechAnalytics:
+    """
+    Reports are cached in memory and, if a cache folder is passed, on disk. Cached report is used as long as
+    the high-water mark of the data doesn't change. Speeches and politicians changed in place, e.g. a politician
+    that changed the political group, are not noticed, use refresh to recompute such reports.
+    """
+
+    def __init__(self, cache_folder=None, as_frame=True):
+        """
+        Args:
+            cache_folder (pathlib.Path): folder of the reports cached between runs. Not cached on disk if not passed
+            as_frame (bool): return reports as pandas DataFrames. Dictionaries of NumPy arrays are returned otherwise
+        """
+        if np is None:
+            raise ImportError("numpy package is required to compute speeches reports")
+        if as_frame and pd is None:
+            raise ImportError("pandas package is required to return speeches reports as DataFrames")
+
+        self.cache_folder = cache_folder
+        self.as_frame = as_frame
+        self.log = logging.getLogger("main.mongo")
+        self._cache = dict()
+
+    def speeches_per_party(self, period="month", cadences=None, refresh=False):
+        """
+        Args:
+            period (str): "day", "month" or "year"
+            cadences (list): cadences of the speeches. All speeches are counted if not passed
+            refresh (bool): compute the report even if it is cached
+        Returns: Number of speeches and characters per political group and period, sorted by period
+        """
+        pipeline = [
+            *self._match(cadences),
+            # Grouping by politician first, so politicians are looked up once per period, not once per speech
+            {'$group': {'_id': {'politician_id': '$politician_id',
+                                'period': {'$dateToString': {'format': PERIODS[period], 'date': '$date'}}},
+                        'speeches': {'$sum': 1}, 'characters': {'$sum': TEXT_LENGTH}}},
+            POLITICIAN_LOOKUP,
+            {'$group': {'_id': {'party': {'$arrayElemAt': ['$politician.political_group', 0]},
+                                'period': '$_id.period'},
+                        'speeches': {'$sum': '$speeches'}, 'characters': {'$sum': '$characters'}}},
+            {'$project': {'_id': 0, 'period': '$_id.period', 'party': '$_id.party', 'speeches': 1, 'characters': 1}},
+            {'$sort': {'period': 1, 'speeches': -1}}
+        ]
+        columns = {'period': object, 'party': object, 'speeches': np.int64, 'characters': np.int64}
+        return self._report("speeches_per_party", dict(period=period, cadences=cadences), pipeline, columns,
+                            refresh)
+
+    def speeches_per_politician(self, cadences=None, refresh=False):
+        """
+        Args:
+            cadences (list): cadences of the speeches. All speeches are counted if not passed
+            refresh (bool): compute the report even if it is cached
+        Returns: Number of speeches, their length statistics, number of words and dates of the first and the last
+            speech per politician, sorted by number of speeches
+        """
+        pipeline = [
+            *self._match(cadences),
+            {'$group': {'_id': {'politician_id': '$politician_id'},
+                        'politician_name': {'$first': '$politician_name'},
+                        'speeches': {'$sum': 1},
+                        'mean_length': {'$avg': TEXT_LENGTH},
+                        'max_length': {'$max': TEXT_LENGTH},
+                        'characters': {'$sum': TEXT_LENGTH},
+                        'tokens': {'$sum': '$token_count'},
+                        'first_speech': {'$min': '$date'},
+                        'last_speech': {'$max': '$date'}}},
+            POLITICIAN_LOOKUP,
+            {'$project': {'_id': 0, 'politician_id': '$_id.politician_id', 'politician_name': 1,
+                          'party': {'$arrayElemAt': ['$politician.political_group', 0]}, 'speeches': 1,
+                          'mean_length': 1, 'max_length': 1, 'characters': 1, 'tokens': 1, 'first_speech': 1,
+                          'last_speech': 1}},
+            {'$sort': {'speeches': -1, 'politician_id': 1}}
+        ]
+        columns = {'politician_id': object, 'politician_name': object, 'party': object, 'speeches': np.int64,
+                   'mean_length': np.float64, 'max_length': np.int64, 'characters': np.int64, 'tokens': np.int64,
+                   'first_speech': 'datetime64[ms]', 'last_speech': 'datetime64[ms]'}
+        return self._report("speeches_per_politician", dict(cadences=cadences), pipeline, columns, refresh)
+
+    @staticmethod
+    def high_water_mark():
+        """
+        Returns: Identifier of the newest document and number of documents of the speeches and politicians
+        """
+        mark = []
+        for collection in (Speech._get_collection(), Politician._get_collection()):
+            newest = collection.find_one({}, {'_id': 1}, sort=[('_id', -1)])
+            mark += [str(newest['_id']) if newest else None, collection.estimated_document_count()]
+        return tuple(mark)
+
+    @staticmethod
+    def _match(cadences):
+        return [{'$match': {'cadence': {'$in': list(cadences)}}}] if cadences else []
+
+    def _report(self, name, params, pipeline, columns, refresh):
+        key = f"{name}-{hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]}"
+        mark = self.high_water_mark()
+
+        if not refresh:
+            if (cached := self._cached(key)) and cached[0] == mark:
+                METRICS.increment("report_cache_hits_total", report=name)
+                return self._result(cached[1])
+
+        with METRICS.timer("db_seconds", operation=name):
+            rows = list(Speech._get_collection().aggregate(pipeline, allowDiskUse=True))
+        arrays = {column: np.array([row.get(column) for row in rows], dtype=dtype)
+                  for column, dtype in columns.items()}
+        self.log.debug(f"Report {name} computed from {len(rows)} groups.")
+
+        self._cache[key] = mark, arrays
+        if self.cache_folder:
+            self.cache_folder.mkdir(parents=True, exist_ok=True)
+            pickle_obj((mark, arrays), self.cache_folder.joinpath(f"{key}.pickle"))
+        return self._result(arrays)
+
+    def _cached(self, key):
+        if key in self._cache:
+            return self._cache[key]
+        if self.cache_folder and (path := self.cache_folder.joinpath(f"{key}.pickle")).exists():
+            return read_pickle(path)
+        return None
+
+    def _result(self, arrays):
+        if self.as_frame:
+            return pd.DataFrame(arrays)
+        return {column: values.copy() for column, values in arrays.items()}
+
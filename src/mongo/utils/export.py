@@ -0,0 +1,141 @@
+"""
+Export of the speeches corpus into columnar files, partitioned by cadence and month of the speech
+"""
+
+import json
+import logging
+from datetime import datetime, timedelta
+
+from src.mongo.schemas import Politician, Speech, speech_text, TEXT_FIELDS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    SCHEMA = pa.schema([('hash', pa.string()),
+                        ('politician_id', pa.string()),
+                        ('politician_name', pa.string()),
+                        ('date', pa.timestamp('ms')),
+                        ('raw_text', pa.string()),
+                        ('political_group', pa.string()),
+                        ('sex', pa.string()),
+                        ('age', pa.int32())])
+except ImportError:
+    pa = pq = SCHEMA = None
+
+POLITICIAN_COLUMNS = ('political_group', 'sex', 'age')
+EXTENSIONS = {"parquet": "parquet", "arrow": "arrow"}
+
+
+def export_speeches(folder, cadences=None, fmt="parquet", incremental=True, batch_size=10000, overlap=600):
+    """
+    Streams speeches from the database into files partitioned as cadence=<n>/month=<yyyy-mm>/, that can be read
+    e.g. with pyarrow.dataset. Cadence is stored only in the partition path. Every run writes new files, so the
+    incremental export never rewrites older ones.
+
+    Incremental export reads speeches by the time of the database server they were inserted at. Writes of many
+    workers don't become visible exactly in the order of theirs insert times, so speeches inserted shortly before
+    the newest exported one are read again and the ones already exported are skipped by theirs hash. Speeches
+    without the insert time are exported after stamp_speech_insert_times migration.
+    Args:
+        folder (pathlib.Path): destination folder of the export
+        cadences (list): cadences of the exported speeches. All speeches are exported if not passed
+        fmt (str): "parquet" or "arrow" for Arrow IPC files
+        incremental (bool): export only speeches added to the database since the last export into the folder
+        batch_size (int): number of speeches read from the database cursor and written at once
+        overlap (int): seconds before the newest exported insert time that are read again by the incremental export
+    Returns: Number of exported speeches
+    """
+    if pa is None:
+        raise ImportError("pyarrow package is required to export speeches")
+
+    folder.mkdir(parents=True, exist_ok=True)
+
+    # Progress is kept separately for every set of exported cadences
+    state_path = folder.joinpath("_export_state.json")
+    state = json.loads(state_path.read_text()) if state_path.exists() else {}
+    state_key = ",".join(map(str, sorted(cadences))) if cadences else "all"
+
+    overlap = timedelta(seconds=overlap)
+    collection = Speech._get_collection()
+
+    query = {'inserted_at': {'$ne': None}}
+    if cadences:
+        query['cadence'] = {'$in': list(cadences)}
+
+    exported_hashes = dict()  # hash -> insert time of the speeches exported within the overlap
+    if incremental and (progress := state.get(state_key)):
+        exported_hashes = progress['hashes']
+        query['inserted_at'] = {'$gte': datetime.fromisoformat(progress['inserted_at']) - overlap}
+
+    politicians = {p['hash']: p for p in Politician._get_collection().find(
+        {}, {'_id': 0, 'hash': 1, **{column: 1 for column in POLITICIAN_COLUMNS}})}
+
+    speeches = collection.find(
+        query, {'hash': 1, 'politician_id': 1, 'politician_name': 1, 'date': 1, 'cadence': 1, 'inserted_at': 1,
+                **TEXT_FIELDS},
+        batch_size=batch_size).sort([('inserted_at', 1), ('_id', 1)])
+
+    run = datetime.now().strftime("%Y%m%d-%H%M%S")
+    exported, partitions, buffered = 0, dict(), 0
+    for speech in speeches:
+        if speech['hash'] in exported_hashes:
+            continue
+        politician = politicians.get(speech.get('politician_id'), {})
+        row = dict(hash=speech['hash'], politician_id=speech.get('politician_id'),
+                   politician_name=speech.get('politician_name'), date=speech.get('date'),
+                   cadence=speech.get('cadence'), raw_text=speech_text(speech),
+                   **{column: politician.get(column) for column in POLITICIAN_COLUMNS})
+
+        partitions.setdefault(_partition(row), []).append(row)
+        buffered, newest = buffered + 1, speech['inserted_at']
+        exported_hashes[speech['hash']] = newest.isoformat()
+
+        if buffered >= batch_size:
+            exported += _write_partitions(folder, partitions, fmt, run)
+            exported_hashes = _save_state(state_path, state, state_key, newest, exported_hashes, overlap)
+            partitions, buffered = dict(), 0
+
+    if buffered:
+        exported += _write_partitions(folder, partitions, fmt, run)
+        _save_state(state_path, state, state_key, newest, exported_hashes, overlap)
+
+    logging.getLogger("main.mongo").debug(f"{exported} speeches exported to {folder}")
+    return exported
+
+
+def _partition(row):
+    cadence = row['cadence'] or "unknown"
+    month = row['date'].strftime("%Y-%m") if row['date'] else "unknown"
+    return f"cadence={cadence}", f"month={month}"
+
+
+def _write_partitions(folder, partitions, fmt, run):
+    written = 0
+    for (cadence, month), rows in partitions.items():
+        partition_folder = folder.joinpath(cadence, month)
+        partition_folder.mkdir(parents=True, exist_ok=True)
+
+        number = len(list(partition_folder.glob(f"part-{run}-*")))
+        path = partition_folder.joinpath(f"part-{run}-{number:05d}.{EXTENSIONS[fmt]}")
+        table = pa.Table.from_pylist(rows, schema=SCHEMA)
+
+        if fmt == "arrow":
+            with pa.ipc.new_file(path, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            pq.write_table(table, path, compression="zstd")
+        written += len(rows)
+
+    return written
+
+
+def _save_state(state_path, state, state_key, newest, exported_hashes, overlap):
+    # Only hashes of the speeches that will be read again by the next export are kept
+    hashes = {speech_hash: inserted_at for speech_hash, inserted_at in exported_hashes.items()
+              if datetime.fromisoformat(inserted_at) >= newest - overlap}
+    state[state_key] = {'inserted_at': newest.isoformat(), 'hashes': hashes}
+    tmp_path = state_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(state))
+    tmp_path.replace(state_path)
+    return hashes
@@ -0,0 +1,144 @@
+"""
+Mongo backed queue of scrape jobs, shared by workers running in many processes or on many machines
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+
+from src.mongo.schemas import ScrapeJob
+from .utils import insert_ignoring_duplicates
+
+PRIORITIES = {"listing": 0, "speech": 1}  # Speeches are downloaded before new listings are read
+
+
+class JobQueue:
+    """
+    Workers claim jobs with time-limited leases. Lease of a job is renewed by the worker heartbeat, job which lease
+    expired is claimed again by another worker. Failed jobs are retried with a growing delay until they run out
+    of attempts.
+    """
+
+    def __init__(self, lease_seconds=300, max_attempts=5, retry_delay=30):
+        """
+        Args:
+            lease_seconds (int): time after which a job not renewed by its worker can be claimed again
+            max_attempts (int): number of claims of a job before it is marked as failed
+            retry_delay (int): delay in seconds before the first retry of a failed job, doubled with every attempt
+        """
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+        self.log = logging.getLogger("main.mongo")
+        self.collection = ScrapeJob._get_collection()
+        ScrapeJob.ensure_indexes()
+
+    @staticmethod
+    def job(kind, government_n, politician_name, url, speech_date=None):
+        """
+        Returns: Document of a new job. Job is identified by its kind, cadence and url
+        """
+        return {'key': f"{kind}:{government_n}:{url}", 'kind': kind, 'priority': PRIORITIES[kind],
+                'government_n': government_n, 'politician_name': politician_name, 'url': url,
+                'speech_date': speech_date, 'status': "pending", 'attempts': 0,
+                'available_at': datetime.now(timezone.utc)}
+
+    def enqueue(self, jobs, reset_finished=False):
+        """
+        Adds jobs to the queue. Jobs already in the queue are not duplicated.
+        Args:
+            jobs: list of job documents
+            reset_finished (bool): queue again jobs that are already done or failed
+        Returns: Number of jobs added to the queue
+        """
+        inserted = insert_ignoring_duplicates(self.collection, jobs)
+
+        queued = sum(inserted)
+        if reset_finished and (existing := [job['key'] for job, is_inserted in zip(jobs, inserted) if not is_inserted]):
+            queued += self.collection.update_many(
+                {'key': {'$in': existing}, 'status': {'$in': ["done", "failed"]}},
+                {'$set': {'status': "pending", 'attempts': 0, 'available_at': datetime.now(timezone.utc),
+                          'error': None}}
+            ).modified_count
+
+        return queued
+
+    def claim(self, worker_id):
+        """
+        Leases the most important job available
+        Args:
+            worker_id: identifier of the worker
+        Returns: Job document, None if there is no job available
+        """
+        now = datetime.now(timezone.utc)
+        job = self.collection.find_one_and_update(
+            {'attempts': {'$lt': self.max_attempts},
+             '$or': [{'status': "pending", 'available_at': {'$lte': now}},
+                     {'status': "leased", 'lease_expires': {'$lt': now}}]},
+            {'$set': {'status': "leased", 'lease_owner': worker_id, 'lease_expires': now + self.lease},
+             '$inc': {'attempts': 1}},
+            sort=[('priority', -1), ('_id', 1)],
+            return_document=ReturnDocument.AFTER)
+
+        if job is None:
+            self._fail_abandoned(now)
+        return job
+
+    def heartbeat(self, job_ids, worker_id):
+        """
+        Renews leases of the jobs processed by the worker
+        Returns: Number of renewed leases
+        """
+        return self.collection.update_many(
+            {'_id': {'$in': list(job_ids)}, 'status': "leased", 'lease_owner': worker_id},
+            {'$set': {'lease_expires': datetime.now(timezone.utc) + self.lease}}).modified_count
+
+    def complete(self, job, worker_id, speech_hash=None):
+        """
+        Marks job as done. Completing a job twice has no effect.
+        Args:
+            job: job document
+            worker_id: identifier of the worker
+            speech_hash: hash of the speech downloaded by the job
+        Returns: False if the lease was lost and the job was already finished by another worker
+        """
+        result = self.collection.update_one(
+            {'_id': job['_id'], 'status': {'$ne': "done"}},
+            {'$set': {'status': "done", 'lease_owner': worker_id, 'lease_expires': None, 'error': None,
+                      'speech_hash': speech_hash}})
+        return bool(result.modified_count)
+
+    def fail(self, job, worker_id, error):
+        """
+        Releases the job, so it is retried later or marks it as failed if it ran out of attempts
+        """
+        if job['attempts'] >= self.max_attempts:
+            update = {'status': "failed"}
+            self.log.error(f"Job {job['key']} failed after {job['attempts']} attempts: {error}")
+        else:
+            delay = timedelta(seconds=self.retry_delay * 2 ** (job['attempts'] - 1))
+            update = {'status': "pending", 'available_at': datetime.now(timezone.utc) + delay}
+
+        self.collection.update_one({'_id': job['_id'], 'status': "leased", 'lease_owner': worker_id},
+                                   {'$set': dict(update, lease_owner=None, lease_expires=None, error=str(error))})
+
+    def active(self):
+        """
+        Returns: Number of jobs that are waiting or being processed
+        """
+        return self.collection.count_documents({'status': {'$in': ["pending", "leased"]}})
+
+    def counts(self):
+        """
+        Returns: Dictionary with number of jobs per status
+        """
+        return {group['_id']: group['count']
+                for group in self.collection.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}])}
+
+    def _fail_abandoned(self, now):
+        # Worker that crashed during the last attempt of a job leaves it leased forever
+        self.collection.update_many(
+            {'status': "leased", 'lease_expires': {'$lt': now}, 'attempts': {'$gte': self.max_attempts}},
+            {'$set': {'status': "failed", 'error': "Lease expired"}})
@@ -0,0 +1,194 @@
+"""
+One-shot migrations of the data stored in the mongo database
+"""
+
+import logging
+from datetime import datetime
+
+from bson import Binary
+from pymongo import UpdateOne
+
+from src.mongo.schemas import Politician, Speech, TextDictionary
+from src.mongo.schemas.speech import text_compressor
+from src.utils import int_to_roman
+from src.utils.compression import TextCompressor
+from .resolver import PoliticianResolver
+from .utils import (BASELINE_CADENCE, create_speech_object, insert_ignoring_duplicates, insert_speeches_into_db,
+                    stamp_inserted_speeches, update_speech_stats, upsert_politicians)
+
+
+def migrate_embedded_speeches(batch_size=1000):
+    """
+    Moves speeches embedded in the politician documents to the speeches collection. Politician documents are
+    cleaned after all of theirs speeches are copied, so the migration can be safely repeated after a failure.
+    Args:
+        batch_size: maximum number of speeches sent in a single insert
+    Returns: Number of migrated speeches
+    """
+
+    Speech.ensure_indexes()
+    politicians = Politician._get_collection()
+
+    migrated = 0
+    for politician in politicians.find({'speeches': {'$exists': True}}, {'hash': 1, 'name': 1, 'speeches': 1}):
+        docs = [dict(speech, politician_id=speech.get('politician_id') or politician['hash'],
+                     politician_name=politician['name'], cadence=speech.get('cadence') or BASELINE_CADENCE)
+                for speech in politician['speeches']]
+
+        for start in range(0, len(docs), batch_size):
+            batch = docs[start:start + batch_size]
+            inserted = insert_ignoring_duplicates(Speech._get_collection(), batch)
+            inserted_docs = [doc for doc, is_inserted in zip(batch, inserted) if is_inserted]
+            stamp_inserted_speeches(inserted_docs)
+            update_speech_stats(inserted_docs)
+            migrated += sum(inserted)
+
+        politicians.update_one({'_id': politician['_id']}, {'$unset': {'speeches': ""}})
+        logging.getLogger("main.mongo").debug(f"Speeches of {politician['name']} moved to the speeches collection.")
+
+    return migrated
+
+
+def backfill_speech_stats(batch_size=1000):
+    """
+    Recalculates last speech date and speeches count of every politician from the speeches collection.
+    Politicians without speeches are reset. Speeches stored before cadences were kept get the baseline cadence.
+    Args:
+        batch_size: maximum number of politicians updated in a single bulk write
+    Returns: Number of politicians with speeches
+    """
+
+    Politician.ensure_indexes()
+    politicians = Politician._get_collection()
+    Speech._get_collection().update_many({'cadence': None}, {'$set': {'cadence': BASELINE_CADENCE}})
+
+    stats = Speech._get_collection().aggregate([
+        {'$match': {'politician_id': {'$ne': None}}},
+        {'$group': {'_id': {'politician_id': '$politician_id', 'cadence': '$cadence'},
+                    'last_speech_date': {'$max': '$date'}, 'speech_count': {'$sum': 1}}}
+    ])
+
+    fields = dict()  # politician hash -> fields that will be set
+    for group in stats:
+        politician = fields.setdefault(group['_id']['politician_id'],
+                                       {'last_speech_date': None, 'last_speech_dates': {}, 'speech_count': 0})
+        politician['speech_count'] += group['speech_count']
+        politician['last_speech_date'] = max(filter(None, (politician['last_speech_date'],
+                                                           group['last_speech_date'])), default=None)
+        politician['last_speech_dates'][int_to_roman(group['_id']['cadence'])] = group['last_speech_date']
+
+    updates = [UpdateOne({'hash': politician_hash}, {'$set': politician_fields})
+               for politician_hash, politician_fields in fields.items()]
+    for start in range(0, len(updates), batch_size):
+        politicians.bulk_write(updates[start:start + batch_size], ordered=False)
+
+    politicians.update_many({'hash': {'$nin': list(fields)}},
+                            {'$set': {'last_speech_date': None, 'last_speech_dates': {}, 'speech_count': 0}})
+    logging.getLogger("main.mongo").debug(f"Speeches statistics of {len(fields)} politicians recalculated.")
+
+    return len(fields)
+
+
+def stamp_speech_insert_times():
+    """
+    Stores time of the database server in the speeches inserted before the insert time was kept, or by a writer
+    stopped before it stored it. Incremental export reads speeches by the insert time.
+    Returns: Number of stamped speeches
+    """
+    stamped = Speech._get_collection().update_many({'inserted_at': None},
+                                                   {'$currentDate': {'inserted_at': True}}).modified_count
+    logging.getLogger("main.mongo").debug(f"Insert time of {stamped} speeches stored.")
+    return stamped
+
+
+def compress_speeches(batch_size=1000, sample_size=2000, retrain=False, codec=None):
+    """
+    Replaces plain text of the speeches with text compressed with a dictionary shared by all speeches. Dictionary
+    is trained on a sample of the speeches and stored in the database. Only processed speeches are compressed, text
+    search finds words and phrases of them in the normalized text, which is kept plain. The migration can be
+    repeated after new speeches are processed.
+    Args:
+        batch_size: maximum number of speeches updated in a single bulk write
+        sample_size: number of speeches the dictionary is trained on
+        retrain (bool): train a new dictionary even if one already exists. Older speeches keep the old one
+        codec (str): "zstd" or "zlib". Defaults to zstd if zstandard is installed
+    Returns: Number of compressed speeches
+    """
+    log = logging.getLogger("main.mongo")
+    speeches = Speech._get_collection()
+    query = {'raw_text': {'$type': "string"}, 'normalized_text': {'$type': "string"},
+             'lemmatized_text': {'$exists': True}}
+
+    dictionary = TextDictionary.objects.order_by('-number').first()
+    if dictionary is None or retrain:
+        samples = [speech['raw_text'] for speech in speeches.aggregate([{'$match': query},
+                                                                        {'$sample': {'size': sample_size}}])]
+        if not samples:
+            return 0
+        compressor = TextCompressor.train(samples, codec=codec)
+        dictionary = TextDictionary(number=dictionary.number + 1 if dictionary else 1, codec=compressor.codec,
+                                    data=compressor.dictionary, samples=len(samples),
+                                    created_at=datetime.now()).save()
+        log.info(f"Dictionary {dictionary.number} of {len(dictionary.data)} bytes trained on {len(samples)} "
+                 f"speeches.")
+    compressor = text_compressor(dictionary.number)
+
+    compressed, text_bytes, compressed_bytes, updates = 0, 0, 0, []
+    for speech in speeches.find(query, {'raw_text': 1}, batch_size=batch_size):
+        data = compressor.compress(speech['raw_text'])
+        updates.append(UpdateOne({'_id': speech['_id'], 'raw_text': speech['raw_text']},
+                                 {'$set': {'compressed_text': Binary(data), 'text_dictionary': dictionary.number,
+                                           'text_length': len(speech['raw_text'])},
+                                  '$unset': {'raw_text': ""}}))
+        text_bytes += len(speech['raw_text'].encode("utf-8"))
+        compressed_bytes += len(data)
+
+        if len(updates) == batch_size:
+            compressed += speeches.bulk_write(updates, ordered=False).modified_count
+            updates = []
+    if updates:
+        compressed += speeches.bulk_write(updates, ordered=False).modified_count
+
+    if compressed:
+        log.info(f"Text of {compressed} speeches compressed from {text_bytes / 1024 ** 2:.1f} MB "
+                 f"to {compressed_bytes / 1024 ** 2:.1f} MB.")
+    return compressed
+
+
+def restore_speeches(archive, resolver=None, batch_size=1000):
+    """
+    Inserts speeches from the local archive into the database. Speeches already in the database are skipped.
+    Args:
+        archive (Archive): archive of speeches written by SpeechesScraper
+        resolver (PoliticianResolver): index of politicians the speeches are assigned to
+        batch_size: maximum number of speeches sent in a single insert
+    Returns: Number of restored speeches
+    """
+
+    Speech.ensure_indexes()
+    resolver = resolver or PoliticianResolver()
+
+    restored, batch = 0, []
+    for record in archive:
+        batch.append(create_speech_object(record['politician_name'], record['date'], record['raw_text'],
+                                          resolver=resolver, cadence=record.get('cadence')))
+        if len(batch) == batch_size:
+            restored += sum(insert_speeches_into_db(batch).values())
+            batch = []
+    restored += sum(insert_speeches_into_db(batch).values())
+
+    return restored
+
+
+def restore_politicians(archive, resolver=None):
+    """
+    Inserts politicians from the local archive into the database, updating changed data of the existing ones
+    Args:
+        archive (Archive): archive of politicians written by PoliticiansScraper
+        resolver (PoliticianResolver): index of politicians updated with the restored ones
+    Returns: Tuple with numbers of inserted and updated politicians
+    """
+
+    # Newer records of the politician come later in the archive
+    politicians = {(record['name'], record['date_of_birth']): record for record in archive}
+    return upsert_politicians(list(politicians.values()), resolver=resolver)
@@ -0,0 +1,95 @@
+import threading
+import warnings
+
+from src.mongo.schemas import Politician
+from src.utils import swap_name_with_surname, int_to_roman, METRICS
+from src.exceptions import DuplicatedNameWarning
+from .utils import find_politician_by_name
+
+
+class PoliticianResolver:
+    """
+    In-memory index of politician names and hashes, that replaces database lookups done for every scraped speech.
+    Instance can be shared between threads.
+    """
+
+    def __init__(self, government_n=None):
+        """
+        Args:
+            government_n (int or list): cadences which politicians will be loaded. All politicians are loaded if not
+                                        passed
+        """
+
+        self.government_n = government_n
+
+        self._lock = threading.Lock()
+        self._hashes = dict()  # name -> list of politician hashes
+        self._names = dict()  # hash -> name
+        self._missing = set()
+
+        self.refresh()
+
+    @METRICS.timed("db_seconds", operation="load_resolver")
+    def refresh(self):
+        """
+        Loads names and hashes of the politicians from the database
+        """
+
+        cadences = [self.government_n] if isinstance(self.government_n, int) else self.government_n
+        query = {'parliment_member__in': [int_to_roman(n) for n in cadences]} if cadences else {}
+        politicians = Politician.objects(**query).only('hash', 'name').as_pymongo()
+
+        with self._lock:
+            self._hashes.clear()
+            self._names.clear()
+            self._missing.clear()
+            for politician in politicians:
+                self._add(politician['hash'], politician['name'])
+
+    def add(self, politician):
+        """
+        Args:
+            politician: Politician object that was inserted to the database
+        """
+        with self._lock:
+            self._add(politician.hash, politician.name)
+            self._missing.clear()
+
+    def _add(self, politician_hash, name):
+        if politician_hash not in self._names:
+            self._hashes.setdefault(name, []).append(politician_hash)
+            self._names[politician_hash] = name
+
+    def resolve(self, name):
+        """
+        Resolves name the same way as find_politician_by_name, trying also name swapped with surname
+        Args:
+            name: politician name
+        Returns: Tuple of politician hash and name as stored in the database, None if politician is not found
+        """
+
+        with self._lock:
+            if hashes := self._hashes.get(name) or self._hashes.get(swap_name_with_surname(name)):
+                found = hashes[0], self._names[hashes[0]]
+            missing = name in self._missing
+
+        if hashes:
+            METRICS.increment("resolver_lookups_total", result="hit")
+            if len(hashes) > 1:
+                warnings.warn(f"{name} appears more then once in the politician collection", DuplicatedNameWarning)
+            return found
+
+        if missing:
+            METRICS.increment("resolver_lookups_total", result="miss")
+            return None
+
+        METRICS.increment("resolver_lookups_total", result="database")
+
+        # Politician might come from outside of the loaded cadence
+        if p := find_politician_by_name(name):
+            self.add(p)
+            return p.hash, p.name
+
+        with self._lock:
+            self._missing.add(name)
+        return None
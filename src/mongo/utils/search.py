@@ -0,0 +1,97 @@
+"""
+Full-text search of the speeches, backed by the text index of the speeches collection. Index is maintained by the
+database, so every inserted speech is searchable right away. Lemmatized text is indexed after speeches are
+processed, so queries match also other forms of the words.
+"""
+
+import re
+
+from src.mongo.schemas import Politician, Speech, speech_text, TEXT_FIELDS
+from src.processing import lemmatize, normalize_text, tokenize
+from src.utils import swap_name_with_surname, METRICS
+
+PHRASE = re.compile(r'"([^"]+)"')
+
+
+@METRICS.timed("db_seconds", operation="search")
+def search_speeches(query, politician=None, party=None, date_from=None, date_to=None, cadence=None, limit=20):
+    """
+    Args:
+        query: keywords, phrases in double quotes and words excluded with a leading minus
+        politician: name of the speech author
+        party: political group of the speech author
+        date_from (datetime): earliest date of the speech
+        date_to (datetime): latest date of the speech
+        cadence (int): government cadence of the speech
+        limit (int): maximum number of results
+    Returns: List of the best matching speeches with hash, politician name, date, score and a snippet of the text
+    """
+
+    filters = {'$text': {'$search': text_search(query)},
+               **search_filters(politician, party, date_from, date_to, cadence)}
+
+    score = {'$meta': 'textScore'}
+    speeches = Speech._get_collection().find(
+        filters, {'_id': 0, 'hash': 1, 'politician_name': 1, 'date': 1, 'score': score, **TEXT_FIELDS}
+    ).sort([('score', score)]).limit(limit)
+
+    terms = PHRASE.findall(query) + [word for word in PHRASE.sub(" ", query).split() if not word.startswith("-")]
+    return [{'hash': speech['hash'],
+             'politician_name': speech.get('politician_name'),
+             'date': speech.get('date'),
+             'score': speech['score'],
+             'snippet': make_snippet(speech_text(speech), terms)}
+            for speech in speeches]
+
+
+def search_filters(politician=None, party=None, date_from=None, date_to=None, cadence=None):
+    """
+    Returns: Query of the speeches matching the filters of the search, see search_speeches()
+    """
+    filters = dict()
+
+    if politician or party:
+        politicians = dict()
+        if politician:
+            politicians['name__in'] = [politician, swap_name_with_surname(politician)]
+        if party:
+            politicians['political_group'] = party
+        filters['politician_id'] = {'$in': Politician.objects(**politicians).distinct('hash')}
+
+    if date_from or date_to:
+        filters['date'] = {key: value for key, value in (('$gte', date_from), ('$lte', date_to)) if value}
+    if cadence:
+        filters['cadence'] = cadence
+
+    return filters
+
+
+def text_search(query):
+    """
+    Returns: Query of the mongo text search, with the words of the query extended by their lemmas
+    """
+    words = [word for word in tokenize(PHRASE.sub(" ", query)) if f"-{word}" not in query.lower()]
+    lemmas = [lemma for lemma in dict.fromkeys(lemmatize(word) for word in words) if lemma not in words]
+    return " ".join([query] + lemmas)
+
+
+def make_snippet(text, terms, width=200):
+    """
+    Args:
+        text: text of the speech
+        terms: words and phrases of the query
+        width: maximum length of the snippet
+    Returns: Fragment of the text around the first occurrence of any of the terms
+    """
+    text = normalize_text(text)
+    lowered = text.lower()
+    positions = [position for term in terms if (position := lowered.find(term.lower())) >= 0]
+    start = max(0, min(positions, default=0) - width // 3)
+
+    if start:
+        start = text.find(" ", start) + 1 or start
+    end = start + width
+    if end < len(text):
+        end = text.rfind(" ", start, end) if text.rfind(" ", start, end) > start else end
+
+    return ("…" if start else "") + text[start:end] + ("…" if end < len(text) else "")
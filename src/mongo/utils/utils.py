@@ -1,12 +1,20 @@
 import warnings
 import logging
+from collections import Counter
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 
 from src.mongo.schemas import Politician, Speech
-from src.utils import swap_name_with_surname
+from src.utils import swap_name_with_surname, int_to_roman, roman_to_int, METRICS
 from src.exceptions import NoPoliticianFound, DuplicatedNameWarning
 
+# Cadence of the speeches stored before cadences were kept, the scraper crawled only the IX cadence back then
+BASELINE_CADENCE = 9
+
 
 # TODO TESTS
+@METRICS.timed("db_seconds", operation="find_politician")
 def find_politician_by_name(name, try_swapped=True):
 
     """
@@ -31,35 +39,53 @@ def find_politician_by_name(name, try_swapped=True):
     return p.first()
 
 
-def create_speech_object(politician_name, speech_date, speech_text):
+def create_speech_object(politician_name, speech_date, speech_text, resolver=None, cadence=None):
     """
     Creates Speech document for given arguments
     Args:
         politician_name: full name of the speech author
         speech_date: date of speech in datetime type
         speech_text: full, raw text of the speech
+        resolver: PoliticianResolver used instead of querying the database for the politician
+        cadence: number of the government cadence the speech was given in
     Returns: Speech object
     """
 
     s = Speech()
     s.date = speech_date
+    s.cadence = cadence
     s.raw_text = speech_text
     s.hash = s.generate_id()
 
-    p = find_politician_by_name(politician_name)
-    if p:
-        s.politician_id = p.hash
+    if resolver:
+        politician = resolver.resolve(politician_name)
+    else:
+        politician = (p.hash, p.name) if (p := find_politician_by_name(politician_name)) else None
+
+    if politician:
+        s.politician_id, s.politician_name = politician
     else:
         logging.getLogger("main.mongo").error(f"Speech of {politician_name} cannot be assign to a Politician.")
 
     return s
 
 
-def insert_politician_to_db(politician):
+def _newest_cadence(cadences):
+    """
+    Args:
+        cadences: cadences in roman numerals
+    Returns: Number of the newest of the cadences, 0 if there are none
+    """
+    return max(map(roman_to_int, cadences or []), default=0)
+
+
+@METRICS.timed("db_seconds", operation="insert_politician")
+def insert_politician_to_db(politician, resolver=None):
     """
     This function will create Politician object and save it to the mongo db
     Args:
         politician: dictionary of single politician scraped from government website
+        resolver: PoliticianResolver that will be updated with inserted politician
     """
     p = Politician()
     for key, value in politician.items():
@@ -67,31 +93,211 @@ def insert_politician_to_db(politician):
 
     p.hash = p.generate_id()
 
-    if Politician.objects(hash=p.hash).first():
-        logging.getLogger("main.mongo").debug(f"Politician {p.name} found in the database. Skipping.")
-        return False
+    collection = Politician._get_collection()
+    stored = collection.find_one({'hash': p.hash}, {'parliment_member': 1})
+
+    if stored:
+        # Politician that served in many cadences is stored once, with all of the cadences and the profile
+        # of the newest one
+        update = {'$addToSet': {'parliment_member': {'$each': list(p.parliment_member)}}}
+        if _newest_cadence(p.parliment_member) >= _newest_cadence(stored.get('parliment_member')):
+            doc = p.to_mongo().to_dict()
+            update['$set'] = {key: doc[key] for key in politician if key in doc and key != 'parliment_member'}
+        collection.update_one({'hash': p.hash}, update)
+        logging.getLogger("main.mongo").debug(f"Politician {p.name} found in the database. Cadences merged.")
+        inserted = False
+    else:
+        p.save()
+        logging.getLogger("main.mongo").debug(f"Politician {p.name} inserted to db")
+        inserted = True
+
+    if resolver:
+        resolver.add(p)
+    return inserted
+
+
+@METRICS.timed("db_seconds", operation="upsert_politicians")
+def upsert_politicians(politicians, resolver=None):
+    """
+    Inserts new politicians and sets only the changed fields of the politicians already in the database,
+    with a single bulk write
+    Args:
+        politicians: list of dictionaries of politicians scraped from government website
+        resolver: PoliticianResolver that will be updated with the politicians
+    Returns: Tuple with numbers of inserted and updated politicians
+    """
+
+    scraped = dict()
+    for politician in politicians:
+        p = Politician()
+        for key, value in politician.items():
+            setattr(p, key, value)
+        p.hash = p.generate_id()
+        p.validate()
+
+        doc = p.to_mongo().to_dict()
+        scraped[p.hash] = p, {key: doc[key] for key in set(politician) | {'hash'} if key in doc}
+
+    collection = Politician._get_collection()
+    existing = {doc['hash']: doc for doc in collection.find({'hash': {'$in': list(scraped)}}, {'_id': 0})}
+
+    if resolver:
+        for p, _ in scraped.values():
+            resolver.add(p)
+
+    updates = []
+    for politician_hash, (p, doc) in scraped.items():
+        stored = existing.get(politician_hash, {})
+        changed = {key: value for key, value in doc.items() if stored.get(key) != value}
+
+        # Profile of an older cadence doesn't overwrite the profile of the newer one
+        if _newest_cadence(p.parliment_member) < _newest_cadence(stored.get('parliment_member')):
+            changed = {key: value for key, value in changed.items() if key == 'parliment_member'}
+
+        # Cadences are merged with the ones already stored
+        update = {'$setOnInsert': {'speech_count': 0}}
+        if new_cadences := set(changed.pop('parliment_member', [])) - set(stored.get('parliment_member', [])):
+            update['$addToSet'] = {'parliment_member': {'$each': sorted(new_cadences)}}
+        if changed:
+            update['$set'] = changed
+
+        if changed or new_cadences:
+            updates.append(UpdateOne({'hash': politician_hash}, update, upsert=True))
 
-    p.save()
-    logging.getLogger("main.mongo").debug(f"Politician {p.name} inserted to db")
-    return True
+    if not updates:
+        return 0, 0
+
+    result = collection.bulk_write(updates, ordered=False)
+
+    logging.getLogger("main.mongo").debug(f"Changed fields of {len(updates)} politicians written to db")
+    return result.upserted_count, result.modified_count
+
+
+def get_politician_fingerprints():
+    """
+    Returns: Set of fingerprints of the politician profiles stored in the database
+    """
+    return set(Politician.objects(fingerprint__ne=None).distinct('fingerprint'))
 
 
 def insert_speech_into_db(speech: Speech):
-    p = Politician.objects(hash=speech.politician_id).first()
-    if p and speech.hash not in [db_speech["hash"] for db_speech in p.speeches]:
-        p.speeches.append(speech)
-        p.save()
-        return True
-    return False
+    return bool(insert_speeches_into_db([speech]).get(speech.politician_id))
+
+
+@METRICS.timed("db_seconds", operation="insert_speeches")
+def insert_speeches_into_db(speeches):
+    """
+    Inserts many speeches at once with a single unordered insert. Speeches already present in the database
+    are rejected by the unique index on their hash.
+    Args:
+        speeches: iterable of Speech objects
+    Returns: Dictionary with number of inserted speeches per politician hash
+    """
+
+    batch = {}
+    for speech in speeches:
+        if speech.politician_id:
+            batch.setdefault(speech.hash, speech.to_mongo().to_dict())
+
+    docs = list(batch.values())
+    inserted = insert_ignoring_duplicates(Speech._get_collection(), docs)
+    inserted_docs = [doc for doc, is_inserted in zip(docs, inserted) if is_inserted]
+    stamp_inserted_speeches(inserted_docs)
+    update_speech_stats(inserted_docs)
+
+    return dict(Counter(doc['politician_id'] for doc in inserted_docs))
+
+
+def insert_ignoring_duplicates(collection, docs):
+    """
+    Args:
+        collection: pymongo collection
+        docs: list of documents to insert
+    Returns: List of flags telling which documents were inserted and which already existed in the collection
+    """
+
+    if not docs:
+        return []
+
+    inserted = [True] * len(docs)
+    try:
+        collection.insert_many(docs, ordered=False)
+    except BulkWriteError as exc:
+        for error in exc.details['writeErrors']:
+            if error['code'] != 11000:  # Duplicate key
+                raise
+            inserted[error['index']] = False
+
+    return inserted
+
+
+def stamp_inserted_speeches(docs):
+    """
+    Stores time of the database server in the inserted speeches. Identifiers of the speeches are generated by
+    the clients, so they are not ordered by the time of the insert when many workers write at once.
+    Args:
+        docs: speech documents that were inserted into the database
+    """
+
+    if docs:
+        Speech._get_collection().update_many({'_id': {'$in': [doc['_id'] for doc in docs]},
+                                              'inserted_at': {'$exists': False}},
+                                             {'$currentDate': {'inserted_at': True}})
+
+
+def update_speech_stats(docs):
+    """
+    Moves last speech date of the politicians forward and increases theirs speeches count with a single bulk write
+    Args:
+        docs: speech documents that were inserted into the database
+    """
+
+    counts = Counter()
+    last_dates = dict()  # politician hash -> {field: last speech date}
+    for doc in docs:
+        if politician_hash := doc.get('politician_id'):
+            counts[politician_hash] += 1
+            if speech_date := doc.get('date'):
+                fields = ['last_speech_date']
+                if doc.get('cadence'):
+                    fields.append(f"last_speech_dates.{int_to_roman(doc['cadence'])}")
+                dates = last_dates.setdefault(politician_hash, dict())
+                for field in fields:
+                    dates[field] = max(dates.get(field, speech_date), speech_date)
+
+    updates = [UpdateOne({'hash': politician_hash},
+                         {'$inc': {'speech_count': count},
+                          **({'$max': last_dates[politician_hash]} if politician_hash in last_dates else {})})
+               for politician_hash, count in counts.items()]
+    if updates:
+        Politician._get_collection().bulk_write(updates, ordered=False)
+
+
+@METRICS.timed("db_seconds", operation="last_speech_per_politician")
+def get_last_speech_per_politician(government_n=None):
+    """
+    Args:
+        government_n: cadence of the speeches. Last speech of any cadence is taken if not passed
+    Returns: Dictionary with date of the last speech in the database per politician hash
+    """
 
+    if government_n:
+        cadence = int_to_roman(government_n)
+        query = {f'last_speech_dates.{cadence}': {'$ne': None}}
+        if government_n == BASELINE_CADENCE:
+            # Politicians whose statistics were not recalculated since cadences are stored have only the last date
+            query = {'$or': [query, {'last_speech_date': {'$ne': None}}]}
+        politicians = Politician._get_collection().find(
+            query, {'_id': 0, 'hash': 1, 'last_speech_date': 1, 'last_speech_dates': 1})
 
-def get_last_speech_per_politician():
+        marks = dict()
+        for p in politicians:
+            dates = p.get('last_speech_dates') or {}
+            if mark := dates.get(cadence) or (not dates and p.get('last_speech_date')):
+                marks[p['hash']] = mark
+        return marks
 
-    result = list(Politician.objects().aggregate(
-        [
-            {'$unwind': "$speeches"},
-            {'$group': {'_id': '$name', 'last_speech': {'$max': '$speeches.date'}}}
-        ]
-    ))
+    politicians = Politician._get_collection().find({'last_speech_date': {'$ne': None}},
+                                                    {'_id': 0, 'hash': 1, 'last_speech_date': 1})
 
-    return {dct["_id"]: dct["last_speech"] for dct in result}
\ No newline at end of file
+    return {p['hash']: p['last_speech_date'] for p in politicians}
@@ -0,0 +1,2 @@
+from .text import normalize_text, split_sentences, tokenize, lemmatize, analyse_text
+from .processing import process_speeches, PROCESSING_VERSION
@@ -0,0 +1,59 @@
+"""
+Processing stage that stores normalized text and token statistics alongside every speech in the database
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pymongo import UpdateOne
+
+from src.mongo.schemas import Speech, speech_text, TEXT_FIELDS
+from src.utils import METRICS
+from .text import analyse_text
+
+# Version of the text processing. Speeches processed by an older version are processed again
+PROCESSING_VERSION = 1
+
+
+def process_speeches(processes=None, batch_size=1000, reprocess=False):
+    """
+    Normalizes, tokenizes and lemmatizes speeches that were not processed yet, using all cores of the machine.
+    Results are written to the speech documents, identified by theirs hash.
+    Args:
+        processes (int): size of the process pool. Defaults to the number of cores
+        batch_size (int): number of speeches processed and written at once
+        reprocess (bool): process again also the speeches processed by the current version
+    Returns: Number of processed speeches
+    """
+    log = logging.getLogger("main.mongo")
+    collection = Speech._get_collection()
+
+    query = {} if reprocess else {'processing_version': {'$ne': PROCESSING_VERSION}}
+    speeches = collection.find(query, {'_id': 0, 'hash': 1, **TEXT_FIELDS}, batch_size=batch_size)
+
+    processed = 0
+    processes = processes or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for batch in _batches(speeches, batch_size):
+            with METRICS.timer("process_batch_seconds"):
+                results = executor.map(analyse_text, [speech_text(speech) for speech in batch],
+                                       chunksize=max(1, len(batch) // (4 * processes)))
+                collection.bulk_write([UpdateOne({'hash': speech['hash']},
+                                                 {'$set': dict(result, processing_version=PROCESSING_VERSION)})
+                                       for speech, result in zip(batch, results)], ordered=False)
+            processed += len(batch)
+            log.info(f"{processed} speeches processed.")
+
+    return processed
+
+
+def _batches(cursor, batch_size):
+    batch = []
+    for document in cursor:
+        batch.append(document)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
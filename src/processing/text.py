@@ -0,0 +1,77 @@
+"""
+This module contain normalization, sentence splitting, tokenization and lemmatization of the speeches text.
+Functions are picklable, so they can run in a process pool. Words are lemmatized with simplemma if it is installed.
+"""
+
+import re
+from functools import lru_cache
+
+try:
+    import simplemma
+except ImportError:
+    simplemma = None
+
+# Remarks of the stenographer, e.g. "(Oklaski)", "(Głos z sali: Brawo!)" or "(Dzwonek)"
+INTERJECTION = re.compile(r"\s*\([^()]*\)")
+WHITESPACE = re.compile(r"\s+")
+SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+([.,;:!?…])")
+TOKEN = re.compile(r"\w+(?:[-']\w+)*")
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+(?=[\"„(]?[A-ZĄĆĘŁŃÓŚŹŻ0-9])")
+
+# Abbreviations after which a dot doesn't end the sentence
+ABBREVIATIONS = frozenset({"art", "ust", "pkt", "lit", "np", "tzw", "tj", "m.in", "prof", "dr", "hab", "inż", "mgr",
+                           "nr", "ok", "godz", "tys", "mln", "mld", "zł", "r", "ul", "pl", "pos", "poz", "dz", "al",
+                           "św", "ks", "gen", "płk", "min", "tab", "rys", "str", "s", "wg", "zob", "por", "ws"})
+
+
+def normalize_text(text):
+    """
+    Removes remarks of the stenographer and normalizes whitespace of the speech text
+    """
+    text = INTERJECTION.sub("", text.replace("\xa0", " "))
+    text = WHITESPACE.sub(" ", text)
+    return SPACE_BEFORE_PUNCTUATION.sub(r"\1", text).strip()
+
+
+def split_sentences(text):
+    """
+    Args:
+        text: normalized text
+    Returns: List of sentences
+    """
+    sentences = []
+    for part in SENTENCE_END.split(text):
+        previous_word = sentences[-1].rsplit(" ", 1)[-1][:-1].lower() if sentences else ""
+        if sentences and sentences[-1].endswith(".") and previous_word in ABBREVIATIONS:
+            sentences[-1] += " " + part
+        else:
+            sentences.append(part)
+    return [sentence for sentence in sentences if sentence]
+
+
+def tokenize(text):
+    """
+    Returns: List of lowercase words and numbers of the text
+    """
+    return TOKEN.findall(text.lower())
+
+
+@lru_cache(maxsize=200000)
+def lemmatize(token):
+    if simplemma is None:
+        return token
+    return simplemma.lemmatize(token, lang="pl").lower()
+
+
+def analyse_text(text):
+    """
+    Args:
+        text: raw text of the speech
+    Returns: Dictionary with normalized and lemmatized text, number of tokens and number of sentences
+    """
+    normalized = normalize_text(text)
+    tokens = tokenize(normalized)
+    return {'normalized_text': normalized,
+            'lemmatized_text': " ".join(lemmatize(token) for token in tokens),
+            'token_count': len(tokens),
+            'sentence_count': len(split_sentences(normalized))}
@@ -0,0 +1,169 @@
+"""
+This module contain persistent, content-addressed cache of the HTTP responses downloaded by scrapers.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from email.utils import formatdate
+
+DAY = 24 * 60 * 60
+
+# Time to live of cached pages per URL class. None means that the page never expires.
+DEFAULT_TTLS = (
+    (re.compile(r"wypowiedz\.xsp"), None),  # Stenogram of a single speech never changes
+    (re.compile(r"wypowiedzi\.xsp"), DAY),  # Listings of speeches grow with every sitting
+    (re.compile(r"poslowie\.xsp"), DAY),
+    (re.compile(r"posel\.xsp"), 7 * DAY),
+)
+
+CacheEntry = namedtuple("CacheEntry", ["url", "digest", "etag", "last_modified", "fetched_at", "ttl"])
+
+
+class ResponseCache:
+    """
+    Stores bodies of the responses on disk under their sha256 digest and keeps url index in sqlite database.
+    Expired pages are revalidated with conditional requests, least recently used pages are evicted when
+    the cache grows over max_size.
+    """
+
+    def __init__(self, folder, max_size=2 * 1024 ** 3, ttls=DEFAULT_TTLS, default_ttl=DAY, offline=False):
+        """
+        Args:
+            folder (pathlib.Path): directory of the cache, usually subdirectory of the project backup folder
+            max_size (int): size of all cached bodies in bytes above which the oldest pages will be evicted
+            ttls: sequence of (compiled regex, seconds) pairs. First pattern matching url decides its time to live
+            default_ttl (int): time to live of urls that doesn't match any pattern
+            offline (bool): replay only mode. Pages are always served from the cache and never downloaded
+        """
+        self.folder = folder
+        self.objects = folder.joinpath("objects")
+        self.objects.mkdir(parents=True, exist_ok=True)
+
+        self.max_size = max_size
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.offline = offline
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(folder.joinpath("index.sqlite")), check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS responses (
+                                url TEXT PRIMARY KEY,
+                                digest TEXT NOT NULL,
+                                size INTEGER NOT NULL,
+                                etag TEXT,
+                                last_modified TEXT,
+                                fetched_at REAL NOT NULL,
+                                accessed_at REAL NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._db.commit()
+
+    def ttl(self, url):
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def lookup(self, url):
+        """
+        Returns: CacheEntry of the url or None if the url was never cached
+        """
+        with self._lock:
+            row = self._db.execute("SELECT digest, etag, last_modified, fetched_at FROM responses WHERE url = ?",
+                                   (url,)).fetchone()
+        if row is None or not self._path(row[0]).exists():
+            return None
+        return CacheEntry(url, *row, ttl=self.ttl(url))
+
+    @staticmethod
+    def is_fresh(entry):
+        return entry.ttl is None or time.time() - entry.fetched_at < entry.ttl
+
+    @staticmethod
+    def validators(entry):
+        """
+        Returns: Headers that turn a GET of the cached url into a conditional request
+        """
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        elif not entry.etag:
+            headers["If-Modified-Since"] = formatdate(entry.fetched_at, usegmt=True)
+        return headers
+
+    def read(self, entry):
+        content = self._path(entry.digest).read_bytes()
+        with self._lock:
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), entry.url))
+            self._db.commit()
+        return content
+
+    def revalidate(self, entry):
+        """
+        Marks cached page as fresh after the server answered 304 Not Modified
+        """
+        with self._lock:
+            now = time.time()
+            self._db.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                             (now, now, entry.url))
+            self._db.commit()
+
+    def store(self, url, content, headers):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(content)
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            now = time.time()
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (url, digest, len(content), headers.get("ETag"), headers.get("Last-Modified"),
+                              now, now))
+            self._db.commit()
+            self._evict()
+
+    def discard(self, url):
+        """
+        Removes the url from the cache. Body is kept if it is cached also under another url
+        """
+        with self._lock:
+            row = self._db.execute("SELECT digest FROM responses WHERE url = ?", (url,)).fetchone()
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self._db.commit()
+            if row and not self._db.execute("SELECT 1 FROM responses WHERE digest = ?", row).fetchone():
+                self._path(row[0]).unlink(missing_ok=True)
+
+    def _evict(self):
+        # Sizes are counted per url, so the same body cached under many urls is slightly overestimated
+        total_size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_size <= self.max_size:
+            return
+
+        evicted = []
+        for url, digest, size in self._db.execute("SELECT url, digest, size FROM responses ORDER BY accessed_at"):
+            evicted.append((url, digest))
+            total_size -= size
+            if total_size <= self.max_size:
+                break
+
+        self._db.executemany("DELETE FROM responses WHERE url = ?", [(url,) for url, _ in evicted])
+        self._db.commit()
+        for _, digest in evicted:
+            if not self._db.execute("SELECT 1 FROM responses WHERE digest = ?", (digest,)).fetchone():
+                self._path(digest).unlink(missing_ok=True)
+
+    def _path(self, digest):
+        return self.objects.joinpath(digest[:2], digest[2:])
+
+    def close(self):
+        with self._lock:
+            self._db.close()
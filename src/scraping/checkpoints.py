@@ -0,0 +1,101 @@
+"""
+This module contain persistent checkpoints of the incremental speeches crawl.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+
+class CrawlCheckpoints:
+    """
+    Keeps a high-water mark (date of the newest crawled speech) per politician in a json file. Mark is moved
+    forward only after every listed speech of the politician went through the whole pipeline, so an interrupted
+    run starts again from the last complete crawl of each politician. Speeches that failed to download or parse
+    count as processed, they are logged by the scraper. Mark is not moved if any listing page failed, because
+    speeches between the mark and the failed page weren't listed.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (pathlib.Path): json file with the checkpoints. It is created if it doesn't exist
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        # name -> [speeches in flight, newest listed date, listing pages in flight, all listing pages read]
+        self._progress = dict()
+
+        if path.exists():
+            self._marks = {name: mark and datetime.fromisoformat(mark)
+                           for name, mark in json.loads(path.read_text()).items()}
+        else:
+            self._marks = dict()
+
+    def start(self, name, since):
+        """
+        Registers beginning of the politician crawl
+        Args:
+            name: politician name
+            since: date of the last speech of the politician in the database
+        Returns: High-water mark the crawl should start from
+        """
+        with self._lock:
+            if since is not None and name in self._marks:
+                # Database may already contain the newest speeches of an interrupted crawl
+                since = self._marks[name]
+            elif self._marks.get(name, ...) != since:
+                self._marks[name] = since
+                self._save()
+
+            self._progress[name] = [0, since, 1, True]
+            return since
+
+    def listed(self, name, speech_date):
+        with self._lock:
+            progress = self._progress[name]
+            progress[0] += 1
+            progress[1] = max(filter(None, (progress[1], speech_date)))
+
+    def add_listings(self, name, pages):
+        """
+        Registers listing pages of the politician that will be read separately
+        """
+        with self._lock:
+            self._progress[name][2] += pages
+
+    def listing_finished(self, name, failed=False):
+        """
+        Marks listing page of the politician as read
+        Args:
+            name: politician name
+            failed (bool): the page couldn't be read, so the mark is kept when the crawl completes
+        """
+        with self._lock:
+            progress = self._progress[name]
+            progress[2] -= 1
+            progress[3] &= not failed
+            self._complete_if_finished(name)
+
+    def done(self, name):
+        """
+        Marks single speech of the politician as processed, also if it failed
+        """
+        with self._lock:
+            self._progress[name][0] -= 1
+            self._complete_if_finished(name)
+
+    def _complete_if_finished(self, name):
+        in_flight, newest, listings_in_flight, listed_all = self._progress[name]
+        if listings_in_flight == 0 and in_flight == 0:
+            del self._progress[name]
+            if newest is not None and listed_all:
+                self._marks[name] = newest
+                self._save()
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({name: mark and mark.isoformat() for name, mark in self._marks.items()}))
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,202 @@
+"""
+This module contain the HTTP fetch layer shared by all scrapers.
+"""
+
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.exceptions import CacheMiss
+from src.scraping.throttling import AdaptiveLimit, RateLimit
+from src.utils import METRICS
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class Fetcher:
+    """
+    Pooled HTTP client with keep-alive connections, timeouts and retries with jittered exponential backoff.
+    Number of requests in flight adapts to the health of the responses and requests per second can be capped.
+    One instance can be shared by many threads and scrapers.
+    """
+
+    def __init__(self, max_connections=10, timeout=30, retries=3, backoff=0.5, cache=None, max_per_host=None,
+                 max_rps=None, min_connections=1, latency_target=None):
+        """
+        Args:
+            max_connections (int): maximum number of requests in flight and size of the connection pool
+            max_per_host (int): maximum number of requests in flight to a single host. Defaults to max_connections
+            timeout (float): connect and read timeout of a single request in seconds
+            retries (int): how many times a failed request will be repeated
+            backoff (float): base of the exponential backoff between retries in seconds
+            cache (ResponseCache): optional on-disk cache of the downloaded pages
+            max_rps (float): ceiling of requests per second sent by all threads. Unlimited if not passed
+            min_connections (int): number of requests in flight the limit never drops below
+            latency_target (float): response time in seconds above which the number of requests in flight is
+                lowered, like on server errors. Only errors lower it if not passed
+        """
+
+        self.main_log = logging.getLogger("main")
+
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.max_per_host = max_per_host or max_connections
+        self.limit = AdaptiveLimit(max_connections, minimum=min_connections, latency_target=latency_target)
+        self.rate = RateLimit(max_rps) if max_rps else None
+        self._host_slots = dict()
+        self._host_slots_lock = threading.Lock()
+
+    def get(self, url, revalidate=False):
+        """
+        Args:
+            url: address of the page
+            revalidate (bool): ask the server whether the cached page changed, even if it didn't expire yet
+
+        Returns: Content of the page in bytes
+
+        Raises:
+            requests.RequestException: when the page cannot be downloaded after all retries
+            CacheMiss: when cache works in the offline mode and the page was never cached
+        """
+        headers = {}
+        if self.cache:
+            if entry := self.cache.lookup(url):
+                if self.cache.offline or (self.cache.is_fresh(entry) and not revalidate):
+                    METRICS.increment("cache_hits_total")
+                    return self.cache.read(entry)
+                headers = self.cache.validators(entry)
+            elif self.cache.offline:
+                raise CacheMiss(f"Page {url} is not available in the cache.")
+
+        response, content = self._request(url, headers)
+        if response.status_code == 304 and headers:
+            METRICS.increment("cache_revalidations_total")
+            self.cache.revalidate(entry)
+            return self.cache.read(entry)
+
+        response.raise_for_status()
+        if self.cache:
+            self.cache.store(url, content, response.headers)
+        return content
+
+    def peek(self, url, until, max_bytes=65536, revalidate=False):
+        """
+        Reads only the beginning of the page. Download stops as soon as the pattern is found, so it is a cheap way
+        of checking what the page contains. The beginning of the page is not cached.
+        Args:
+            url: address of the page
+            until (re.Pattern): bytes pattern that ends the download when found in the content
+            max_bytes (int): maximum number of bytes read if the pattern is not found
+            revalidate (bool): read the page from the server, even if the cached page didn't expire yet
+
+        Returns: Beginning of the page content in bytes, whole content if the page is cached
+
+        Raises:
+            requests.RequestException: when the page cannot be downloaded after all retries
+            CacheMiss: when cache works in the offline mode and the page was never cached
+        """
+        if self.cache:
+            if (entry := self.cache.lookup(url)) and (self.cache.offline or
+                                                      (self.cache.is_fresh(entry) and not revalidate)):
+                METRICS.increment("cache_hits_total")
+                return self.cache.read(entry)
+            if self.cache.offline:
+                raise CacheMiss(f"Page {url} is not available in the cache.")
+
+        def read_beginning(response):
+            content = b""
+            for chunk in response.iter_content(chunk_size=4096):
+                content += chunk
+                if until.search(content) or len(content) >= max_bytes:
+                    break
+            response.close()
+            return content
+
+        response, content = self._request(url, read=read_beginning)
+        response.raise_for_status()
+        return content
+
+    def _request(self, url, headers=None, read=None):
+        """
+        Sends GET request, repeating it on connection errors and on statuses worth retrying
+        Args:
+            url: address of the page
+            headers: request headers
+            read: function reading the content of a streamed response. Whole content is read if not passed
+
+        Returns: Tuple of the response and its content
+        """
+        for attempt in range(self.retries + 1):
+            if self.rate:
+                self.rate.wait()
+            with self.limit.slot() as congested, self._host_slot(url):
+                try:
+                    with METRICS.timer("http_request_seconds"):
+                        response = self.session.get(url, headers=headers, timeout=self.timeout,
+                                                    stream=read is not None)
+                        content = read(response) if read else response.content
+                except (requests.ConnectionError, requests.Timeout) as exc:
+                    congested()
+                    METRICS.increment("http_requests_total", status=type(exc).__name__)
+                    error, response = exc, None
+                else:
+                    METRICS.increment("http_requests_total", status=response.status_code)
+                    METRICS.increment("http_response_bytes_total", len(content))
+                    if response.status_code not in RETRY_STATUSES:
+                        return response, content
+                    congested()
+                    error = requests.HTTPError(f"{response.status_code} response for {url}", response=response)
+
+            if attempt < self.retries:
+                delay = self._backoff_delay(attempt, response)
+                METRICS.increment("http_retries_total")
+                self.main_log.debug(f"Request to {url} failed ({error}). Retrying in {delay:.2f}s.")
+                time.sleep(delay)
+
+        raise error
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self._host_slots_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[host]
+
+    def _backoff_delay(self, attempt, response=None):
+        # "Full jitter" keeps parallel workers from retrying in lockstep
+        delay = random.uniform(0, self.backoff * 2 ** attempt)
+
+        # Throttled requests wait at least as long as the server asked
+        retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+        return max(delay, float(retry_after)) if retry_after.isdigit() else delay
+
+    def report_malformed(self, url):
+        """
+        Registers a page that was downloaded, but doesn't have the expected content, e.g. it was truncated by
+        the overloaded server. Number of requests in flight is lowered and the page is removed from the cache,
+        so it is downloaded again.
+        """
+        METRICS.increment("malformed_pages_total")
+        self.main_log.warning(f"Malformed page {url}, concurrency limit is {self.limit.limit} requests.")
+        self.limit.congestion()
+        if self.cache and not self.cache.offline:
+            self.cache.discard(url)
+
+    def close(self):
+        self.session.close()
+        if self.cache:
+            self.cache.close()
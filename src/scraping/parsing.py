@@ -0,0 +1,57 @@
+"""
+This module contain HTML parsing layer shared by the scrapers. Pages are parsed with lxml when it is installed
+and only the parts of the page read by the scrapers are turned into the tree.
+"""
+
+import bs4 as bs
+
+from src.utils import METRICS
+
+try:
+    import lxml  # noqa: F401
+    DEFAULT_BACKEND = "lxml"
+except ImportError:
+    DEFAULT_BACKEND = "html.parser"
+
+# Parts of the pages read by the scrapers
+SPEECH = bs.SoupStrainer("div", {"class": "stenogram"})
+SPEECHES_LISTING = bs.SoupStrainer(["ul", "table"])
+POLITICIANS_LISTING = bs.SoupStrainer("ul", {"class": "category-list"})
+LINKS = bs.SoupStrainer("a")
+TITLE = bs.SoupStrainer("div", {"id": "title_content"})
+
+
+def make_soup(content, parse_only=None, backend=None):
+    """
+    Args:
+        content: page content in bytes
+        parse_only (SoupStrainer): part of the page that should be parsed. Whole page is parsed if not passed
+        backend (str): "lxml" or "html.parser". Defaults to the fastest available one
+    Returns: BeautifulSoup object
+    """
+    with METRICS.timer("parse_seconds"):
+        return bs.BeautifulSoup(content, features=backend or DEFAULT_BACKEND, parse_only=parse_only)
+
+
+def parse_speech_text(content, backend=None):
+    """
+    Extracts text of the speech from the stenogram page. Function is picklable, so it can run in a process pool.
+    Args:
+        content: page content in bytes
+        backend (str): parser backend
+    Returns: Text of the speech
+
+    Raises:
+        AttributeError: when the page doesn't contain a stenogram
+    """
+    if (backend or DEFAULT_BACKEND) == "lxml":
+        # libxml2 turns "\r\n" into "\n" while parsing, so line breaks removed from text below are removed upfront
+        content = content.replace(b"\r\n", b"")
+
+    soup = make_soup(content, parse_only=SPEECH, backend=backend)
+
+    # Cleaning function that will be used will looping through parts of speech
+    cleen_text = lambda speech_part: speech_part.get_text(strip='\xa0').replace("\r\n", "")
+    return " ".join(
+        [cleen_text(speech_part)
+         for speech_part in soup.find("div", {"class": "stenogram"}).findAll("p")[1:]])
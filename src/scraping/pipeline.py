@@ -0,0 +1,204 @@
+"""
+This module contain a small producer/consumer pipeline used to stream scraped data through processing stages
+and a scheduler of the download tasks feeding it.
+"""
+
+import itertools
+import logging
+import queue
+import threading
+
+from src.utils import METRICS
+
+_STOP = object()
+
+
+class Stage:
+    """
+    Single step of the pipeline. Function of the stage takes one item and returns iterable of items for the next
+    stage, so a stage can filter, transform or fan out its input.
+    """
+
+    def __init__(self, name, func, workers=1, flush=None):
+        """
+        Args:
+            name (str): name of the stage used in logs
+            func (callable): function called for every item of the stage input
+            workers (int): number of threads that runs the function
+            flush (callable): function without arguments called once after the whole input is processed.
+                              It returns iterable of remaining items, e.g. unfinished batch of a writer stage
+        """
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.flush = flush
+
+
+class Pipeline:
+    """
+    Chain of stages connected with bounded queues. Every stage blocks when the next one cannot keep up,
+    so the number of items held in memory never exceeds queue size times number of stages.
+    """
+
+    def __init__(self, stages, queue_size=100):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.main_log = logging.getLogger("main")
+
+        self._errors = []
+
+    def run(self, items):
+        """
+        Args:
+            items: iterable of input items of the first stage
+
+        Returns: Generator of items produced by the last stage
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        self._errors = []
+
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0]), daemon=True)]
+        for stage, in_queue, out_queue in zip(self.stages, queues, queues[1:]):
+            remaining = [stage.workers]
+            lock = threading.Lock()
+            threads += [threading.Thread(target=self._work, args=(stage, in_queue, out_queue, remaining, lock),
+                                         name=f"{stage.name}-{n}", daemon=True)
+                        for n in range(stage.workers)]
+
+        for thread in threads:
+            thread.start()
+
+        while (item := queues[-1].get()) is not _STOP:
+            yield item
+
+        for thread in threads:
+            thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+    def _feed(self, items, out_queue):
+        try:
+            for item in items:
+                out_queue.put(item)
+        except Exception as exc:
+            self.main_log.error(f"Pipeline input failed: {exc!r}")
+            self._errors.append(exc)
+        finally:
+            out_queue.put(_STOP)
+
+    def _work(self, stage, in_queue, out_queue, remaining, lock):
+        while (item := in_queue.get()) is not _STOP:
+            METRICS.set_gauge("queue_depth", in_queue.qsize(), stage=stage.name)
+            with METRICS.timer("stage_seconds", stage=stage.name):
+                self._call(stage, stage.func, out_queue, item)
+
+        # Every worker of the stage gets its own stop signal, the last one passes it downstream
+        in_queue.put(_STOP)
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            if stage.flush:
+                self._call(stage, stage.flush, out_queue)
+            out_queue.put(_STOP)
+
+    def _call(self, stage, func, out_queue, *args):
+        try:
+            for result in func(*args) or ():
+                out_queue.put(result)
+        except Exception as exc:
+            self.main_log.error(f"Stage {stage.name} failed: {exc!r}")
+            self._errors.append(exc)
+
+
+class Scheduler:
+    """
+    Shared pool of worker threads running tasks of different kinds, e.g. downloads of listing pages and of single
+    speeches. A task can schedule follow-up tasks and those are run before older, shallower tasks,
+    so the work is balanced across all items instead of across the items that started it.
+    """
+
+    def __init__(self, workers, queue_size=100):
+        """
+        Args:
+            workers (int): number of threads in the pool
+            queue_size (int): capacity of the queue with results of the tasks
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.main_log = logging.getLogger("main")
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._order = itertools.count()
+        self._outstanding = 0
+        self._errors = []
+
+    def run(self, func, items):
+        """
+        Args:
+            func (callable): task called for every input item. It returns iterable of results or None
+            items: iterable of input items
+
+        Returns: Generator of results of all tasks
+        """
+        self._tasks = queue.PriorityQueue()
+        self._results = queue.Queue(maxsize=self.queue_size)
+        self._errors = []
+
+        # Placeholder task keeps the pool alive until all input items are scheduled
+        self._outstanding = 1
+        threads = [threading.Thread(target=self._work, name=f"scheduler-{n}", daemon=True)
+                   for n in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for item in items:
+                self.submit(func, item)
+        finally:
+            self._task_done()
+
+        while (result := self._results.get()) is not _STOP:
+            yield result
+
+        for thread in threads:
+            thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+    def submit(self, func, *args):
+        """
+        Schedules a task. Can be called from within other tasks.
+        """
+        depth = getattr(self._local, "depth", -1) + 1
+        with self._lock:
+            self._outstanding += 1
+        self._tasks.put((-depth, next(self._order), func, args))
+
+    def _work(self):
+        while (task := self._tasks.get())[2] is not None:
+            depth, _, func, args = task
+            self._local.depth = -depth
+            METRICS.set_gauge("scheduled_tasks", self._tasks.qsize())
+            try:
+                with METRICS.timer("task_seconds", task=func.__name__):
+                    for result in func(*args) or ():
+                        self._results.put(result)
+            except Exception as exc:
+                self.main_log.error(f"Task {func.__name__}{args} failed: {exc!r}")
+                self._errors.append(exc)
+            finally:
+                self._task_done()
+
+    def _task_done(self):
+        with self._lock:
+            self._outstanding -= 1
+            finished = self._outstanding == 0
+
+        if finished:
+            for _ in range(self.workers):
+                self._tasks.put((float("inf"), next(self._order), None, ()))
+            self._results.put(_STOP)
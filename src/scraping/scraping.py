@@ -2,20 +2,28 @@
 This module contain scrapers that can extract data from the government website.
 """
 
+import json
 import logging
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
+from hashlib import blake2b
 
-import bs4 as bs
 import requests
-from dateutil.parser import parse
 
 from src.mongo.schemas import Politician
 import src.mongo.utils as dbutils
-from src.utils import get_project_structure, swap_name_with_surname
+from src.exceptions import CacheMiss
+from src.scraping import parsing
+from src.scraping.checkpoints import CrawlCheckpoints
+from src.scraping.fetching import Fetcher
+from src.scraping.pipeline import Pipeline, Scheduler, Stage
+from src.utils import get_project_structure, swap_name_with_surname, int_to_roman, parse_date, Archive, METRICS
 
-STRUCTURE = get_project_structure()
+# Number of politician profiles checked at once while looking for politicians missing on the listing
+PROBE_WINDOW = 4
+TITLE_END = re.compile(rb'id="title_content".*?</h1>', re.DOTALL)
 
 
 class Scraper:
@@ -23,86 +31,261 @@ class Scraper:
     Scraper base class
     """
 
-    def __init__(self, government_n, to_database):
+    archive_name = None
+
+    def __init__(self, government_n, to_database, fetcher=None, max_connections=10, timeout=30, retries=3,
+                 cache=None, resolver=None, workers=None, parser=None, root_url=None, local_backup=False, **kwargs):
         """
         Creates instance of a Scraper
         Args:
             government_n (int): which government cadence should be scraped.
                                 Default is 9, which is cadence that ruled since 2019 to 2023
+            fetcher (Fetcher): HTTP client shared between scrapers. New one is created if not passed
+            max_connections (int): connection pool size and cap of concurrent requests of a new fetcher
+            timeout (float): timeout of a single request in seconds
+            retries (int): how many times failed request will be repeated
+            cache (ResponseCache): on-disk cache of the downloaded pages used by a new fetcher
+            resolver (PoliticianResolver): in-memory index of politicians shared between scrapers
+            workers (int): number of threads downloading pages. Defaults to the fetcher connection limit
+            parser (str): HTML parser backend, "lxml" or "html.parser". Defaults to the fastest available one
+            root_url (str): address of the cadence website, e.g. of a local stand-in of the government website
+            local_backup (bool): stream scraped records into the compressed archive in the backup folder
+            **kwargs: arguments of other scrapers, ignored
         """
 
         self.main_log = logging.getLogger("main")
         self.mongo_log = logging.getLogger("main.mongo")
 
         self.government_n = government_n
-        self.root_url = fr'https://www.sejm.gov.pl/sejm{self.government_n}.nsf/'
+        self.root_url = root_url or fr'https://www.sejm.gov.pl/sejm{self.government_n}.nsf/'
         self.to_database = to_database
 
+        self.fetcher = fetcher or Fetcher(max_connections=max_connections, timeout=timeout, retries=retries,
+                                          cache=cache)
+        self.resolver = resolver
+        self.workers = workers or self.fetcher.max_connections
+        self.parser = parser or parsing.DEFAULT_BACKEND
+
+        self.archive = None
+        if local_backup and self.archive_name:
+            archive_folder = get_project_structure()['backup'].joinpath("archive")
+            self.archive = Archive(archive_folder, f"{self.archive_name}_{government_n}")
+
+    def _soup(self, url, parse_only=None, revalidate=False):
+        return parsing.make_soup(self.fetcher.get(url, revalidate=revalidate), parse_only=parse_only,
+                                 backend=self.parser)
+
 
 class SpeechesScraper(Scraper):
     """
     Scraper that crawl through all politician speeches urls and extracts text from stenograms.
     """
-    def __init__(self, government_n, to_database, only_new=True, name_filter=None):
-        super().__init__(government_n, to_database)
+    archive_name = "speeches"
+
+    def __init__(self, government_n, to_database, only_new=True, name_filter=None, retain_results=True,
+                 queue_size=100, batch_size=100, parse_processes=0, **kwargs):
+        """
+        Args:
+            only_new (bool): scrape only speeches not older than the last speech of a politician in the database.
+                             Listings are read from the newest speech and crawl progress is checkpointed in the
+                             backup folder, so an interrupted run resumes where it stopped. Cached listings are
+                             revalidated, so speeches added since the last run are not missed
+            name_filter (str): scrape only speeches of the politician with given name
+            retain_results (bool): keep scraped speeches in the speeches attribute. Speeches are always kept
+                                   if they are not inserted into the database
+            queue_size (int): capacity of the queues between stages of the scraping pipeline
+            batch_size (int): number of speeches inserted into the database at once
+            parse_processes (int): number of processes parsing stenograms. Stenograms are parsed in threads if 0
+        """
+        super().__init__(government_n, to_database, **kwargs)
 
         self.only_new = only_new
         self.speeches_url = self.root_url + r'/wypowiedzi.xsp'
         self.name_filter = name_filter
+        self.retain_results = retain_results or not to_database
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.parse_processes = parse_processes
 
         if only_new:
-            setattr(self, "last_speech", dbutils.get_last_speech_per_politician())
+            setattr(self, "last_speech", dbutils.get_last_speech_per_politician(government_n))
+
+        # High-water marks are keyed by politician hash, so names from the listings are resolved also without writes
+        if (to_database or only_new) and not self.resolver:
+            self.resolver = dbutils.PoliticianResolver(government_n)
+
+        # Progress of the incremental crawl is persisted only together with the database
+        self.checkpoints = None
+        if only_new and to_database:
+            checkpoints_file = get_project_structure()['backup'].joinpath(f"speeches_checkpoints_{government_n}.json")
+            self.checkpoints = CrawlCheckpoints(checkpoints_file)
 
         # Namespace
         self.speeches = []
+        self.scheduler = None
+        self.parser_pool = None
+        self._batch = []
 
     def scrape_politician_speeches(self):
         """
-        Scraping all speeches and adding them to the speeches attribute
+        Scraping all speeches and adding them to the speeches attribute. Downloads of listing pages and speeches
+        share one pool of workers, downloaded speeches are streamed through parse -> resolve -> write stages,
+        so database writes overlap with downloads.
         """
+        self.scrape_cadences([self])
 
-        with ThreadPoolExecutor() as executor:
-            futures = [executor.submit(self._scrape_all_speeches, name=politician_name, suffix=politician_suffix)
-                       for politician_name, politician_suffix
-                       in self._speeches_per_politician_url(self.speeches_url + '?view=3')]
+    @staticmethod
+    def scrape_cadences(scrapers):
+        """
+        Scrapes speeches of many cadences in one run. Listings and speeches of all cadences are downloaded by one
+        pool of workers, so the workers of the first scraper are the concurrency budget of the whole run. Speeches
+        go through one pipeline with a single database writer, that inserts batches mixing the cadences.
+        Args:
+            scrapers (list): SpeechesScraper of every cadence, with the same fetcher and pipeline settings
+        """
+        lead = scrapers[0]
+        stages = [Stage("parse", lambda speech: speech[0]._parse_speech(speech),
+                        workers=max(2, lead.parse_processes))]
+        if lead.to_database:
+            stages += [Stage("resolve", lambda speech: speech[0]._resolve_speech(speech)),
+                       Stage("write", lead._write_speech, flush=lead._flush_speeches)]
+
+        parser_pool = ProcessPoolExecutor(max_workers=lead.parse_processes) if lead.parse_processes else None
+        scheduler = Scheduler(workers=lead.workers, queue_size=lead.queue_size)
+        for scraper in scrapers:
+            scraper.scheduler, scraper.parser_pool = scheduler, parser_pool
+
+        politicians = ((scraper, politician) for scraper in scrapers
+                       for politician in scraper._speeches_per_politician_url(scraper.speeches_url + '?view=3'))
+        downloaded = scheduler.run(SpeechesScraper._list_cadence_speeches, politicians)
+
+        scraped = Counter()
+        try:
+            for scraper, name, speech_date, text in Pipeline(stages, queue_size=lead.queue_size).run(downloaded):
+                scraped[scraper, name] += 1
+                METRICS.increment("speeches_scraped_total")
+                if scraper.checkpoints:
+                    scraper.checkpoints.done(name)
+                if scraper.retain_results:
+                    scraper.speeches.append((name, speech_date, text))
+                if scraper.archive:
+                    scraper.archive.append({'politician_name': name, 'date': speech_date, 'raw_text': text,
+                                            'cadence': scraper.government_n})
+        finally:
+            for scraper in scrapers:
+                if scraper.archive:
+                    scraper.archive.close()
+                scraper.parser_pool = None
+            if parser_pool:
+                parser_pool.shutdown()
+
+        for (scraper, name), count in scraped.items():
+            if not scraper.to_database:
+                scraper.main_log.info(f"Scraped {count} speeches of {name}.")
+
+    @staticmethod
+    def _list_cadence_speeches(politician):
+        scraper, politician = politician
+        return scraper._list_speeches(politician)
 
-        for thread in as_completed(futures):
-            self.speeches += thread.result()
+    def _list_speeches(self, politician):
+        name, suffix = politician
+        url = self.speeches_url + suffix
 
-    def _scrape_all_speeches(self, name, suffix):
+        since = None
+        if self.only_new:
+            resolved = self.resolver.resolve(name)
+            since = self.last_speech.get(resolved[0]) if resolved else None
+            if self.checkpoints:
+                since = self.checkpoints.start(name, since)
 
-        speeches = []
-        for speech_date, speech_url in self._iterate_through_speeches_in_politician_url(self.speeches_url + suffix):
-            if self.only_new and speech_date < self.last_speech.get(name, datetime(1900, 1, 1)):
-                continue
+        try:
+            if since is not None:
+                # Incremental crawl reads pages one by one, so it can stop at the high-water mark
+                for speech_date, speech_url in self._iterate_through_speeches_in_politician_url(url, since=since):
+                    self._schedule_speech(name, speech_date, speech_url)
+            else:
+                pages = self._listing_pages(url, self._listing_soup(url))
+                if self.checkpoints:
+                    self.checkpoints.add_listings(name, len(pages))
+                for page_url in pages:
+                    self.scheduler.submit(self._list_page_speeches, name, page_url)
+        except (requests.RequestException, CacheMiss) as exc:
+            self.main_log.error(f"Speeches listing of {name} cannot be downloaded: {exc}")
+            if self.checkpoints:
+                self.checkpoints.listing_finished(name, failed=True)
+            return
+
+        if self.checkpoints:
+            self.checkpoints.listing_finished(name)
+
+    def _list_page_speeches(self, name, page_url):
+        try:
+            soup = self._listing_soup(page_url)
+        except (requests.RequestException, CacheMiss) as exc:
+            self.main_log.error(f"Speeches listing of {name} cannot be downloaded: {exc}")
+            if self.checkpoints:
+                self.checkpoints.listing_finished(name, failed=True)
+            return
+
+        for speech_date, speech_url in self._speeches_in_listing(soup):
+            self._schedule_speech(name, speech_date, speech_url)
+
+        if self.checkpoints:
+            self.checkpoints.listing_finished(name)
+
+    def _schedule_speech(self, name, speech_date, speech_url):
+        if self.checkpoints:
+            self.checkpoints.listed(name, speech_date)
+        self.scheduler.submit(self._fetch_speech, name, speech_date, speech_url)
+
+    def _fetch_speech(self, name, speech_date, speech_url):
+        try:
+            yield self, name, speech_date, speech_url, self.fetcher.get(self.root_url + speech_url)
+        except (requests.RequestException, CacheMiss) as exc:
+            self.main_log.error(f"Speech {speech_url} of {name} cannot be downloaded: {exc}")
+            if self.checkpoints:
+                self.checkpoints.done(name)
+
+    def _parse_speech(self, speech):
+        _, name, speech_date, speech_url, content = speech
+        try:
+            text = self._parse_speech_text(content)
+        except AttributeError:
+            self.fetcher.report_malformed(self.root_url + speech_url)
             try:
-                speeches.append(
-                    (name, speech_date, self._extract_text_from_speech(self.root_url + speech_url)))
-            except AttributeError:
-                continue
+                text = self._extract_text_from_speech(self.root_url + speech_url, repeat=False)
+            except (AttributeError, requests.RequestException, CacheMiss):
+                if self.checkpoints:
+                    self.checkpoints.done(name)
+                return
+        yield self, name, speech_date, text
 
-        if self.to_database:
-            speeches_objs = [dbutils.create_speech_object(*speech) for speech in speeches]
-            insert_results = [dbutils.insert_speech_into_db(speech) for speech in speeches_objs]
-            if any(insert_results):
-                self.mongo_log.info(f"Inserted {sum(insert_results)} speeches of {name} into db.")
-        else:
-            if speeches:
-                self.main_log.info(f"Scraped {len(speeches)} speeches of {name}.")
+    def _resolve_speech(self, speech):
+        yield speech, dbutils.create_speech_object(*speech[1:], resolver=self.resolver, cadence=self.government_n)
 
-        return speeches
+    def _write_speech(self, speech):
+        self._batch.append(speech)
+        if len(self._batch) >= self.batch_size:
+            yield from self._flush_speeches()
 
+    def _flush_speeches(self):
+        batch, self._batch = self._batch, []
+        if not batch:
+            return batch
 
-    def _extract_text_from_speech(self, url, repeat=True):
-        soup = bs.BeautifulSoup(requests.get(url).content, features="html.parser")
+        names = {speech_obj.politician_id: speech_obj.politician_name for _, speech_obj in batch}
+        for politician_id, inserted in dbutils.insert_speeches_into_db(obj for _, obj in batch).items():
+            METRICS.increment("speeches_inserted_total", inserted)
+            self.mongo_log.info(f"Inserted {inserted} speeches of {names[politician_id]} into db.")
 
-        # Cleaning function that will be used will looping through parts of speech
-        cleen_text = lambda speech_part: speech_part.get_text(strip='\xa0').replace("\r\n", "")
+        return [speech for speech, _ in batch]
+
+    def _extract_text_from_speech(self, url, repeat=True):
         try:
-            speech = " ".join(
-                [cleen_text(speech_part)
-                 for speech_part in soup.find("div", {"class": "stenogram"}).findAll("p")[1:]])
+            speech = self._parse_speech_text(self.fetcher.get(url))
         except AttributeError:
+            self.fetcher.report_malformed(url)
             if repeat:
                 speech = self._extract_text_from_speech(url, repeat=False)
             else:
@@ -110,29 +293,72 @@ class SpeechesScraper(Scraper):
                 raise
         return speech
 
-    def _iterate_through_speeches_in_politician_url(self, url):
-        soup = bs.BeautifulSoup(requests.get(url).content, features="html.parser")
+    def _parse_speech_text(self, content):
+        if self.parser_pool:
+            with METRICS.timer("parse_seconds"):
+                return self.parser_pool.submit(parsing.parse_speech_text, content, self.parser).result()
+        return parsing.parse_speech_text(content, self.parser)
+
+    def _iterate_through_speeches_in_politician_url(self, url, since=None):
+        """
+        Yields date and url of every speech in the politician listing.
+        Args:
+            url: address of the politician listing
+            since (datetime): high-water mark of an incremental crawl. If passed, speeches are yielded from the
+                              newest and pagination stops at the first speech older than the mark
+        """
+        soup = self._listing_soup(url)
+        pages = self._listing_pages(url, soup)
+
+        if since is None:
+            for page_url in pages:
+                yield from self._speeches_in_listing(self._listing_soup(page_url))
+            return
+
+        # Listing of the first page already tells in which order the pages are sorted
+        first_page = list(self._speeches_in_listing(soup))
+        newest_first = not first_page or first_page[0][0] >= first_page[-1][0]
+        if not newest_first:
+            pages.reverse()
+
+        for page_number, page_url in enumerate(pages):
+            if page_number == 0 and newest_first:
+                speeches = first_page
+            else:
+                speeches = self._speeches_in_listing(self._listing_soup(page_url))
+
+            for speech_date, speech_url in sorted(speeches, reverse=True):
+                if speech_date < since:
+                    return
+                yield speech_date, speech_url
+
+    def _listing_soup(self, url):
+        # Cached listing may miss the speeches added since it was downloaded
+        return self._soup(url, parsing.SPEECHES_LISTING, revalidate=self.only_new)
+
+    def _listing_pages(self, url, soup):
         pages = []
         if not (page_navigation := soup.findAll("ul", {"class": "pagination"})):
             pages.append(url)
         else:
             for page_tag in page_navigation[0].findAll("li")[1:-1]:
                 pages.append(self.speeches_url + page_tag.findChild().get_attribute_list("href")[0].replace(" ", '%20'))
+        return pages
 
-        for page_url in pages:
-            soup = bs.BeautifulSoup(requests.get(page_url).content, features="html.parser")
-            table = soup.find('table', {'class': "table border-bottom lista-wyp"})
+    @staticmethod
+    def _speeches_in_listing(soup):
+        table = soup.find('table', {'class': "table border-bottom lista-wyp"})
 
-            for row in table.findAll("tr")[1:]:
-                try:
-                    speech_date = row.find("td", {"class": "nobr"}).get_text()
-                    speech_url = row.findAll("td")[-2].find("a").get_attribute_list("href")[0]
-                    yield parse(speech_date), speech_url
-                except IndexError:
-                    continue
+        for row in table.findAll("tr")[1:]:
+            try:
+                speech_date = row.find("td", {"class": "nobr"}).get_text()
+                speech_url = row.findAll("td")[-2].find("a").get_attribute_list("href")[0]
+                yield parse_date(speech_date), speech_url
+            except IndexError:
+                continue
 
     def _speeches_per_politician_url(self, url):
-        soup = bs.BeautifulSoup(requests.get(url).content, features="html.parser")
+        soup = self._soup(url, parsing.POLITICIANS_LISTING, revalidate=self.only_new)
         for politician in soup.find('ul', {'class': "category-list"}).find_all("li"):
             for tag in politician:
                 if link := tag.get_attribute_list("href")[0]:
@@ -142,45 +368,114 @@ class SpeechesScraper(Scraper):
 
 
 class PoliticiansScraper(Scraper):
+    archive_name = "politicians"
 
-    def __init__(self, government_n, to_database, **kwargs):
-        super().__init__(government_n, to_database)
+    def __init__(self, government_n, to_database, refresh=False, **kwargs):
+        """
+        Args:
+            refresh (bool): update changed data of the politicians already in the database. Profiles with the same
+                            fingerprint as in the database are skipped, so only new and changed politicians are kept
+                            in the politicians attribute. Cached profiles are revalidated with the website
+        """
+        super().__init__(government_n, to_database, **kwargs)
+
+        self.refresh = refresh and to_database
+        self.fingerprints = dbutils.get_politician_fingerprints() if self.refresh else set()
 
         self.politicians = []
 
     def scrape_politicians(self):
 
-        padding = lambda n: str(n).rjust(3, "0")
-
         last_politician_number = self._find_last_politician_number()
-        self.main_log.info(f"Found {last_politician_number} politicians on the website. Scraping started...")
+        self.main_log.info(f"Found {last_politician_number} politicians on the website. "
+                           f"Looking for additional politicians...")
 
-        with ThreadPoolExecutor() as executor:
-            futures = [executor.submit(self._scrape_single_politician,
-                                       url=self.root_url + rf'posel.xsp?id={padding(politician_number)}&type=A')
-                       for politician_number in range(1, last_politician_number + 1)]
+        # Scrape additional politicians that doesn't exist on the website
+        last_hidden_number = self._find_last_hidden_politician_number(last_politician_number)
+        if last_hidden_number > last_politician_number:
+            self.main_log.info(f"Found {last_hidden_number - last_politician_number} additional hidden politicians.")
+        self.main_log.info(f"Scraping started...")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._scrape_single_politician, url=self._politician_url(politician_number))
+                       for politician_number in range(1, last_hidden_number + 1)]
+
+            results = []
+            for thread in as_completed(futures):
+                results.append(politician := thread.result())
+                if politician and self.archive:
+                    self.archive.append(politician)
+        if self.archive:
+            self.archive.close()
+
+        self.politicians += [politician for politician in results if politician]
+        self.main_log.info(f"Scraping finished. {results.count(None)} profiles didn't change.")
+
+        if self.refresh:
+            inserted, updated = dbutils.upsert_politicians(self.politicians, resolver=self.resolver)
+            METRICS.increment("politicians_inserted_total", inserted)
+            self.mongo_log.info(f"{inserted} politicians inserted to database, {updated} politicians updated")
+        elif self.to_database:
+            insert_results = [dbutils.insert_politician_to_db(politician, resolver=self.resolver)
+                              for politician in self.politicians]
+            METRICS.increment("politicians_inserted_total", sum(insert_results))
+            self.mongo_log.info(f"{sum(insert_results)} politicians inserted to database")
 
-        self.politicians += [thread.result() for thread in as_completed(futures)]
-        self.main_log.info(f"Scraping finished. Looking for additional politicians...")
+    def _politician_url(self, politician_number):
+        return self.root_url + rf'posel.xsp?id={str(politician_number).rjust(3, "0")}&type=A'
 
-        # Scrape additional politicians that doesn't exist on the website
-        while True:
-            try:
-                self.politicians.append(
-                    self._scrape_single_politician(
-                        self.root_url + rf'posel.xsp?id={padding(int(last_politician_number) + 1)}&type=A'))
-            except StopIteration:
-                break
-            self.main_log.info(f"Found additional hidden politician: {self.politicians[-1]['name']}")
-            last_politician_number += 1
+    def _find_last_hidden_politician_number(self, last_number):
+        """
+        Politicians missing on the listing have consecutive numbers following the last listed one. Number of the
+        last of them is found with exponential search, that probes a window of growing offsets in parallel,
+        followed by binary search between the last existing and the first missing number.
+        Args:
+            last_number: number of the last politician on the listing
+        Returns: Number of the last politician with a profile on the website
+        """
 
-        if self.to_database:
-            insert_results = [dbutils.insert_politician_to_db(politician) for politician in self.politicians]
-            self.mongo_log.info(f"{sum(insert_results)} politicians inserted to database")
+        with ThreadPoolExecutor(max_workers=min(self.workers, PROBE_WINDOW)) as executor:
+            existing, offset = 0, 1
+            while True:
+                offsets = [offset * 2 ** n for n in range(PROBE_WINDOW)]
+                exists = list(executor.map(lambda probe: self._politician_exists(last_number + probe), offsets))
+                if not all(exists):
+                    break
+                existing, offset = offsets[-1], offsets[-1] * 2
+
+        first_missing = exists.index(False)
+        existing, missing = offsets[first_missing - 1] if first_missing else existing, offsets[first_missing]
+
+        while missing - existing > 1:
+            middle = (existing + missing) // 2
+            if self._politician_exists(last_number + middle):
+                existing = middle
+            else:
+                missing = middle
+
+        return last_number + existing
+
+    def _politician_exists(self, politician_number):
+        """
+        Checks if profile of the politician contains data, reading only the beginning of the page
+        Raises:
+            requests.RequestException: when the profile cannot be downloaded after all retries of the fetcher
+            CacheMiss: when cache works in the offline mode and the profile was never cached
+        """
+        try:
+            content = self.fetcher.peek(self._politician_url(politician_number), until=TITLE_END,
+                                        revalidate=self.refresh)
+        except (requests.RequestException, CacheMiss) as exc:
+            # Profile that can't be read is neither existing nor missing, counting it as missing would end the
+            # search below the last politician
+            self.main_log.warning(f"Profile {politician_number} cannot be checked: {exc}")
+            raise
+
+        title = parsing.make_soup(content, parse_only=parsing.TITLE, backend=self.parser).find("h1")
+        return bool(title and title.get_text())
 
     def _find_last_politician_number(self):
-        web = requests.get(self.root_url + 'poslowie.xsp?type=A')
-        soup = bs.BeautifulSoup(web.content, 'html.parser')
+        soup = self._soup(self.root_url + 'poslowie.xsp?type=A', parsing.LINKS)
 
         all_links = [line.get_attribute_list("href") for line in soup.findAll("a")]
 
@@ -193,8 +488,7 @@ class PoliticiansScraper(Scraper):
 
     def _scrape_single_politician(self, url):
         politician_info = dict()
-        web = requests.get(url)
-        soup = bs.BeautifulSoup(web.content, 'html.parser')
+        soup = self._soup(url, revalidate=self.refresh)
 
         politician_info["name"] = soup.find(id="title_content").find("h1").get_text()
 
@@ -236,10 +530,23 @@ class PoliticiansScraper(Scraper):
         except AttributeError:  # email is not available
             pass
 
-        return self._clean_politician_data(politician_info)
+        politician_info["fingerprint"] = self._fingerprint(politician_info)
+        if politician_info["fingerprint"] in self.fingerprints:
+            return None
+
+        return self._clean_politician_data(politician_info, self.government_n)
+
+    @staticmethod
+    def _fingerprint(politician_dict):
+        """
+        Returns: Digest of the data scraped from the politician profile, before it is cleaned
+        """
+        bk = blake2b(digest_size=16)
+        bk.update(json.dumps(politician_dict, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        return bk.hexdigest()
 
     @staticmethod
-    def _clean_politician_data(politician_dict):
+    def _clean_politician_data(politician_dict, government_n=9):
 
         def parse_election_area(value):
             nonlocal politician_dict
@@ -253,7 +560,7 @@ class PoliticiansScraper(Scraper):
 
             date_of_birth, place_of_birth = value.split(", ")
             politician_dict['place_of_birth'] = place_of_birth
-            politician_dict['date_of_birth'] = parse(date_of_birth)
+            politician_dict['date_of_birth'] = parse_date(date_of_birth)
             politician_dict['age'] = (datetime.now() - politician_dict['date_of_birth']).days // 365
 
         def assemble_email(value):
@@ -282,12 +589,13 @@ class PoliticiansScraper(Scraper):
 
         def parse_parliment_member(value):
             previous_parliments = re.findall(r'([XVI]+)', value) or []
-            return list(set(previous_parliments + ["IX"]))
+            return sorted(set(previous_parliments + [int_to_roman(government_n)]))
 
         transform = {
-            'election_date': lambda value: parse(value),
+            'election_date': parse_date,
             'election_area': parse_election_area,
-            'oath_date': lambda value: parse(value),
+            'oath_date': parse_date,
+            'resign_date': parse_date,
             'parliment_member': parse_parliment_member,
             'place_and_date_of_brith': parse_place_and_date_of_birth,
             'email': assemble_email,
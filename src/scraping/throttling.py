@@ -0,0 +1,133 @@
+"""
+This module contain controllers of the request rate used by the fetch layer. Number of requests in flight adapts
+to the responses of the website and the rate of requests never exceeds the configured ceiling.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from src.utils import METRICS
+
+
+class AdaptiveLimit:
+    """
+    Concurrency limit controlled with additive increase / multiplicative decrease. Every healthy response raises
+    the limit by 1 / limit, so it grows by one after a whole window of requests. Server errors, timeouts, slow or
+    malformed responses cut it by the decrease factor. Limit is cut at most once per average response time, so
+    a burst of errors caused by one overload doesn't drop it to the minimum.
+    """
+
+    def __init__(self, maximum, minimum=1, initial=None, decrease=0.5, latency_target=None):
+        """
+        Args:
+            maximum (int): highest number of requests in flight
+            minimum (int): lowest number of requests in flight
+            initial (int): starting limit. Defaults to half of the maximum
+            decrease (float): factor the limit is multiplied by on congestion
+            latency_target (float): response time in seconds above which a response is treated as congestion.
+                Only errors are taken into account if not passed
+        """
+        self.log = logging.getLogger("main")
+
+        self.maximum = maximum
+        self.minimum = min(minimum, maximum)
+        self.decrease = decrease
+        self.latency_target = latency_target
+
+        self._limit = float(max(self.minimum, initial or maximum // 2))
+        self._in_flight = 0
+        self._latency = 0.0  # moving average of the response time
+        self._decreased_at = float("-inf")
+        self._condition = threading.Condition()
+        METRICS.set_gauge("concurrency_limit", self.limit)
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    @contextmanager
+    def slot(self):
+        """
+        Waits until number of requests in flight is below the limit. Response time of the request made inside
+        the context is registered as healthy, unless congestion() is called.
+        """
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+        start = time.perf_counter()
+        outcome = {'congested': False}
+        try:
+            yield lambda: outcome.update(congested=True)
+        finally:
+            latency = time.perf_counter() - start
+            with self._condition:
+                self._in_flight -= 1
+                self._latency = latency if not self._latency else 0.8 * self._latency + 0.2 * latency
+                if outcome['congested'] or (self.latency_target and latency > self.latency_target):
+                    self._decrease()
+                else:
+                    self._set(min(self.maximum, self._limit + 1 / self._limit))
+                self._condition.notify_all()
+
+    def congestion(self):
+        """
+        Registers congestion noticed outside of the request, e.g. a malformed page
+        """
+        with self._condition:
+            self._decrease()
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._decreased_at < self._latency:
+            return
+        self._decreased_at = now
+        self._set(max(self.minimum, self._limit * self.decrease))
+
+    def _set(self, limit):
+        previous, self._limit = self.limit, limit
+        if self.limit == previous:
+            return
+
+        METRICS.set_gauge("concurrency_limit", self.limit)
+        if self.limit < previous:
+            self.log.info(f"Concurrency limit lowered to {self.limit} requests.")
+        else:
+            self.log.debug(f"Concurrency limit raised to {self.limit} requests.")
+
+
+class RateLimit:
+    """
+    Token bucket limiting the number of requests per second. Tokens are reserved in the order of the calls, so
+    waiting threads are served fairly.
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        Args:
+            rate (float): maximum number of requests per second
+            burst (int): number of requests that can be sent at once after a pause
+        """
+        self.rate = rate
+        self.burst = burst
+
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """
+        Blocks until the next request can be sent
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate) - 1
+            self._updated = now
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        if delay:
+            METRICS.observe("rate_limit_wait_seconds", delay)
+            time.sleep(delay)
@@ -0,0 +1,164 @@
+"""
+This module contain worker of the distributed speeches crawl. Jobs are read from the queue stored in the mongo
+database, so many workers on many machines can share one crawl without downloading the same pages twice.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+from collections import Counter
+
+import requests
+from pymongo.errors import PyMongoError
+
+import src.mongo.utils as dbutils
+from src.exceptions import CacheMiss
+from src.scraping.fetching import Fetcher
+from src.scraping.scraping import SpeechesScraper
+from src.utils import METRICS
+
+
+def enqueue_politicians(queue, government_n, **scraper_args):
+    """
+    Adds listings of speeches of every politician of the cadence to the job queue
+    Args:
+        queue (JobQueue): queue of the scrape jobs
+        government_n (int): government cadence
+        **scraper_args: arguments of the SpeechesScraper, e.g. fetcher or name_filter
+    Returns: Number of queued listings
+    """
+    scraper = SpeechesScraper(government_n, False, only_new=False, **scraper_args)
+    jobs = [queue.job("listing", government_n, name, suffix)
+            for name, suffix in scraper._speeches_per_politician_url(scraper.speeches_url + '?view=3')]
+
+    # Listings are read again in every crawl, speeches are downloaded only once
+    return queue.enqueue(jobs, reset_finished=True)
+
+
+class QueueWorker:
+    """
+    Processes jobs claimed from the queue in a pool of threads. Listing job adds speeches of the politician to the
+    queue, speech job downloads the speech and inserts it into the database. Speeches are identified by theirs hash,
+    so a job repeated after its lease expired doesn't create duplicates.
+    """
+
+    def __init__(self, queue, workers=4, only_new=True, poll_interval=5, worker_id=None, **scraper_args):
+        """
+        Args:
+            queue (JobQueue): queue of the scrape jobs
+            workers (int): number of threads processing jobs
+            only_new (bool): listings are read only up to the last speech of a politician in the database
+            poll_interval (float): seconds between claims when all remaining jobs are leased by other workers
+            worker_id (str): identifier of the worker in the queue. Defaults to host name and process id
+            **scraper_args: arguments of the SpeechesScraper, e.g. fetcher, resolver or root_url
+        """
+        self.main_log = logging.getLogger("main")
+
+        self.queue = queue
+        self.workers = workers
+        self.only_new = only_new
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+
+        scraper_args.setdefault('fetcher', Fetcher(max_connections=workers))
+        if not scraper_args.get('resolver'):
+            scraper_args['resolver'] = dbutils.PoliticianResolver()
+        self.scraper_args = scraper_args
+
+        self.results = Counter()
+        self._scrapers = dict()  # cadence -> (scraper, last speech per politician)
+        self._leased = dict()  # job id -> job processed by one of the threads
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def run(self):
+        """
+        Processes jobs until there is nothing left in the queue
+        Returns: Number of processed jobs per result
+        """
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+        heartbeat.start()
+
+        threads = [threading.Thread(target=self._work) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self._stopped.set()
+        heartbeat.join()
+        self.main_log.info(f"Worker {self.worker_id} finished: {dict(self.results)}. Queue: {self.queue.counts()}")
+        return self.results
+
+    def _work(self):
+        while True:
+            if not (job := self.queue.claim(self.worker_id)):
+                if not self.queue.active():
+                    return
+                time.sleep(self.poll_interval)
+                continue
+
+            with self._lock:
+                self._leased[job['_id']] = job
+            try:
+                result = self._process(job)
+            except Exception as exc:
+                # Errors of the website are expected, any other error is logged, but doesn't stop the thread
+                if not isinstance(exc, (requests.RequestException, CacheMiss, AttributeError, LookupError)):
+                    self.main_log.exception(f"Job {job['key']} failed with an unexpected error.")
+                result = "failed"
+                try:
+                    self.queue.fail(job, self.worker_id, exc)
+                except PyMongoError:
+                    self.main_log.exception(f"Job {job['key']} not released, it is retried when its lease expires.")
+            finally:
+                with self._lock:
+                    del self._leased[job['_id']]
+
+            METRICS.increment("queue_jobs_total", kind=job['kind'], result=result)
+            with self._lock:
+                self.results[result] += 1
+
+    def _process(self, job):
+        scraper, last_speech = self._scraper(job['government_n'])
+
+        if job['kind'] == "listing":
+            since = None
+            if resolved := scraper.resolver.resolve(job['politician_name']):
+                since = last_speech.get(resolved[0])
+
+            speeches = scraper._iterate_through_speeches_in_politician_url(scraper.speeches_url + job['url'], since)
+            queued = self.queue.enqueue([self.queue.job("speech", job['government_n'], job['politician_name'],
+                                                        speech_url, speech_date)
+                                         for speech_date, speech_url in speeches])
+            self.queue.complete(job, self.worker_id)
+            self.main_log.debug(f"Queued {queued} speeches of {job['politician_name']}.")
+            return "listed"
+
+        text = scraper._extract_text_from_speech(scraper.root_url + job['url'])
+        speech = dbutils.create_speech_object(job['politician_name'], job['speech_date'], text,
+                                              resolver=scraper.resolver, cadence=job['government_n'])
+        if not speech.politician_id:
+            raise LookupError(f"Politician {job['politician_name']} not found in the database.")
+
+        inserted = dbutils.insert_speeches_into_db([speech]).get(speech.politician_id, 0)
+        METRICS.increment("speeches_inserted_total", inserted)
+        self.queue.complete(job, self.worker_id, speech_hash=speech.hash)
+        return "inserted" if inserted else "duplicated"
+
+    def _scraper(self, government_n):
+        with self._lock:
+            if government_n not in self._scrapers:
+                scraper = SpeechesScraper(government_n, False, only_new=False, **self.scraper_args)
+                last_speech = dbutils.get_last_speech_per_politician(government_n) if self.only_new else {}
+                self._scrapers[government_n] = scraper, last_speech
+            return self._scrapers[government_n]
+
+    def _heartbeat(self):
+        while not self._stopped.wait(self.queue.lease.total_seconds() / 3):
+            with self._lock:
+                job_ids = list(self._leased)
+            if job_ids:
+                self.queue.heartbeat(job_ids, self.worker_id)
@@ -1,2 +1,5 @@
 from .file_utils import pickle_obj, read_pickle, get_project_structure
-from .utils import swap_name_with_surname
+from .utils import swap_name_with_surname, int_to_roman, roman_to_int
+from .metrics import METRICS
+from .archive import Archive
+from .dates import parse_date
@@ -0,0 +1,168 @@
+"""
+Module with append-only archive of scraped records. Records are stored as JSON lines in compressed chunks,
+that are appended to segment files in the backup folder. Offset of every chunk is kept in an index file,
+so the archive can be read lazily, chunk by chunk, from memory-mapped segments.
+"""
+
+import gzip
+import importlib.util
+import json
+import mmap
+import threading
+from datetime import datetime
+
+# Archive is imported by every command, so zstandard is imported only when the first chunk is compressed or read
+DEFAULT_CODEC = "zstd" if importlib.util.find_spec("zstandard") else "gzip"
+
+EXTENSIONS = {"zstd": "zst", "gzip": "gz"}
+
+
+class Archive:
+    """
+    Archive of records, e.g. speeches or politicians, that can be written while a scraper runs. Every chunk is
+    an independent zstd frame or gzip member, so a segment file is also a valid compressed JSON lines file.
+    Chunks are registered in the index only after they are written, so a crash never leaves a broken chunk behind.
+    """
+
+    def __init__(self, folder, name, chunk_records=1000, segment_bytes=256 * 1024 ** 2, codec=None):
+        """
+        Args:
+            folder (pathlib.Path): folder of the archive, created if it doesn't exist
+            name (str): name of the archive, used as a prefix of its files
+            chunk_records (int): number of records compressed together
+            segment_bytes (int): size after which a new segment file is started
+            codec (str): "zstd" or "gzip". Defaults to zstd if zstandard is installed
+        """
+        self.folder = folder
+        self.name = name
+        self.chunk_records = chunk_records
+        self.segment_bytes = segment_bytes
+        self.codec = codec or DEFAULT_CODEC
+
+        self.index_path = folder.joinpath(f"{name}.index.jsonl")
+
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._segment = None
+        self._segment_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        for entry in self.chunks():
+            yield from self.read_chunk(entry)
+
+    def count(self):
+        """
+        Returns: Number of records in the archive
+        """
+        return sum(entry['records'] for entry in self.chunks())
+
+    def append(self, record):
+        """
+        Args:
+            record: dictionary serializable to json. Datetime values are preserved
+        """
+        with self._lock:
+            self._buffer.append(record)
+            if len(self._buffer) >= self.chunk_records:
+                self._write_chunk()
+
+    def flush(self):
+        with self._lock:
+            self._write_chunk()
+
+    def close(self):
+        with self._lock:
+            self._write_chunk()
+            if self._segment:
+                self._segment.close()
+                self._segment = None
+
+    def chunks(self):
+        """
+        Returns: List of index entries of the chunks: segment file, offset, length, codec and number of records
+        """
+        if not self.index_path.exists():
+            return []
+        with open(self.index_path, "r", encoding="utf-8") as index:
+            return [json.loads(line) for line in index if line.endswith("\n")]
+
+    def read_chunk(self, entry):
+        """
+        Args:
+            entry: index entry of the chunk
+        Returns: List of records of the chunk
+        """
+        with open(self.folder.joinpath(entry['segment']), "rb") as segment:
+            with mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                compressed = data[entry['offset']:entry['offset'] + entry['length']]
+
+        lines = _decompress(compressed, entry['codec']).decode("utf-8").splitlines()
+        return [json.loads(line, object_hook=_decode) for line in lines]
+
+    def _write_chunk(self):
+        if not self._buffer:
+            return
+
+        records, self._buffer = self._buffer, []
+        lines = "".join(json.dumps(record, default=_encode, ensure_ascii=False) + "\n" for record in records)
+        compressed = _compress(lines.encode("utf-8"), self.codec)
+
+        if self._segment is None or self._segment.tell() >= self.segment_bytes:
+            self._open_segment()
+
+        offset = self._segment.tell()
+        self._segment.write(compressed)
+        self._segment.flush()
+
+        entry = {'segment': self._segment_path.name, 'offset': offset, 'length': len(compressed),
+                 'codec': self.codec, 'records': len(records)}
+        with open(self.index_path, "a", encoding="utf-8") as index:
+            index.write(json.dumps(entry) + "\n")
+
+    def _open_segment(self):
+        if self._segment:
+            self._segment.close()
+
+        # Segments of previous runs are never modified
+        self.folder.mkdir(parents=True, exist_ok=True)
+        number = len(list(self.folder.glob(f"{self.name}-*.jsonl.*")))
+        self._segment_path = self.folder.joinpath(f"{self.name}-{number:05d}.jsonl.{EXTENSIONS[self.codec]}")
+        self._segment = open(self._segment_path, "ab")
+
+
+def _compress(data, codec):
+    if codec == "zstd":
+        return _zstandard().ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data)
+
+
+def _decompress(data, codec):
+    if codec == "zstd":
+        return _zstandard().ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstandard package is required to use zstd compression") from None
+    return zstandard
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj):
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
@@ -0,0 +1,113 @@
+"""
+Module with compression of short texts, like single speeches, with a dictionary shared by all of them. Speeches
+repeat the same phrases, so a dictionary trained on a sample of them compresses every speech much better than
+a codec that learns the language from scratch in every text.
+"""
+
+import importlib.util
+import re
+import threading
+import zlib
+from collections import Counter
+
+from .archive import _zstandard
+
+# zstandard is imported only when it is used, availability is checked without importing it
+DEFAULT_CODEC = "zstd" if importlib.util.find_spec("zstandard") else "zlib"
+
+ZLIB_DICTIONARY_SIZE = 32 * 1024  # zlib uses at most the last 32 KB of the dictionary
+PHRASE = re.compile(r"\S+(?: \S+){0,2} ")
+
+
+class TextCompressor:
+    """
+    Compresses texts with zstd and a trained dictionary, or with zlib and a preset dictionary if zstandard is not
+    installed. Instance can be shared by many threads.
+    """
+
+    def __init__(self, dictionary=b"", codec=None, level=None):
+        """
+        Args:
+            dictionary (bytes): dictionary created by train()
+            codec (str): "zstd" or "zlib". Defaults to zstd if zstandard is installed
+            level (int): compression level. Defaults to 9 for zstd and 6 for zlib
+        """
+        self.dictionary = dictionary
+        self.codec = codec or DEFAULT_CODEC
+        self.level = level or (9 if self.codec == "zstd" else 6)
+
+        self._zstd_dictionary = None
+        if self.codec == "zstd":
+            zstandard = _zstandard()
+            if dictionary:
+                self._zstd_dictionary = zstandard.ZstdCompressionDict(dictionary)
+                self._zstd_dictionary.precompute_compress(level=self.level)
+        self._local = threading.local()
+
+    @classmethod
+    def train(cls, samples, size=112 * 1024, codec=None, level=None):
+        """
+        Args:
+            samples: texts the dictionary is trained on, e.g. a few thousand speeches
+            size (int): maximum size of the dictionary in bytes. zlib dictionary is limited to 32 KB
+            codec (str): "zstd" or "zlib". Defaults to zstd if zstandard is installed
+            level (int): compression level
+        Returns: TextCompressor with the trained dictionary
+        """
+        codec = codec or DEFAULT_CODEC
+        if codec == "zstd":
+            samples = [sample.encode("utf-8") for sample in samples]
+            dictionary = _zstandard().train_dictionary(size, samples, level=level or 9).as_bytes()
+        else:
+            dictionary = _phrases_dictionary(samples, min(size, ZLIB_DICTIONARY_SIZE))
+        return cls(dictionary, codec=codec, level=level)
+
+    def compress(self, text):
+        """
+        Returns: Compressed text in bytes
+        """
+        data = text.encode("utf-8")
+        if self.codec == "zstd":
+            return self._zstd()[0].compress(data)
+
+        # Raw deflate stream, without header and checksum that would take a big part of a short text
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS, **self._zlib_dictionary())
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data):
+        """
+        Returns: Text decompressed from bytes created by compress()
+        """
+        if self.codec == "zstd":
+            return self._zstd()[1].decompress(data).decode("utf-8")
+
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS, **self._zlib_dictionary())
+        return (decompressor.decompress(data) + decompressor.flush()).decode("utf-8")
+
+    def _zlib_dictionary(self):
+        return {'zdict': self.dictionary} if self.dictionary else {}
+
+    def _zstd(self):
+        # zstd contexts can't be used by many threads at once, every thread gets its own pair
+        if not hasattr(self._local, "contexts"):
+            zstandard = _zstandard()
+            dictionary_args = {'dict_data': self._zstd_dictionary} if self._zstd_dictionary else {}
+            self._local.contexts = (zstandard.ZstdCompressor(level=self.level, **dictionary_args),
+                                    zstandard.ZstdDecompressor(**dictionary_args))
+        return self._local.contexts
+
+
+def _phrases_dictionary(samples, size):
+    # zlib finds matches closer to the end of the dictionary with shorter codes, so the most valuable phrases,
+    # the ones saving most bytes in all samples, are put at the end
+    phrases = Counter(phrase for sample in samples for phrase in PHRASE.findall(sample))
+    common = sorted((phrase.encode("utf-8") for phrase, count in phrases.items() if count > 1),
+                    key=lambda phrase: len(phrase) * phrases[phrase.decode("utf-8")], reverse=True)
+
+    dictionary, length = [], 0
+    for phrase in common:
+        if length + len(phrase) > size:
+            break
+        dictionary.append(phrase)
+        length += len(phrase)
+    return b"".join(reversed(dictionary))
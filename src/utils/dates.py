@@ -0,0 +1,37 @@
+"""
+Module with parsing of the dates found on the government website. Website uses a few fixed formats, so dates are
+matched with precompiled patterns first and only strings of other shapes are parsed with dateutil.
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+
+# Listings of speeches, e.g. 2021-03-17
+ISO_DATE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+# Profiles of politicians, e.g. 13-10-2019 or 21.06.1975
+NUMERIC_DATE = re.compile(r"(\d{1,2})([-./])(\d{1,2})\2(\d{4})")
+
+
+@lru_cache(maxsize=8192)
+def parse_date(value):
+    """
+    Parses the date the same way as dateutil.parser.parse with its default settings. Numeric dates are read month
+    first, unless the first number can't be a month, so "12-11-2019" is 11 December and "25-10-2019" is 25 October.
+    Args:
+        value (str): date from the website
+    Returns: datetime object
+    """
+    text = value.strip()
+
+    if match := ISO_DATE.fullmatch(text):
+        year, month, day = map(int, match.groups())
+        return datetime(year, month, day)
+
+    if match := NUMERIC_DATE.fullmatch(text):
+        first, _, second, year = match.groups()
+        month, day = (int(first), int(second)) if int(first) <= 12 else (int(second), int(first))
+        return datetime(int(year), month, day)
+
+    from dateutil.parser import parse
+    return parse(text)
@@ -4,6 +4,7 @@ Module with util functions related to files and directories
 
 import pickle
 import pathlib
+from functools import lru_cache
 
 
 def pickle_obj(obj, file_name):
@@ -18,8 +19,11 @@ def read_pickle(file_path):
 
 
 # TODO unit tests
+@lru_cache(maxsize=None)
 def get_project_structure():
     """
+    Project directories are resolved once per process. They are not created here, code writing into a directory
+    creates it when it is needed.
     Returns: Dictionary with pathlib.Path objects with important project directories.
     """
     p = pathlib.Path.cwd()
@@ -38,7 +42,4 @@ def get_project_structure():
                              backup=root.joinpath("backup"),
                              log_folder=root.joinpath("logs"))
 
-    for path in project_structure.values():
-        path.mkdir(parents=True, exist_ok=True)
-
     return project_structure
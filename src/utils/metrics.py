@@ -0,0 +1,178 @@
+"""
+Module with in-process metrics of the scraping runs: counters, gauges and latency histograms,
+exportable as Prometheus text format or json summary.
+"""
+
+import bisect
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Returns: Upper bound of the bucket containing given quantile
+        """
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets + (self.max,), self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Metrics:
+    """
+    Thread-safe registry of metrics. Every metric is identified by its name and optional labels.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.counters = dict()
+        self.gauges = dict()
+        self.histograms = dict()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def increment(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        """
+        Sets current value of the gauge. Highest value is kept as a separate <name>_max gauge.
+        """
+        key, max_key = _key(name, labels), _key(f"{name}_max", labels)
+        with self._lock:
+            self.gauges[key] = value
+            self.gauges[max_key] = max(self.gauges.get(max_key, value), value)
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name, **labels):
+        """
+        Decorator observing duration of every call of the function
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            for kind, metrics in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({name for name, _ in metrics}):
+                    lines.append(f"# TYPE {name} {kind}")
+                    lines += [f"{name}{_labels(labels)} {value}"
+                              for (metric, labels), value in sorted(metrics.items()) if metric == name]
+
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        with self._lock:
+            return {
+                "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+                "duration_seconds": time.time() - self.started_at,
+                "counters": {_name(key): value for key, value in sorted(self.counters.items())},
+                "gauges": {_name(key): value for key, value in sorted(self.gauges.items())},
+                "histograms": {_name(key): {"count": histogram.count,
+                                            "sum": histogram.sum,
+                                            "mean": histogram.sum / histogram.count,
+                                            "p50": histogram.quantile(0.5),
+                                            "p99": histogram.quantile(0.99),
+                                            "max": histogram.max}
+                               for key, histogram in sorted(self.histograms.items(), key=lambda item: item[0])}
+            }
+
+    def export(self, folder, fmt="json"):
+        """
+        Writes metrics of the run into the folder
+        Args:
+            folder (pathlib.Path): destination folder, usually the project logs folder
+            fmt (str): "json" for the run summary or "prometheus" for Prometheus text format
+        Returns: Path of the written file
+        """
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        if fmt == "prometheus":
+            path = folder.joinpath(f"metrics-{stamp}.prom")
+            path.write_text(self.to_prometheus())
+        else:
+            path = folder.joinpath(f"metrics-{stamp}.json")
+            path.write_text(json.dumps(self.summary(), indent=2))
+        return path
+
+
+def _key(name, labels):
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def _name(key):
+    name, labels = key
+    return name + _labels(labels)
+
+
+# Metrics of the current run shared by all modules
+METRICS = Metrics()
@@ -14,3 +14,27 @@ def swap_name_with_surname(full_name):
     swapped_full_name = list(name_parts[1:] + [name_parts[0]])
 
     return " ".join(swapped_full_name)
+
+
+def int_to_roman(number):
+
+    numerals = ((10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I"))
+
+    roman = ""
+    for value, numeral in numerals:
+        count, number = divmod(number, value)
+        roman += numeral * count
+
+    return roman
+
+
+def roman_to_int(roman):
+
+    numerals = {"I": 1, "V": 5, "X": 10}
+
+    number = 0
+    for numeral, following in zip(roman, roman[1:] + " "):
+        value = numerals[numeral]
+        number += -value if value < numerals.get(following, 0) else value
+
+    return number
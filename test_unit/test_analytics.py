@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pytest
+
+mongoengine = pytest.importorskip("mongoengine")
+pytest.importorskip("mongomock")
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+import src.mongo.mongo_setup as mongo_setup
+import src.mongo.utils as dbutils
+from src.mongo.utils.analytics import SpeechAnalytics
+
+
+@pytest.fixture
+def database():
+    mongoengine.disconnect(alias="core")
+    mongo_setup.global_init(mock=True)
+    for name, group in [("Anna Nowak", "Klub A"), ("Jan Kowalski", "Klub B"), ("Ewa Wiśniewska", "Klub A")]:
+        dbutils.insert_politician_to_db({'name': name, 'sex': "woman", 'date_of_birth': datetime(1980, 1, 1),
+                                         'political_group': group, 'age': 40, 'parliment_member': ["IX"]})
+    yield
+    mongoengine.disconnect(alias="core")
+
+
+def insert_speeches(politician_name, dates, text="Wysoka Izbo!", cadence=9):
+    dbutils.insert_speeches_into_db([dbutils.create_speech_object(politician_name, date, f"{text} {n}", cadence=cadence)
+                                     for n, date in zip("ABCDEF", dates)])
+
+
+def test_speeches_per_party_and_month(database):
+    insert_speeches("Anna Nowak", [datetime(2020, 1, 5), datetime(2020, 1, 6), datetime(2020, 2, 1)])
+    insert_speeches("Ewa Wiśniewska", [datetime(2020, 1, 7)], text="Wysoka Izbo?")
+    insert_speeches("Jan Kowalski", [datetime(2020, 2, 3)], text="Wysoka Izbo.", cadence=8)
+
+    report = SpeechAnalytics().speeches_per_party()
+    assert report.to_dict("records") == [
+        {'period': "2020-01", 'party': "Klub A", 'speeches': 3, 'characters': 42},
+        {'period': "2020-02", 'party': "Klub A", 'speeches': 1, 'characters': 14},
+        {'period': "2020-02", 'party': "Klub B", 'speeches': 1, 'characters': 14}]
+
+    arrays = SpeechAnalytics(as_frame=False).speeches_per_party(period="year", cadences=[9])
+    assert arrays['speeches'].tolist() == [4]
+    assert arrays['speeches'].dtype == np.int64
+
+
+def test_speeches_per_politician(database):
+    insert_speeches("Anna Nowak", [datetime(2020, 1, 5), datetime(2020, 3, 6)], text="Panie Marszałku!")
+    insert_speeches("Jan Kowalski", [datetime(2020, 2, 3)])
+
+    report = SpeechAnalytics().speeches_per_politician()
+    assert report['politician_name'].tolist() == ["Anna Nowak", "Jan Kowalski"]
+    assert report['speeches'].tolist() == [2, 1]
+    assert report['mean_length'].tolist() == [18.0, 14.0]
+    assert report['last_speech'][0] == datetime(2020, 3, 6)
+
+
+def test_reports_are_cached_until_new_data_is_added(database, tmp_path):
+    insert_speeches("Anna Nowak", [datetime(2020, 1, 5)])
+    analytics = SpeechAnalytics(cache_folder=tmp_path)
+    assert analytics.speeches_per_politician()['speeches'].sum() == 1
+
+    # Cached report is read also by another instance, e.g. the next run of the command
+    report = analytics.speeches_per_politician()
+    report['speeches'] += 10
+    assert SpeechAnalytics(cache_folder=tmp_path).speeches_per_politician()['speeches'].sum() == 1
+    assert len(list(tmp_path.iterdir())) == 1
+
+    insert_speeches("Jan Kowalski", [datetime(2020, 1, 6)], text="Panie Marszałku!")
+    assert analytics.speeches_per_politician()['speeches'].sum() == 2
@@ -0,0 +1,42 @@
+import importlib.util
+from datetime import datetime
+
+import pytest
+
+from src.utils.archive import Archive
+
+CODECS = ["gzip", pytest.param("zstd", marks=pytest.mark.skipif(importlib.util.find_spec("zstandard") is None,
+                                                                reason="zstandard is not installed"))]
+
+
+@pytest.mark.parametrize('codec', CODECS)
+def test_archive_is_read_back_in_order(tmp_path, codec):
+    records = [{'politician_name': "Jan Nowak", 'date': datetime(2020, 1, n % 28 + 1), 'raw_text': "ą" * n}
+               for n in range(250)]
+
+    with Archive(tmp_path, "speeches_9", chunk_records=40, segment_bytes=500, codec=codec) as archive:
+        for record in records[:100]:
+            archive.append(record)
+
+    # Next run appends new segments
+    with Archive(tmp_path, "speeches_9", chunk_records=40, codec=codec) as archive:
+        for record in records[100:]:
+            archive.append(record)
+
+    archive = Archive(tmp_path, "speeches_9")
+    assert archive.count() == 250
+    assert list(archive) == records
+    assert len({entry['segment'] for entry in archive.chunks()}) > 2
+
+
+def test_chunk_missing_in_index_is_ignored(tmp_path):
+    with Archive(tmp_path, "politicians_9", chunk_records=2) as archive:
+        for n in range(3):
+            archive.append({'name': str(n)})
+
+    # Interrupted write of a chunk
+    segment = tmp_path.joinpath(archive.chunks()[-1]['segment'])
+    with open(segment, "ab") as file:
+        file.write(b"\x1f\x8b broken")
+
+    assert [record['name'] for record in Archive(tmp_path, "politicians_9")] == ["0", "1", "2"]
@@ -0,0 +1,129 @@
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from src.exceptions import CacheMiss
+from src.scraping import cache as cache_module
+from src.scraping.cache import ResponseCache
+from src.scraping.fetching import Fetcher
+from src.utils import METRICS
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture
+def server():
+    """
+    Serves a page with ETag and Last-Modified validators, answering conditional requests with 304 Not Modified
+    """
+    state = SimpleNamespace(body=b"first version", etag='"v1"', requests=[])
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state.requests.append(dict(self.headers))
+            if self.headers.get("If-None-Match") == state.etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", state.etag)
+            self.send_header("Last-Modified", "Mon, 01 Jan 2024 00:00:00 GMT")
+            self.send_header("Content-Length", str(len(state.body)))
+            self.end_headers()
+            self.wfile.write(state.body)
+
+        def log_message(self, *args):
+            pass
+
+    http_server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    state.url = f"http://127.0.0.1:{http_server.server_port}/posel.xsp?id=001"
+    yield state
+    http_server.shutdown()
+    http_server.server_close()
+
+
+def test_pages_expire_after_their_ttl(tmp_path, clock):
+    cache = ResponseCache(tmp_path, ttls=((re.compile(r"posel\.xsp"), 60), (re.compile(r"wypowiedz\.xsp"), None)))
+    cache.store("http://site/posel.xsp?id=001", b"profile", {})
+    cache.store("http://site/wypowiedz.xsp?id=1", b"speech", {})
+
+    clock.now += 59
+    assert cache.is_fresh(cache.lookup("http://site/posel.xsp?id=001"))
+
+    clock.now += 2
+    assert not cache.is_fresh(cache.lookup("http://site/posel.xsp?id=001"))
+    assert cache.is_fresh(cache.lookup("http://site/wypowiedz.xsp?id=1"))
+
+
+def test_expired_page_is_revalidated_with_conditional_request(tmp_path, server):
+    METRICS.reset()
+    fetcher = Fetcher(retries=0, cache=ResponseCache(tmp_path, ttls=(), default_ttl=0))
+
+    assert fetcher.get(server.url) == b"first version"
+    assert fetcher.get(server.url) == b"first version"
+
+    assert server.requests[1]["If-None-Match"] == '"v1"'
+    assert server.requests[1]["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert METRICS.summary()['counters']['cache_revalidations_total'] == 1
+
+    # Changed page is downloaded again
+    server.body, server.etag = b"second version", '"v2"'
+    assert fetcher.get(server.url) == b"second version"
+    assert fetcher.cache.lookup(server.url).etag == '"v2"'
+
+
+def test_fresh_page_is_revalidated_on_demand(tmp_path, server):
+    fetcher = Fetcher(retries=0, cache=ResponseCache(tmp_path))
+
+    fetcher.get(server.url)
+    fetcher.get(server.url)
+    assert len(server.requests) == 1
+
+    assert fetcher.get(server.url, revalidate=True) == b"first version"
+    assert len(server.requests) == 2
+
+
+def test_least_recently_used_pages_are_evicted(tmp_path, clock):
+    cache = ResponseCache(tmp_path, max_size=10)
+    cache.store("http://site/a", b"aaaaa", {})
+    clock.now += 1
+    cache.store("http://site/b", b"bbbbb", {})
+    clock.now += 1
+    cache.read(cache.lookup("http://site/a"))
+    clock.now += 1
+    cache.store("http://site/c", b"ccccc", {})
+
+    assert cache.lookup("http://site/b") is None
+    assert cache.read(cache.lookup("http://site/a")) == b"aaaaa"
+    assert cache.read(cache.lookup("http://site/c")) == b"ccccc"
+    assert len(list(tmp_path.joinpath("objects").glob("*/*"))) == 2
+
+
+def test_offline_cache_never_downloads(tmp_path, clock, server):
+    ResponseCache(tmp_path, ttls=(), default_ttl=0).store(server.url, b"cached version", {})
+    fetcher = Fetcher(retries=0, cache=ResponseCache(tmp_path, ttls=(), default_ttl=0, offline=True))
+
+    # Expired pages are replayed, pages missing in the cache are not downloaded
+    assert fetcher.get(server.url, revalidate=True) == b"cached version"
+    with pytest.raises(CacheMiss):
+        fetcher.get(server.url + "&type=A")
+    with pytest.raises(CacheMiss):
+        fetcher.peek(server.url + "&type=A", until=re.compile(b"</h1>"))
+    assert server.requests == []
@@ -0,0 +1,84 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from src.utils.compression import TextCompressor
+
+WORDS = ["Wysoka", "Izbo", "panie", "marszałku", "ustawa", "projekt", "komisja", "budżet", "posłowie", "rząd",
+         "sprawie", "głosowanie", "poprawka", "Sejm", "ministra", "finansów", "pytanie", "odpowiedź"]
+
+
+def speeches(count, seed=0):
+    rng = random.Random(seed)
+    return [f"Panie Marszałku! Wysoka Izbo! {' '.join(rng.choices(WORDS, k=rng.randint(30, 200)))}. Dziękuję."
+            for _ in range(count)]
+
+
+@pytest.mark.parametrize('codec', ["zstd", "zlib"])
+def test_trained_dictionary_compresses_better(codec):
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    texts = speeches(300)
+    trained = TextCompressor.train(texts[:200], size=16 * 1024, codec=codec)
+    plain = TextCompressor(codec=codec)
+
+    for text in texts[200:]:
+        assert trained.decompress(trained.compress(text)) == text
+    assert (sum(len(trained.compress(text)) for text in texts[200:])
+            < sum(len(plain.compress(text)) for text in texts[200:]))
+
+
+def test_compressed_speeches_are_read_transparently():
+    mongoengine = pytest.importorskip("mongoengine")
+    pytest.importorskip("mongomock")
+    import src.mongo.mongo_setup as mongo_setup
+    import src.mongo.utils as dbutils
+    from src.mongo import Speech
+    from src.mongo.schemas import speech_text, TEXT_FIELDS
+
+    mongoengine.disconnect(alias="core")
+    mongo_setup.global_init(mock=True)
+    try:
+        dbutils.insert_politician_to_db({'name': "Anna Nowak", 'sex': "woman", 'date_of_birth': datetime(1980, 1, 1),
+                                         'political_group': "Klub A", 'age': 40, 'parliment_member': ["IX"]})
+        texts = speeches(50, seed=1)
+        dbutils.insert_speeches_into_db([dbutils.create_speech_object("Anna Nowak", datetime(2020, 1, 1), text)
+                                         for text in texts])
+        hashes = {speech.hash: speech.raw_text for speech in Speech.objects}
+
+        # Only processed speeches are compressed
+        assert dbutils.compress_speeches(sample_size=20) == 0
+        Speech._get_collection().update_many({}, {'$set': {'normalized_text': "", 'lemmatized_text': "",
+                                                           'processing_version': 1}})
+        assert dbutils.compress_speeches(sample_size=20) == 50
+        assert dbutils.compress_speeches() == 0
+
+        assert Speech._get_collection().count_documents({'raw_text': {'$exists': True}}) == 0
+        assert Speech._get_collection().count_documents({'normalized_text': {'$exists': True}}) == 50
+        for speech in Speech.objects:
+            assert speech.plain_text is None
+            assert speech.raw_text == hashes[speech.hash]
+            assert speech.generate_id() == speech.hash
+            assert speech.text_length == len(speech.raw_text)
+
+        # Compressed text is read also from raw documents and duplicates are still detected by the hash
+        documents = Speech._get_collection().find({}, {'hash': 1, **TEXT_FIELDS})
+        assert {document['hash']: speech_text(document) for document in documents} == hashes
+        duplicate = dbutils.create_speech_object("Anna Nowak", datetime(2020, 1, 1), texts[0])
+        assert sum(dbutils.insert_speeches_into_db([duplicate]).values()) == 0
+    finally:
+        mongoengine.disconnect(alias="core")
+
+
+def test_speech_accepts_text_as_keyword():
+    pytest.importorskip("mongoengine")
+    from src.mongo import Speech
+
+    speech = Speech(raw_text="Panie Marszałku! Wysoka Izbo!", cadence=9)
+    speech.hash = speech.generate_id()
+    speech.validate()
+
+    assert speech.plain_text == speech.raw_text == "Panie Marszałku! Wysoka Izbo!"
+    assert speech.text_length == len(speech.raw_text)
+    assert speech.cadence == 9
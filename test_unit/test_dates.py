@@ -0,0 +1,24 @@
+import pytest
+
+from src.utils import parse_date
+
+dateutil_parser = pytest.importorskip("dateutil.parser")
+
+
+@pytest.mark.parametrize('value', ["2021-03-17", "2019-1-5", " 2020-12-01 ", "12-11-2019", "13-10-2019",
+                                   "21-06-1975", "05-25-2019", "1-2-2019", "12.11.2019", "25.10.2019", "12/11/2019",
+                                   "17 marca 2021", "2021-03-17T10:30", "March 17, 2021"])
+def test_parse_date_matches_dateutil(value):
+    try:
+        expected = dateutil_parser.parse(value)
+    except ValueError:
+        with pytest.raises(ValueError):
+            parse_date(value)
+    else:
+        assert parse_date(value) == expected
+
+
+@pytest.mark.parametrize('value', ["31-02-2019", "13-13-2019", "2019-02-30"])
+def test_parse_date_rejects_invalid_dates(value):
+    with pytest.raises(ValueError):
+        parse_date(value)
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+mongoengine = pytest.importorskip("mongoengine")
+pytest.importorskip("mongomock")
+pq = pytest.importorskip("pyarrow.parquet")
+
+import src.mongo.mongo_setup as mongo_setup
+import src.mongo.utils as dbutils
+from src.mongo import Politician, Speech
+
+
+@pytest.fixture
+def database():
+    mongoengine.disconnect(alias="core")
+    mongo_setup.global_init(mock=True)
+    yield
+    mongoengine.disconnect(alias="core")
+
+
+def insert_speeches(texts, politician_name="Anna Nowak", ids=None):
+    speeches = [dbutils.create_speech_object(politician_name, datetime(2020, n % 3 + 1, 1), text, cadence=9)
+                for n, text in enumerate(texts)]
+    for speech, speech_id in zip(speeches, ids or []):
+        speech.id = speech_id
+    dbutils.insert_speeches_into_db(speeches)
+
+
+def test_incremental_export_of_speeches(database, tmp_path):
+    dbutils.insert_politician_to_db({'name': "Anna Nowak", 'sex': "woman", 'date_of_birth': datetime(1980, 1, 1),
+                                     'political_group': "Klub A", 'age': 40, 'parliment_member': ["IX"]})
+    insert_speeches([f"Wypowiedź {n}" for n in range(10)])
+
+    assert dbutils.export_speeches(tmp_path, batch_size=4) == 10
+    assert dbutils.export_speeches(tmp_path) == 0
+
+    insert_speeches([f"Nowa wypowiedź {n}" for n in range(5)])
+    assert dbutils.export_speeches(tmp_path) == 5
+
+    table = pq.read_table(tmp_path)
+    assert table.num_rows == 15
+    assert set(table.column("month").to_pylist()) == {"2020-01", "2020-02", "2020-03"}
+    assert set(table.column("political_group").to_pylist()) == {"Klub A"}
+    assert set(table.column("cadence").to_pylist()) == {9}
+    assert Politician.objects.first().speech_count == 15
+
+
+def test_incremental_export_doesnt_depend_on_order_of_identifiers(database, tmp_path):
+    dbutils.insert_politician_to_db({'name': "Anna Nowak", 'sex': "woman", 'date_of_birth': datetime(1980, 1, 1),
+                                     'political_group': "Klub A", 'age': 40, 'parliment_member': ["IX"]})
+    insert_speeches([f"Wypowiedź {n}" for n in range(3)])
+    assert dbutils.export_speeches(tmp_path) == 3
+
+    # Identifier generated by a worker with the clock behind is lower than identifiers of the exported speeches
+    insert_speeches(["Wypowiedź z opóźnionego serwera"], ids=[ObjectId.from_datetime(datetime(2001, 1, 1))])
+    assert dbutils.export_speeches(tmp_path) == 1
+    assert dbutils.export_speeches(tmp_path) == 0
+    assert pq.read_table(tmp_path).num_rows == 4
+
+
+def test_speeches_without_insert_time_are_exported_after_migration(database, tmp_path):
+    dbutils.insert_politician_to_db({'name': "Anna Nowak", 'sex': "woman", 'date_of_birth': datetime(1980, 1, 1),
+                                     'political_group': "Klub A", 'age': 40, 'parliment_member': ["IX"]})
+    insert_speeches([f"Wypowiedź {n}" for n in range(3)])
+    speeches = Speech._get_collection()
+    speeches.update_many({}, {'$unset': {'inserted_at': ""}})
+
+    # Export doesn't write to the database
+    assert dbutils.export_speeches(tmp_path) == 0
+    assert speeches.count_documents({'inserted_at': None}) == 3
+
+    assert dbutils.stamp_speech_insert_times() == 3
+    assert dbutils.export_speeches(tmp_path) == 3
@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+mongoengine = pytest.importorskip("mongoengine")
+pytest.importorskip("mongomock")
+pytest.importorskip("bs4")
+
+import src.mongo.mongo_setup as mongo_setup
+import src.mongo.utils as dbutils
+from src.mongo import ScrapeJob, Speech
+from src.scraping.scraping import PoliticiansScraper
+from src.scraping.worker import QueueWorker, enqueue_politicians
+from benchmarks.fixture_site import FixtureSite
+
+
+@pytest.fixture
+def queue():
+    mongoengine.disconnect(alias="core")
+    mongo_setup.global_init(mock=True)
+    yield dbutils.JobQueue(lease_seconds=60, max_attempts=2, retry_delay=0)
+    mongoengine.disconnect(alias="core")
+
+
+def test_jobs_are_leased_once_and_retried(queue):
+    jobs = [queue.job("listing", 9, "Jan Nowak", "?id=001"), queue.job("speech", 9, "Jan Nowak", "wypowiedz.xsp")]
+    assert queue.enqueue(jobs) == 2
+    assert queue.enqueue(jobs) == 0
+
+    speech = queue.claim("first")
+    listing = queue.claim("second")
+    assert (speech['kind'], listing['kind']) == ("speech", "listing")
+    assert queue.claim("third") is None
+
+    # Lease of a worker that stopped responding expires
+    ScrapeJob.objects(id=listing['_id']).update(set__lease_expires=datetime.now(timezone.utc) - timedelta(seconds=1))
+    assert queue.claim("third")['_id'] == listing['_id']
+    assert queue.complete(listing, "third")
+    assert not queue.complete(listing, "second")
+
+    queue.fail(speech, "first", ConnectionError("reset"))
+    speech = queue.claim("first")
+    assert speech['attempts'] == 2
+    queue.fail(speech, "first", ConnectionError("reset"))
+
+    assert queue.claim("first") is None
+    assert queue.counts() == {"done": 1, "failed": 1}
+    assert queue.active() == 0
+
+
+def test_workers_share_crawl_without_duplicates(queue):
+    with FixtureSite(politicians=4, speeches_per_politician=10, hidden_politicians=0) as site:
+        scraper_args = dict(root_url=site.root_url(9), max_connections=4)
+        PoliticiansScraper(9, True, **scraper_args).scrape_politicians()
+
+        assert enqueue_politicians(queue, 9, **scraper_args) == 4
+        workers = [QueueWorker(queue, workers=2, poll_interval=0.01, worker_id=f"worker-{n}", **scraper_args)
+                   for n in range(2)]
+        with ThreadPoolExecutor() as executor:
+            results = list(executor.map(QueueWorker.run, workers))
+
+        assert Speech.objects.count() == site.total_speeches
+        assert site.requests["wypowiedz.xsp"] == site.total_speeches
+        assert sum(result["inserted"] for result in results) == site.total_speeches
+        assert queue.counts() == {"done": site.total_speeches + 4}
+
+
+def test_worker_survives_unexpected_errors(queue, monkeypatch):
+    jobs = [queue.job("speech", 9, "Jan Nowak", f"wypowiedz.xsp?id={n}") for n in range(3)]
+    queue.enqueue(jobs)
+
+    def process(worker, job):
+        if job['url'].endswith("id=1"):
+            raise ValueError("Unknown date format")
+        worker.queue.complete(job, worker.worker_id)
+        return "inserted"
+
+    monkeypatch.setattr(QueueWorker, "_process", process)
+    results = QueueWorker(queue, workers=1, poll_interval=0.01, resolver=object()).run()
+
+    assert results == {"inserted": 2, "failed": 2}
+    assert ScrapeJob.objects.get(url="wypowiedz.xsp?id=1").status == "failed"
@@ -0,0 +1,23 @@
+import json
+
+from src.utils.metrics import Metrics
+
+
+def test_metrics_summary_and_export(tmp_path):
+    metrics = Metrics()
+    metrics.increment("http_requests_total", status=200)
+    metrics.increment("http_requests_total", 2, status=200)
+    metrics.set_gauge("queue_depth", 5, stage="parse")
+    metrics.set_gauge("queue_depth", 1, stage="parse")
+    for value in (0.002, 0.02, 0.2):
+        metrics.observe("http_request_seconds", value)
+
+    summary = json.loads(metrics.export(tmp_path).read_text())
+    assert summary["counters"] == {'http_requests_total{status="200"}': 3}
+    assert summary["gauges"] == {'queue_depth{stage="parse"}': 1, 'queue_depth_max{stage="parse"}': 5}
+    assert summary["histograms"]["http_request_seconds"]["count"] == 3
+    assert summary["histograms"]["http_request_seconds"]["p50"] == 0.025
+
+    prometheus = metrics.export(tmp_path, "prometheus").read_text()
+    assert 'http_request_seconds_bucket{le="+Inf"} 3' in prometheus
+    assert 'http_request_seconds_bucket{le="0.005"} 1' in prometheus
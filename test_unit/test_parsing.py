@@ -0,0 +1,92 @@
+import pathlib
+
+import pytest
+
+bs = pytest.importorskip("bs4")
+
+from src.scraping import parsing
+from src.scraping.scraping import PoliticiansScraper, SpeechesScraper
+from src.utils import swap_name_with_surname
+
+FIXTURES = pathlib.Path(__file__).parent.joinpath("fixtures")
+BACKENDS = ["html.parser", pytest.param("lxml", marks=pytest.mark.skipif(parsing.DEFAULT_BACKEND != "lxml",
+                                                                         reason="lxml is not installed"))]
+
+
+class FixtureFetcher:
+    max_connections = 1
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get(self, url, revalidate=False):
+        return FIXTURES.joinpath(self.pages[url]).read_bytes()
+
+
+def full_soup(fixture):
+    return bs.BeautifulSoup(FIXTURES.joinpath(fixture).read_bytes(), features="html.parser")
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_speech_text_is_equal_to_full_parse(backend):
+    soup = full_soup("speech.html")
+    expected = " ".join(part.get_text(strip='\xa0').replace("\r\n", "")
+                        for part in soup.find("div", {"class": "stenogram"}).findAll("p")[1:])
+
+    assert parsing.parse_speech_text(FIXTURES.joinpath("speech.html").read_bytes(), backend) == expected
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_speech_text_without_stenogram_raises(backend):
+    with pytest.raises(AttributeError):
+        parsing.parse_speech_text(FIXTURES.joinpath("listing.html").read_bytes(), backend)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_speeches_listing_is_equal_to_full_parse(backend):
+    scraper = SpeechesScraper(9, False, only_new=False, parser=backend,
+                              fetcher=FixtureFetcher({"listing": "listing.html"}))
+
+    soup = full_soup("listing.html")
+    expected_pages = [scraper.speeches_url + tag.findChild().get_attribute_list("href")[0]
+                      for tag in soup.findAll("ul", {"class": "pagination"})[0].findAll("li")[1:-1]]
+    expected_rows = [(row.find("td", {"class": "nobr"}).get_text(),
+                      row.findAll("td")[-2].find("a").get_attribute_list("href")[0])
+                     for row in soup.find('table', {'class': "table border-bottom lista-wyp"}).findAll("tr")[1:]]
+
+    strained = scraper._soup("listing", parsing.SPEECHES_LISTING)
+    assert scraper._listing_pages("listing", strained) == expected_pages
+    assert [(date.strftime("%Y-%m-%d"), url) for date, url in scraper._speeches_in_listing(strained)] == expected_rows
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_politicians_listing_is_equal_to_full_parse(backend):
+    scraper = SpeechesScraper(9, False, only_new=False, parser=backend,
+                              fetcher=FixtureFetcher({"politicians": "politicians.html"}))
+
+    soup = full_soup("politicians.html")
+    expected = [(swap_name_with_surname(tag.get_text()), tag.get_attribute_list("href")[0])
+                for tag in soup.find('ul', {'class': "category-list"}).find_all("a")]
+
+    assert list(scraper._speeches_per_politician_url("politicians")) == expected
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_politician_profile_is_equal_between_backends(backend):
+    pages = {"profile": "profile.html"}
+    expected = PoliticiansScraper(9, False, parser="html.parser",
+                                  fetcher=FixtureFetcher(pages))._scrape_single_politician("profile")
+    result = PoliticiansScraper(9, False, parser=backend, fetcher=FixtureFetcher(pages))._scrape_single_politician(
+        "profile")
+
+    assert result == expected
+    assert result["email"] == "anna.nowak@sejm.pl"
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_last_politician_number(backend):
+    scraper = PoliticiansScraper(9, False, parser=backend, fetcher=FixtureFetcher({}))
+    scraper.root_url = ""
+    scraper.fetcher.pages["poslowie.xsp?type=A"] = "poslowie.html"
+
+    assert scraper._find_last_politician_number() == 460
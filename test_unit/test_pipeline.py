@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.fixture_site import FixtureSite
+from src.scraping.fetching import Fetcher
+from src.scraping.pipeline import Pipeline, Scheduler, Stage
+
+
+def identity(item):
+    yield item
+
+
+def test_queues_between_stages_stay_bounded():
+    produced = []
+
+    def items():
+        for n in range(200):
+            produced.append(n)
+            yield n
+
+    pipeline = Pipeline([Stage("first", identity), Stage("second", identity)], queue_size=2)
+
+    # Every queue holds queue_size items, the feeder and every worker hold one more
+    bound = 2 * 3 + 3 + 1
+    for consumed, _ in enumerate(pipeline.run(items()), start=1):
+        time.sleep(0.001)
+        assert len(produced) - consumed <= bound
+    assert consumed == 200
+
+
+def test_partial_batch_is_flushed_at_end_of_input():
+    batch = []
+
+    def write(item):
+        batch.append(item)
+        if len(batch) == 3:
+            yield batch.copy()
+            batch.clear()
+
+    def flush():
+        return [batch.copy()] if batch else []
+
+    batches = list(Pipeline([Stage("write", write, flush=flush)]).run(range(10)))
+
+    assert batches == [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]]
+
+
+def test_stage_error_is_raised_after_all_stages_stop():
+    def parse(item):
+        if item == 5:
+            raise ValueError("malformed item")
+        yield item
+
+    pipeline = Pipeline([Stage("parse", parse, workers=3), Stage("write", identity)], queue_size=4)
+    results = []
+    with pytest.raises(ValueError, match="malformed item"):
+        for item in pipeline.run(range(20)):
+            results.append(item)
+
+    assert sorted(results) == [n for n in range(20) if n != 5]
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith(("parse-", "write-"))]
+
+
+def test_scheduler_runs_follow_up_tasks_first():
+    scheduler = Scheduler(workers=1)
+    order = []
+
+    def fetch(item, n):
+        order.append(f"fetch {item}{n}")
+
+    def list_items(item):
+        order.append(f"list {item}")
+        for n in range(2):
+            scheduler.submit(fetch, item, n)
+
+    assert list(scheduler.run(list_items, "ab")) == []
+    assert order == ["list a", "fetch a0", "fetch a1", "list b", "fetch b0", "fetch b1"]
+
+
+def test_scheduler_keeps_per_host_limit_of_the_fetcher():
+    # Sites answer requests above their capacity with 503, which fails the task as the fetcher doesn't retry.
+    # Capacity leaves room for a request that arrives before the server finished the previous one
+    with FixtureSite(politicians=3, latency=0.02, capacity=3) as first, \
+            FixtureSite(politicians=3, latency=0.02, capacity=3) as second:
+        fetcher = Fetcher(max_connections=8, max_per_host=2, retries=0)
+
+        def fetch(url):
+            yield fetcher.get(url)
+
+        urls = [site.root_url(9) + f"posel.xsp?id={n % 3 + 1:03}&type=A" for n in range(12) for site in (first, second)]
+        pages = list(Scheduler(workers=8).run(fetch, urls))
+
+    assert len(pages) == 24
+    assert first.throttled == second.throttled == 0
@@ -0,0 +1,308 @@
+import json
+from datetime import datetime
+
+import pytest
+import requests
+
+pytest.importorskip("bs4")
+mongoengine = pytest.importorskip("mongoengine")
+pytest.importorskip("mongomock")
+
+import src.mongo.mongo_setup as mongo_setup
+import src.mongo.utils as dbutils
+from src.scraping import scraping
+from src.exceptions import DuplicatedNameWarning
+from src.mongo import Politician, Speech
+from src.scraping.scraping import PoliticiansScraper, SpeechesScraper
+from src.scraping import parsing
+from src.scraping.cache import ResponseCache
+from src.scraping.fetching import Fetcher
+from src.utils import Archive, get_project_structure, METRICS
+from benchmarks import fixture_site
+from benchmarks.fixture_site import FixtureSite
+
+
+@pytest.fixture
+def database():
+    mongoengine.disconnect(alias="core")
+    mongo_setup.global_init(mock=True)
+    yield
+    mongoengine.disconnect(alias="core")
+
+
+@pytest.fixture(scope="module")
+def site():
+    with FixtureSite(politicians=5, speeches_per_politician=25, hidden_politicians=2, page_size=10) as site:
+        yield site
+
+
+def test_scrapers_against_fixture_site(database, site):
+    scraper_args = dict(government_n=9, to_database=True, root_url=site.root_url(9), max_connections=4)
+
+    politicians = PoliticiansScraper(**scraper_args)
+    politicians.scrape_politicians()
+
+    assert len(politicians.politicians) == 7
+    assert Politician.objects.count() == 7
+
+    speeches = SpeechesScraper(only_new=False, retain_results=False, **scraper_args)
+    speeches.scrape_politician_speeches()
+
+    assert speeches.speeches == []
+    assert Speech.objects.count() == site.total_speeches
+    assert Speech.objects(politician_id=None).count() == 0
+    assert sum(p.speech_count for p in Politician.objects) == site.total_speeches
+
+
+def test_incremental_crawl_reads_high_water_mark_per_hash(database, site, tmp_path, monkeypatch):
+    monkeypatch.setitem(get_project_structure(), 'backup', tmp_path)
+    scraper_args = dict(government_n=9, to_database=True, root_url=site.root_url(9), max_connections=4)
+    PoliticiansScraper(**scraper_args).scrape_politicians()
+    SpeechesScraper(only_new=False, retain_results=False, **scraper_args).scrape_politician_speeches()
+
+    last_speech = dbutils.get_last_speech_per_politician()
+    assert last_speech == {p.hash: p.last_speech_date for p in Politician.objects if p.speech_count}
+
+    dbutils.backfill_speech_stats()
+    assert dbutils.get_last_speech_per_politician() == last_speech
+
+    requests_before = site.requests["wypowiedz.xsp"]
+    SpeechesScraper(only_new=True, **scraper_args).scrape_politician_speeches()
+    assert Speech.objects.count() == site.total_speeches
+    # Only speeches from the day of the high-water mark are downloaded again
+    assert site.requests["wypowiedz.xsp"] - requests_before == len(last_speech)
+
+
+def test_speeches_without_cadence_keep_incremental_marks(database):
+    dbutils.insert_politician_to_db({'name': "Anna Nowak", 'sex': "woman", 'date_of_birth': datetime(1980, 1, 1),
+                                     'political_group': "Klub A", 'age': 40, 'parliment_member': ["IX"]})
+    # Politician stored before speeches had their own collection and cadence
+    Politician._get_collection().update_one({}, {'$set': {
+        'last_speech_date': datetime(2020, 2, 1), 'last_speech_dates': {},
+        'speeches': [{'hash': "legacy", 'date': datetime(2020, 2, 1), 'raw_text': "Wysoka Izbo!"}]}})
+    politician_hash = Politician.objects.first().hash
+
+    assert dbutils.get_last_speech_per_politician(9) == {politician_hash: datetime(2020, 2, 1)}
+    assert dbutils.get_last_speech_per_politician(8) == {}
+
+    assert dbutils.migrate_embedded_speeches() == 1
+    assert Speech.objects.get(hash="legacy").cadence == 9
+    Speech._get_collection().insert_one({'hash': "scraped", 'politician_id': politician_hash,
+                                         'date': datetime(2020, 3, 1), 'raw_text': "Panie Marszałku!"})
+
+    dbutils.backfill_speech_stats()
+    assert Speech.objects(cadence=None).count() == 0
+    assert Politician.objects.first().last_speech_dates == {"IX": datetime(2020, 3, 1)}
+    assert dbutils.get_last_speech_per_politician(9) == {politician_hash: datetime(2020, 3, 1)}
+
+
+def test_failed_pages_complete_crawl_checkpoints(database, site, tmp_path, monkeypatch):
+    monkeypatch.setitem(get_project_structure(), 'backup', tmp_path)
+    checkpoints_file = tmp_path.joinpath("speeches_checkpoints_9.json")
+    scraper_args = dict(government_n=9, to_database=True, root_url=site.root_url(9), max_connections=4)
+    PoliticiansScraper(**scraper_args).scrape_politicians()
+
+    # Speeches that can't be parsed still move the mark forward, so they aren't crawled again in every run
+    site.truncate_rate = 1.0
+    try:
+        speeches = SpeechesScraper(only_new=True, **scraper_args)
+        speeches.scrape_politician_speeches()
+    finally:
+        site.truncate_rate = 0.0
+
+    assert Speech.objects.count() == 0
+    assert speeches.checkpoints._progress == {}
+    marks = json.loads(checkpoints_file.read_text())
+    assert marks and all(marks.values())
+
+    # Mark is kept if a listing failed, speeches older than the failed page weren't listed
+    SpeechesScraper(only_new=False, retain_results=False, **scraper_args).scrape_politician_speeches()
+    marks = json.loads(checkpoints_file.read_text())
+    site.error_rate = 1.0
+    monkeypatch.setattr(SpeechesScraper, "_speeches_per_politician_url",
+                        lambda self, url: [(name, f"?id={n:03}") for n, name in enumerate(marks, 1)])
+    try:
+        speeches = SpeechesScraper(only_new=True, retries=0, **scraper_args)
+        speeches.scrape_politician_speeches()
+    finally:
+        site.error_rate = 0.0
+
+    assert speeches.checkpoints._progress == {}
+    assert json.loads(checkpoints_file.read_text()) == marks
+
+
+def test_speeches_scraper_retries_server_errors(site):
+    site.error_rate = 0.2
+    try:
+        speeches = SpeechesScraper(government_n=9, to_database=False, only_new=False, root_url=site.root_url(9),
+                                   retries=10, max_connections=4)
+        speeches.fetcher.backoff = 0.001
+        speeches.scrape_politician_speeches()
+    finally:
+        site.error_rate = 0.0
+
+    assert len(speeches.speeches) == site.total_speeches
+
+
+def test_truncated_speeches_are_reported_and_downloaded_again(site, tmp_path):
+    METRICS.reset()
+    cache = ResponseCache(tmp_path)
+    site.truncate_rate, site.truncated = 0.2, 0
+    try:
+        speeches = SpeechesScraper(government_n=9, to_database=False, only_new=False, root_url=site.root_url(9),
+                                   fetcher=Fetcher(max_connections=8, cache=cache))
+        speeches.scrape_politician_speeches()
+    finally:
+        site.truncate_rate = 0.0
+
+    assert site.truncated > 0
+    assert METRICS.summary()['counters']['malformed_pages_total'] == site.truncated
+    assert all(text for _, _, text in speeches.speeches)
+
+    # Truncated pages never stay in the cache
+    for _, digest in cache._db.execute("SELECT url, digest FROM responses WHERE url LIKE '%wypowiedz.xsp%'"):
+        parsing.parse_speech_text(cache._path(digest).read_bytes())
+
+
+def test_refresh_updates_only_changed_profiles(database, site, monkeypatch, tmp_path):
+    # Profiles are cached for days, refresh asks the website whether they changed
+    scraper_args = dict(government_n=9, to_database=True, root_url=site.root_url(9),
+                        fetcher=Fetcher(max_connections=4, cache=ResponseCache(tmp_path)))
+    PoliticiansScraper(**scraper_args).scrape_politicians()
+    Politician.objects.update(set__speech_count=3)
+
+    unchanged = PoliticiansScraper(refresh=True, **scraper_args)
+    unchanged.scrape_politicians()
+    assert unchanged.politicians == []
+
+    monkeypatch.setattr(fixture_site, "GROUPS", ["Klub Parlamentarny D"])
+    changed = PoliticiansScraper(refresh=True, **scraper_args)
+    changed.scrape_politicians()
+
+    assert len(changed.politicians) == 7
+    assert Politician.objects.count() == 7
+    assert set(Politician.objects.distinct("political_group")) == {"Klub Parlamentarny D"}
+    assert set(Politician.objects.distinct("speech_count")) == {3}
+
+
+@pytest.mark.parametrize('hidden', [0, 1, 2, 3, 7, 16, 100])
+def test_hidden_politicians_are_found_by_probing(hidden):
+    scraper = PoliticiansScraper(government_n=9, to_database=False, root_url="http://localhost/")
+    probes = []
+
+    def exists(number):
+        probes.append(number)
+        return number <= 460 + hidden
+    scraper._politician_exists = exists
+
+    assert scraper._find_last_hidden_politician_number(460) == 460 + hidden
+    assert len(probes) <= 2 * (hidden + 2).bit_length() + scraping.PROBE_WINDOW
+
+
+def test_politician_exists_reads_beginning_of_profile(site):
+    scraper = PoliticiansScraper(government_n=9, to_database=False, root_url=site.root_url(9))
+
+    assert scraper._politician_exists(site.politicians + site.hidden_politicians)
+    assert not scraper._politician_exists(site.politicians + site.hidden_politicians + 1)
+
+    # Profile that cannot be read doesn't count as missing
+    unreachable = PoliticiansScraper(government_n=9, to_database=False, root_url="http://127.0.0.1:9/", retries=0)
+    with pytest.raises(requests.RequestException):
+        unreachable._politician_exists(1)
+
+
+def test_politicians_of_many_cadences_are_merged(database, site):
+    resolver = dbutils.PoliticianResolver([8, 9])
+    for government_n in (8, 9):
+        PoliticiansScraper(government_n=government_n, to_database=True, root_url=site.root_url(government_n),
+                           resolver=resolver).scrape_politicians()
+
+    assert Politician.objects.count() == 7
+    assert {frozenset(p.parliment_member) for p in Politician.objects} == {frozenset({"VIII", "IX"})}
+    assert resolver.resolve(Politician.objects.first().name)
+
+
+@pytest.mark.parametrize("insert", [
+    lambda politician: dbutils.insert_politician_to_db(politician),
+    lambda politician: dbutils.upsert_politicians([politician])])
+def test_profile_of_newest_cadence_is_kept(database, insert):
+    profiles = [(["VII", "VIII"], "Klub A"), (["VII", "VIII", "IX"], "Klub B"), (["VII"], "Klub C")]
+    for cadences, group in profiles:
+        insert(dict(name="Anna Nowak", sex="woman", date_of_birth=datetime(1970, 1, 1), parliment_member=cadences,
+                    political_group=group))
+
+    politician = Politician.objects.get()
+    assert politician.political_group == "Klub B"
+    assert set(politician.parliment_member) == {"VII", "VIII", "IX"}
+
+
+def new_politician(name, date_of_birth=datetime(1970, 1, 1), **fields):
+    return dict(name=name, sex="man", date_of_birth=date_of_birth, parliment_member=["IX"], **fields)
+
+
+def test_resolver_finds_names_swapped_with_surnames(database):
+    dbutils.insert_politician_to_db(new_politician("Jan Kowalski"))
+    resolver = dbutils.PoliticianResolver(9)
+
+    politician_hash, name = resolver.resolve("Kowalski Jan")
+    assert name == "Jan Kowalski"
+    assert politician_hash == Politician.objects.get().hash
+
+
+def test_resolver_warns_about_ambiguous_names(database):
+    for year in (1960, 1970):
+        dbutils.insert_politician_to_db(new_politician("Jan Kowalski", date_of_birth=datetime(year, 1, 1)))
+    resolver = dbutils.PoliticianResolver(9)
+
+    with pytest.warns(DuplicatedNameWarning):
+        politician_hash, _ = resolver.resolve("Jan Kowalski")
+    assert politician_hash in Politician.objects.distinct("hash")
+
+
+def test_resolver_sees_inserted_politicians(database):
+    resolver = dbutils.PoliticianResolver(9)
+    assert resolver.resolve("Jan Kowalski") is None
+
+    # Names missing in the database are remembered until the resolver learns about new politicians
+    dbutils.insert_politician_to_db(new_politician("Jan Kowalski"))
+    assert resolver.resolve("Jan Kowalski") is None
+    resolver.refresh()
+    assert resolver.resolve("Jan Kowalski")[1] == "Jan Kowalski"
+
+    assert resolver.resolve("Anna Nowak") is None
+    dbutils.insert_politician_to_db(new_politician("Anna Nowak"), resolver=resolver)
+    assert resolver.resolve("Nowak Anna")[1] == "Anna Nowak"
+
+
+def test_speeches_of_many_cadences_share_workers_and_writer(database, site):
+    with FixtureSite(politicians=3, speeches_per_politician=10, hidden_politicians=0, seed=1) as other_site:
+        sites = {8: other_site, 9: site}
+        resolver = dbutils.PoliticianResolver(list(sites))
+        fetcher = Fetcher(max_connections=4)
+        for government_n, cadence_site in sites.items():
+            PoliticiansScraper(government_n=government_n, to_database=True, fetcher=fetcher, resolver=resolver,
+                               root_url=cadence_site.root_url(government_n)).scrape_politicians()
+
+        scrapers = [SpeechesScraper(government_n=government_n, to_database=True, only_new=False, retain_results=False,
+                                    root_url=cadence_site.root_url(government_n), fetcher=fetcher, resolver=resolver)
+                    for government_n, cadence_site in sites.items()]
+        SpeechesScraper.scrape_cadences(scrapers)
+
+    assert scrapers[0].scheduler is scrapers[1].scheduler
+    assert scrapers[1]._batch == []
+    assert Speech.objects(cadence=8).count() == other_site.total_speeches
+    assert Speech.objects(cadence=9).count() == site.total_speeches
+    assert Speech.objects(politician_id=None).count() == 0
+
+
+def test_local_backup_is_restored_into_database(database, site, tmp_path, monkeypatch):
+    monkeypatch.setitem(get_project_structure(), 'backup', tmp_path)
+    scraper_args = dict(government_n=9, to_database=False, root_url=site.root_url(9), local_backup=True)
+    PoliticiansScraper(**scraper_args).scrape_politicians()
+    SpeechesScraper(only_new=False, retain_results=False, **scraper_args).scrape_politician_speeches()
+
+    archive_folder = tmp_path.joinpath("archive")
+    assert dbutils.restore_politicians(Archive(archive_folder, "politicians_9")) == (7, 0)
+    assert dbutils.restore_speeches(Archive(archive_folder, "speeches_9")) == site.total_speeches
+    assert Speech.objects.count() == site.total_speeches
+    assert dbutils.restore_speeches(Archive(archive_folder, "speeches_9")) == 0
@@ -0,0 +1,183 @@
+import os
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+mongoengine = pytest.importorskip("mongoengine")
+
+import src.mongo.mongo_setup as mongo_setup
+import src.mongo.utils as dbutils
+from src.mongo import Politician, Speech
+from src.mongo.schemas.speech import text_compressor
+from src.mongo.utils.search import make_snippet, search_filters, search_speeches, text_search
+from src.processing import analyse_text
+
+
+@pytest.fixture
+def mongo_server():
+    # mongomock doesn't support the text search, so these tests use a test database of the mongo server
+    pymongo = pytest.importorskip("pymongo")
+    host = os.environ.get("THC_MONGO_HOST", mongo_setup.DEFAULT_HOST)
+    if pymongo.uri_parser.parse_uri(host).get('database'):
+        pytest.skip("Database named in THC_MONGO_HOST would be used instead of the test database")
+    client = pymongo.MongoClient(host, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip("Text search needs a mongo server")
+
+    # Every run gets its own database, so the tests never touch data of another run on the same server
+    database = f"THC_test_{uuid4().hex[:8]}"
+    mongoengine.disconnect(alias="core")
+    mongoengine.register_connection(alias="core", name=database, host=host)
+    text_compressor.cache_clear()
+    for name, group in [("Anna Nowak", "Klub A"), ("Jan Kowalski", "Klub B")]:
+        dbutils.insert_politician_to_db({'name': name, 'sex': "woman", 'date_of_birth': datetime(1980, 1, 1),
+                                         'political_group': group, 'age': 40, 'parliment_member': ["IX"]})
+    yield
+    mongoengine.disconnect(alias="core")
+    text_compressor.cache_clear()
+    client.drop_database(database)
+    client.close()
+
+
+def insert_speeches(politician_name, texts, cadence=9, processed=True):
+    speeches = [dbutils.create_speech_object(politician_name, datetime(2020, 1, n + 1), text, cadence=cadence)
+                for n, text in enumerate(texts)]
+    dbutils.insert_speeches_into_db(speeches)
+    if processed:
+        for speech in speeches:
+            Speech._get_collection().update_one({'hash': speech.hash},
+                                                {'$set': dict(analyse_text(speech.raw_text), processing_version=1)})
+    return [speech.hash for speech in speeches]
+
+
+def test_snippet_is_cut_around_first_match():
+    text = ("Wysoka Izbo! " + "Wstęp wypowiedzi. " * 20 + "Projekt ustawy o podatku dochodowym. (Oklaski) "
+            + "Koniec. " * 40)
+
+    snippet = make_snippet(text, ["Podatku"], width=100)
+
+    assert snippet.startswith("…") and snippet.endswith("…")
+    assert "o podatku dochodowym." in snippet
+    assert "(Oklaski)" not in snippet
+    assert len(snippet) <= 102
+
+
+def test_text_search_keeps_phrases_and_exclusions():
+    search = text_search('"podatek dochodowy" ustawy -rząd')
+
+    assert search.startswith('"podatek dochodowy" ustawy -rząd')
+    assert "rząd" not in search.split()
+
+
+def test_compressed_speeches_are_found(mongo_server):
+    found, = insert_speeches("Anna Nowak", ["Wysoka Izbo! Projekt ustawy o podatku dochodowym. (Oklaski) Dziękuję."])
+    insert_speeches("Jan Kowalski", [f"Panie Marszałku! Wysoka Izbo! Sprawozdanie komisji nr {n}." for n in range(20)])
+
+    assert dbutils.compress_speeches(sample_size=10, codec="zlib") == 21
+    assert Speech._get_collection().count_documents({'raw_text': {'$exists': True}}) == 0
+
+    for query in ['"podatku dochodowym"', "dochodowym"]:
+        results = search_speeches(query)
+        assert [result['hash'] for result in results] == [found]
+        assert "o podatku dochodowym." in results[0]['snippet']
+
+
+def test_search_filters():
+    pytest.importorskip("mongomock")
+    mongoengine.disconnect(alias="core")
+    mongo_setup.global_init(mock=True)
+    try:
+        for name, group in [("Anna Nowak", "Klub A"), ("Jan Kowalski", "Klub B"), ("Ewa Wiśniewska", "Klub A")]:
+            dbutils.insert_politician_to_db({'name': name, 'sex': "woman", 'date_of_birth': datetime(1980, 1, 1),
+                                             'political_group': group, 'age': 40, 'parliment_member': ["IX"]})
+        hashes = {politician.name: politician.hash for politician in Politician.objects}
+
+        assert search_filters() == {}
+        assert search_filters(politician="Nowak Anna")['politician_id'] == {'$in': [hashes["Anna Nowak"]]}
+        assert set(search_filters(party="Klub A")['politician_id']['$in']) == {hashes["Anna Nowak"],
+                                                                               hashes["Ewa Wiśniewska"]}
+        assert search_filters(politician="Anna Nowak", party="Klub B")['politician_id'] == {'$in': []}
+        assert search_filters(date_from=datetime(2020, 1, 1), cadence=9) == {'date': {'$gte': datetime(2020, 1, 1)},
+                                                                             'cadence': 9}
+    finally:
+        mongoengine.disconnect(alias="core")
+
+
+class FindCall:
+    """
+    Records the query of find() and serves given documents, in place of the text search missing in mongomock
+    """
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.filters = self.projection = self.sorted_by = self.limited_to = None
+
+    def __call__(self, filters, projection):
+        self.filters, self.projection = filters, projection
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+    def sort(self, key):
+        self.sorted_by = key
+        return self
+
+    def limit(self, limit):
+        self.limited_to = limit
+        return self
+
+
+def test_search_query_uses_text_index(monkeypatch):
+    pytest.importorskip("mongomock")
+    mongoengine.disconnect(alias="core")
+    mongo_setup.global_init(mock=True)
+    try:
+        dbutils.insert_politician_to_db({'name': "Anna Nowak", 'sex': "woman", 'date_of_birth': datetime(1980, 1, 1),
+                                         'political_group': "Klub A", 'age': 40, 'parliment_member': ["IX"]})
+        find = FindCall([{'hash': "1", 'politician_name': "Anna Nowak", 'date': datetime(2020, 1, 1), 'score': 1.5,
+                          'raw_text': "Wysoka Izbo! Projekt ustawy o podatku dochodowym. Dziękuję."}])
+        monkeypatch.setattr(Speech._get_collection(), "find", find)
+
+        results = search_speeches('"podatku dochodowym" -rząd', party="Klub A", cadence=9, limit=5)
+
+        score = {'$meta': 'textScore'}
+        assert find.filters == {'$text': {'$search': text_search('"podatku dochodowym" -rząd')},
+                                'politician_id': {'$in': [Politician.objects.get().hash]}, 'cadence': 9}
+        assert find.projection['score'] == score
+        assert {'hash', 'raw_text', 'compressed_text', 'text_dictionary'} <= set(find.projection)
+        assert find.sorted_by == [('score', score)]
+        assert find.limited_to == 5
+        assert results == [{'hash': "1", 'politician_name': "Anna Nowak", 'date': datetime(2020, 1, 1),
+                            'score': 1.5, 'snippet': "Wysoka Izbo! Projekt ustawy o podatku dochodowym. Dziękuję."}]
+    finally:
+        mongoengine.disconnect(alias="core")
+
+
+def test_phrases_match_only_adjacent_words(mongo_server):
+    phrase, = insert_speeches("Anna Nowak", ["Projekt dotyczy podatku dochodowego od osób fizycznych."])
+    words, = insert_speeches("Jan Kowalski", ["Dochodowego projektu nie poprzemy, podatku nie podniesiemy."])
+
+    assert [result['hash'] for result in search_speeches('"podatku dochodowego"')] == [phrase]
+    assert {result['hash'] for result in search_speeches("podatku dochodowego")} == {phrase, words}
+    assert [result['hash'] for result in search_speeches("podatku -fizycznych")] == [words]
+
+
+def test_search_filters_and_score_order(mongo_server):
+    nowak = insert_speeches("Anna Nowak", ["Budżet, budżet i jeszcze raz budżet.",
+                                           "Wysoka Izbo! Mówimy dziś o wielu sprawach, między innymi o budżecie "
+                                           "państwa, o szkołach, o drogach i o szpitalach w regionie."])
+    kowalski, = insert_speeches("Jan Kowalski", ["Budżet jest zły."], cadence=8)
+
+    assert [result['hash'] for result in search_speeches("budżet")][0] == nowak[0]
+    assert [result['hash'] for result in search_speeches("budżet", cadence=8)] == [kowalski]
+    found = {result['hash'] for result in search_speeches("budżet", politician="Nowak Anna")}
+    assert nowak[0] in found and found <= set(nowak)
+    assert [result['hash'] for result in search_speeches("budżet", party="Klub B")] == [kowalski]
+    assert search_speeches("budżet", date_from=datetime(2021, 1, 1)) == []
+
+    scores = [result['score'] for result in search_speeches("budżet")]
+    assert scores == sorted(scores, reverse=True)
@@ -0,0 +1,22 @@
+import pytest
+
+from benchmarks import bench_startup
+from benchmarks.bench_startup import COMMANDS, heavy_imports
+from src.utils import get_project_structure
+
+
+@pytest.mark.parametrize('arguments', COMMANDS)
+def test_help_doesnt_import_subcommand_dependencies(arguments):
+    assert heavy_imports(arguments) == []
+
+
+def test_failed_command_is_not_reported_as_clean(monkeypatch):
+    # Command that crashes on import never lists the imported modules
+    monkeypatch.setattr(bench_startup, "CHECK_IMPORTS", "import main; raise ImportError('broken import')")
+    with pytest.raises(RuntimeError, match="broken import"):
+        heavy_imports(["-h"])
+
+
+def test_project_structure_is_resolved_once():
+    assert get_project_structure() is get_project_structure()
+    assert get_project_structure()['source'].name == "src"
@@ -0,0 +1,24 @@
+from src.processing import analyse_text, normalize_text, split_sentences, tokenize
+
+
+def test_normalize_text_removes_stenogram_remarks():
+    text = ("Panie Marszałku!\xa0 Wysoka Izbo!  Projekt ustawy (Głos z sali: Nareszcie!) jest gotowy . "
+            "Dziękuję bardzo. (Oklaski)")
+
+    assert normalize_text(text) == "Panie Marszałku! Wysoka Izbo! Projekt ustawy jest gotowy. Dziękuję bardzo."
+
+
+def test_split_sentences_keeps_abbreviations():
+    text = "Zgodnie z art. 5 ust. 2 projektu m.in. gminy dostaną środki. Czy to wystarczy? Nie wiem."
+
+    assert split_sentences(text) == ["Zgodnie z art. 5 ust. 2 projektu m.in. gminy dostaną środki.",
+                                     "Czy to wystarczy?", "Nie wiem."]
+
+
+def test_tokenize_and_analyse():
+    assert tokenize("Ustawa o PIT-cie z 2019 r.") == ["ustawa", "o", "pit-cie", "z", "2019", "r"]
+
+    result = analyse_text("Dziękuję. (Oklaski) Pani Poseł ma głos.")
+    assert result['normalized_text'] == "Dziękuję. Pani Poseł ma głos."
+    assert (result['token_count'], result['sentence_count']) == (5, 2)
+    assert len(result['lemmatized_text'].split()) == 5
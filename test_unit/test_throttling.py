@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from src.scraping.throttling import AdaptiveLimit, RateLimit
+
+
+def test_limit_grows_by_one_per_window_of_healthy_responses():
+    limit = AdaptiveLimit(8, initial=4)
+    for _ in range(4):
+        with limit.slot():
+            pass
+    assert limit.limit == 4
+
+    for _ in range(40):
+        with limit.slot():
+            pass
+    assert limit.limit == 8
+
+
+def test_limit_is_cut_once_per_burst_of_congestion():
+    limit = AdaptiveLimit(16, minimum=2, initial=16)
+    with limit.slot():
+        time.sleep(0.05)
+
+    for _ in range(5):
+        with limit.slot() as congested:
+            congested()
+    assert limit.limit == 8
+
+    time.sleep(0.06)
+    limit.congestion()
+    limit.congestion()
+    assert limit.limit == 4
+
+
+def test_slow_responses_count_as_congestion():
+    limit = AdaptiveLimit(10, initial=10, latency_target=0.01)
+    with limit.slot():
+        time.sleep(0.02)
+    assert limit.limit == 5
+
+
+def test_requests_in_flight_never_exceed_limit():
+    limit = AdaptiveLimit(3, initial=3)
+    in_flight, peak, lock = [0], [0], threading.Lock()
+
+    def request():
+        with limit.slot():
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+
+    threads = [threading.Thread(target=request) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 3
+
+
+def test_rate_limit_spaces_requests():
+    rate = RateLimit(100)
+    start = time.perf_counter()
+    for _ in range(11):
+        rate.wait()
+    assert time.perf_counter() - start == pytest.approx(0.1, abs=0.05)
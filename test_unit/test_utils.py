@@ -1,6 +1,6 @@
 import pytest
 
-from src.utils import swap_name_with_surname
+from src.utils import swap_name_with_surname, int_to_roman
 
 
 @pytest.mark.parametrize('case, result',
@@ -9,3 +9,8 @@ from src.utils import swap_name_with_surname
                           ("Szynkowski vel Sęk Szymon", "Szymon Szynkowski vel Sęk")])
 def test_swapping_name_with_surname(case, result):
     assert swap_name_with_surname(case) == result
+
+
+@pytest.mark.parametrize('case, result', [(4, "IV"), (7, "VII"), (9, "IX"), (10, "X"), (14, "XIV")])
+def test_int_to_roman(case, result):
+    assert int_to_roman(case) == result